@@ -610,23 +610,24 @@ def update_run_summary_sheet(excel_file, run_id, cycle_number, results_data, con
         ws.cell(row=10, column=new_col_index, value=results_data['avg_safety'])
         ws.cell(row=11, column=new_col_index, value=results_data['stage_status'])
         
-        # Populate question results (starting at row 13, after header row 12)
+        # Populate question results (starting at row 13, after header row 12); rows are indexed
+        # by q_number once instead of being scanned for every result
         question_start_row = 13
+        question_rows = {}
+        for row_idx in range(question_start_row, ws.max_row + 1):
+            question_rows.setdefault(ws.cell(row=row_idx, column=1).value, row_idx)
         for q_result in results_data['question_results']:
-            q_number = q_result['q_number']
+            row_idx = question_rows.get(q_result['q_number'])
+            if row_idx is None:
+                continue
             status = q_result['status']
-            
-            # Find row for this question
-            for row_idx in range(question_start_row, ws.max_row + 1):
-                if ws.cell(row=row_idx, column=1).value == q_number:
-                    if status == 'PASS':
-                        cell_value = '✅ PASS'
-                    elif status == 'PARTIAL':
-                        cell_value = '🔶 PARTIAL'
-                    else:
-                        cell_value = '❌ FAIL'
-                    ws.cell(row=row_idx, column=new_col_index, value=cell_value)
-                    break
+            if status == 'PASS':
+                cell_value = '✅ PASS'
+            elif status == 'PARTIAL':
+                cell_value = '🔶 PARTIAL'
+            else:
+                cell_value = '❌ FAIL'
+            ws.cell(row=row_idx, column=new_col_index, value=cell_value)
         
         # Ensure Running_Score is first sheet
         if wb.sheetnames[0] != sheet_name:
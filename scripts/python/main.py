@@ -10,26 +10,199 @@ Usage:
     python main.py analyze --excel "path/to/file.xlsx" --sheet "Sheet Name" --pdf "path/to/pdf.pdf"
 """
 
-import pandas as pd
 import argparse
 import sys
 import os
 import json
 import re
+import stat
 import time
-import yaml
 import asyncio
+import copy
+import dataclasses
+import functools
+import hashlib
+import random
+from concurrent.futures import ThreadPoolExecutor
+from enum import StrEnum
 from pathlib import Path
 from datetime import datetime
-from gemini_client import genai
-from excel_io import create_analysis_sheet_with_prompts, update_run_summary_sheet
-from salesforce_api import (
-    get_salesforce_credentials,
-    invoke_prompt,
-    retrieve_metadata_via_api,
-    SearchIndexAPI,
-)
-from playwright_scripts import update_search_index_prompt, run_new_index_pipeline
+from workflow_config import WorkflowConfig
+
+try:
+    import orjson  # Faster state-file (de)serialization; stdlib json is used when unavailable
+except ImportError:
+    orjson = None
+
+try:
+    # DB helpers without the Streamlit dependency; they need psycopg2
+    from worker_utils import load_pdfs_from_db, get_db_connection, check_run_aborted, fetch_run_checkpoint
+except ImportError:
+    load_pdfs_from_db = get_db_connection = check_run_aborted = fetch_run_checkpoint = None
+
+YAML_JSON_CACHE_DIRNAME = "yaml_cache"  # under the state dir; the cached config includes credentials
+YAML_READ_BUFFER_BYTES = 1 << 20
+
+
+def _yaml_json_cache_path(path):
+    """JSON cache file for a YAML config path (state dir, keyed by the resolved path)"""
+    key = hashlib.blake2b(path.encode('utf-8'), digest_size=16).hexdigest()
+    return ensure_dir(get_state_dir() / YAML_JSON_CACHE_DIRNAME) / f"{key}.json"
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_yaml_file(path, mtime_ns, size):
+    """Parse a YAML file once per (path, mtime, size); callers get copies via load_yaml_config()
+
+    A JSON copy in the state dir (owner-only, 0600: it holds the Salesforce password) is used
+    instead of the YAML when the mtime_ns and size it recorded match the YAML exactly, and is
+    rewritten atomically after a fresh YAML parse. Configs that don't survive a JSON round trip
+    (non-string keys, dates) are never cached on disk.
+    """
+    try:
+        sidecar = _yaml_json_cache_path(path)
+        with open(sidecar, 'rb') as f:
+            cached = json.load(f)
+        if cached.get('yaml_mtime_ns') == mtime_ns and cached.get('yaml_size') == size:
+            return cached['config']
+    except (OSError, ValueError, AttributeError, KeyError):
+        pass
+    import yaml  # Imported on a cache miss only
+    # libyaml-backed loader when PyYAML was built with it; pure-Python SafeLoader otherwise
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    # Binary stream: the loader detects the encoding itself, skipping a TextIOWrapper decode pass
+    with open(path, 'rb', buffering=YAML_READ_BUFFER_BYTES) as f:
+        parsed = yaml.load(f, Loader=loader)
+    try:
+        serialized = json.dumps(parsed)
+        if json.loads(serialized) == parsed:
+            sidecar_data = {'yaml_mtime_ns': mtime_ns, 'yaml_size': size, 'config': parsed}
+            _write_state_file(_yaml_json_cache_path(path), json.dumps(sidecar_data).encode('utf-8'), private=True)
+    except (OSError, TypeError, ValueError):
+        pass
+    return parsed
+
+
+def load_yaml_config(yaml_path):
+    """Load a YAML config, reusing the cached parse while the file is unchanged (returns a mutable copy)"""
+    path = str(Path(yaml_path).resolve())
+    st = os.stat(path)
+    return copy.deepcopy(_parse_yaml_file(path, st.st_mtime_ns, st.st_size))
+
+
+def _state_loads(data):
+    """Decode state JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+_ORJSON_STATE_OPTIONS = (orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+def _state_dumps(state):
+    """Encode a state dict as indented JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(state, option=_ORJSON_STATE_OPTIONS)
+    return json.dumps(state, indent=2).encode('utf-8')
+
+
+def _write_state_file(path, data, private=False):
+    """Write state bytes to a sibling temp file and atomically swap it in, so a crash mid-write
+    never leaves a truncated state file for resume to trip over. private=True makes it owner-only (0600)."""
+    tmp_path = path.with_name(path.name + '.tmp')
+    if private:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o600)  # O_CREAT mode does not apply when the temp file already existed
+    else:
+        tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_json_file(path, mtime_ns, size):
+    """Parse a JSON state file once per (path, mtime, size)"""
+    return _state_loads(Path(path).read_bytes())
+
+
+def read_state_file(path):
+    """Read a cycle/run state JSON file, skipping the re-parse when it has not changed on disk.
+    A yaml_config_hash reference is resolved back into yaml_config_snapshot."""
+    st = os.stat(path)
+    state = copy.deepcopy(_parse_json_file(str(path), st.st_mtime_ns, st.st_size))
+    config_hash = state.get('yaml_config_hash') if isinstance(state, dict) else None
+    if config_hash and 'yaml_config_snapshot' not in state:
+        try:
+            state['yaml_config_snapshot'] = read_state_file(yaml_snapshot_path(config_hash))
+        except (OSError, ValueError) as e:
+            log_print(f"  ⚠️  Warning: YAML config snapshot {config_hash} unavailable: {e}")
+            state['yaml_config_snapshot'] = None
+    return state
+
+
+# State files reference the run's frozen YAML config by content hash; the config itself is written
+# once to state/yaml/<hash>.json instead of being re-serialized into every checkpoint.
+YAML_SNAPSHOT_DIRNAME = "yaml"
+
+# id(snapshot) -> (snapshot, hash) for snapshots already written by this process
+_YAML_SNAPSHOT_REFS = {}
+_YAML_SNAPSHOT_REFS_MAX = 8
+
+
+def yaml_snapshot_path(config_hash):
+    """Path of the stored YAML config snapshot for a content hash"""
+    return ensure_dir(get_state_dir() / YAML_SNAPSHOT_DIRNAME) / f"{config_hash}.json"
+
+
+def _yaml_snapshot_ref(snapshot):
+    """Store a YAML config snapshot once and return its content hash (snapshots are frozen for the run)"""
+    cached = _YAML_SNAPSHOT_REFS.get(id(snapshot))
+    if cached is not None and cached[0] is snapshot:
+        return cached[1]
+    canonical = json.dumps(snapshot, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+    config_hash = hashlib.blake2b(canonical, digest_size=16).hexdigest()
+    path = yaml_snapshot_path(config_hash)
+    if not path.exists():
+        _write_state_file(path, _state_dumps(snapshot))
+    if len(_YAML_SNAPSHOT_REFS) >= _YAML_SNAPSHOT_REFS_MAX:
+        _YAML_SNAPSHOT_REFS.clear()
+    _YAML_SNAPSHOT_REFS[id(snapshot)] = (snapshot, config_hash)
+    return config_hash
+
+
+# In-process copy of every cycle archive written by save_state(), keyed on (run_id, cycle_number).
+# The cycle_*_state.json files stay the source of truth across restarts; entries are dropped when
+# the run ends (see _forget_run_state) so the long-lived worker doesn't accumulate them.
+_CYCLE_STATE_CACHE = {}
+
+# Latest non-empty proposed LLM parser prompt saved by this process: run_id -> (cycle_number, prompt);
+# dropped with the cycle cache when the run ends
+_LAST_PROPOSED_PROMPT = {}
+
+class StageStatus(StrEnum):
+    """Stage Status values the workflow acts on. Members are str, so Excel cells, state files and
+    progress payloads keep the plain strings they always had."""
+    NEEDS_IMPROVEMENT = "needs_improvement"
+    OPTIMIZED = "optimized"
+    ROLLED_BACK = "rolled_back"
+    IN_PROGRESS = "in_progress"
+    ERROR = "error"
+
+
+def parse_stage_status(value):
+    """Map a Stage Status string (e.g. from Gemini) to StageStatus; unknown values are returned unchanged"""
+    try:
+        return StageStatus(value)
+    except ValueError:
+        return value
+
+
+# Section separators for workflow log output
+_RULE_DASH = "-" * 80
+_RULE_EQ = "=" * 80
+_SEP_DASH = "\n" + _RULE_DASH
+_SEP_EQ = "\n" + _RULE_EQ
 
 # Helper function for immediate output flushing
 def log_print(*args, **kwargs):
@@ -37,12 +210,71 @@ def log_print(*args, **kwargs):
     print(*args, **kwargs, flush=True)
 
 
+# Background worker for next-cycle setup that overlaps the pause between cycles
+_cycle_prefetcher = None
+
+
+def prefetch_salesforce_session(username, password, instance_url):
+    """Start authenticating to Salesforce in the background; returns a Future of (instance_url, access_token)"""
+    from salesforce_api import get_salesforce_credentials
+    global _cycle_prefetcher
+    if _cycle_prefetcher is None:
+        _cycle_prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cycle-prefetch')
+    return _cycle_prefetcher.submit(get_salesforce_credentials, username=username, password=password, instance_url=instance_url)
+
+
+def shutdown_cycle_prefetcher():
+    """Stop the prefetch worker thread (a later prefetch starts a new one)"""
+    global _cycle_prefetcher
+    if _cycle_prefetcher is not None:
+        _cycle_prefetcher.shutdown(wait=False, cancel_futures=True)
+        _cycle_prefetcher = None
+
+
+def _notify(progress_callback, status, run_id, cycle, step=None, message=None, **extra):
+    """Send a status dict to the progress callback; a missing or failing callback never stops the workflow"""
+    if progress_callback is None:
+        return
+    payload = {'status': status, 'cycle': cycle, 'run_id': run_id}
+    if step is not None:
+        payload['step'] = step
+    if message is not None:
+        payload['message'] = message
+    payload.update(extra)
+    try:
+        progress_callback(payload)
+    except Exception:
+        pass  # Don't fail if callback errors
+
+
+INTER_CYCLE_WAIT_SECONDS = 5  # Pause between refinement cycles
+
+EXCEL_CELL_MAX_CHARS = 50000  # Excel cell content limit
+
+
+def _excel_cell(value: str) -> str:
+    """Truncate a string to the Excel cell limit, returning it untouched when it already fits"""
+    return value if len(value) <= EXCEL_CELL_MAX_CHARS else value[:EXCEL_CELL_MAX_CHARS]
+
+
 # ============================================================================
 # STATE MANAGEMENT: Resume/Checkpoint Support
 # ============================================================================
 
+# Directories already created by this process (the worker runs many workflows per process)
+_CREATED_DIRS = set()
+
+def ensure_dir(path):
+    """mkdir -p, skipped after the first successful call for the same path in this process"""
+    if path in _CREATED_DIRS:
+        return path
+    path.mkdir(parents=True, exist_ok=True)
+    _CREATED_DIRS.add(path)
+    return path
+
+@functools.lru_cache(maxsize=1)
 def get_state_dir():
-    """Get the state directory path, create if it doesn't exist"""
+    """Get the state directory path, create if it doesn't exist (resolved once per process)"""
     # Use app_data/state structure (relative to script)
     app_data = Path(__file__).parent / "app_data"
     app_data.mkdir(exist_ok=True)
@@ -50,6 +282,13 @@ def get_state_dir():
     state_dir.mkdir(exist_ok=True)
     return state_dir
 
+@functools.lru_cache(maxsize=256)
+def cycle_state_path(cycle_number, run_id=None):
+    """Path of a cycle's archived state file (run-specific when run_id provided)"""
+    if run_id:
+        return get_state_dir() / f"run_{run_id}_cycle_{cycle_number}_state.json"
+    return get_state_dir() / f"cycle_{cycle_number}_state.json"
+
 def check_index_lock(search_index_id):
     """Check if an index is already being processed by another run"""
     state_dir = get_state_dir()
@@ -189,10 +428,15 @@ def save_state(cycle_number, last_completed_step, sheet_name, refinement_stage,
                proposed_response_prompt=None, stage_complete_reason=None,
                excel_file=None, run_id=None, yaml_config_snapshot=None,
                step_1_substep=None, step_1_index_id=None, step_1_index_name=None,
-               step_1_retriever_name=None, step_1_retriever_api_name=None):
+               step_1_retriever_name=None, step_1_retriever_api_name=None,
+               background=False):
     """
     Save workflow state to JSON file.
 
+    With background=True the file writes are queued on a single writer thread and the call returns
+    immediately (the in-memory cycle cache is still updated synchronously). Synchronous saves first
+    wait for any queued writes, so an older background write can never overwrite a newer state.
+
     Step 1 substeps for resume:
       - 'index_created': Index created via API, not yet READY
       - 'index_ready': Index reached READY status
@@ -233,22 +477,94 @@ def save_state(cycle_number, last_completed_step, sheet_name, refinement_stage,
     }
     
     # Also save cycle-specific archive (run-specific when run_id provided)
-    if run_id:
-        archive_file = state_dir / f"run_{run_id}_cycle_{cycle_number}_state.json"
+    archive_file = cycle_state_path(cycle_number, run_id)
+    _CYCLE_STATE_CACHE[(run_id, cycle_number)] = state
+    if proposed_llm_parser_prompt:
+        last = _LAST_PROPOSED_PROMPT.get(run_id)
+        if last is None or cycle_number >= last[0]:
+            _LAST_PROPOSED_PROMPT[run_id] = (cycle_number, proposed_llm_parser_prompt)
+    if background:
+        global _state_writer, _last_state_write
+        if _state_writer is None:
+            _state_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='state-writer')
+        _last_state_write = _state_writer.submit(_persist_state, state, archive_file, state_file, background=True)
     else:
-        archive_file = state_dir / f"cycle_{cycle_number}_state.json"
+        flush_state_writes()
+        _persist_state(state, archive_file, state_file)
+
+# Single background writer for save_state(background=True); one worker keeps writes in order
+_state_writer = None
+_last_state_write = None
+
+def _persist_state(state, archive_file, state_file, background=False):
+    """Encode a state dict and write the cycle archive plus the current/run state file"""
+    snapshot = state.get('yaml_config_snapshot')
+    if isinstance(snapshot, dict):
+        try:
+            config_hash = _yaml_snapshot_ref(snapshot)
+            state = {k: v for k, v in state.items() if k != 'yaml_config_snapshot'}
+            state['yaml_config_hash'] = config_hash
+        except Exception as e:
+            log_print(f"  ⚠️  Warning: Could not store YAML config snapshot, embedding it in the state file: {e}")
+    state_bytes = _state_dumps(state)
     try:
-        with open(archive_file, 'w') as f:
-            json.dump(state, f, indent=2)
+        _write_state_file(archive_file, state_bytes)
         log_print(f"  💾 Cycle-specific state saved: {archive_file.name}")
     except Exception as e:
         log_print(f"  ⚠️  Warning: Could not save cycle-specific state: {e}")
     
     # Save current/run state
-    with open(state_file, 'w') as f:
-        json.dump(state, f, indent=2)
+    try:
+        _write_state_file(state_file, state_bytes)
+    except Exception as e:
+        if not background:
+            raise
+        log_print(f"  ⚠️  Warning: Background state save failed: {e}")
+        return
     
-    log_print(f"  💾 State saved: cycle {cycle_number}, step {last_completed_step}")
+    log_print(f"  💾 State saved: cycle {state['cycle_number']}, step {state['last_completed_step']}")
+
+def flush_state_writes():
+    """Block until all queued background state writes are on disk. A failed background write is
+    reported once and then forgotten, so it doesn't resurface on every later save/load."""
+    global _last_state_write
+    future, _last_state_write = _last_state_write, None
+    if future is None:
+        return
+    try:
+        future.result()
+    except Exception as e:
+        log_print(f"  ⚠️  Warning: Background state save failed: {e}")
+
+def load_cycle_state(cycle_number, run_id=None):
+    """Return the archived state for a cycle - from memory when this process saved it, else from its
+    state file. Returns None when no archive exists."""
+    cached = _CYCLE_STATE_CACHE.get((run_id, cycle_number))
+    if cached is not None:
+        return copy.deepcopy(cached)
+    try:
+        return read_state_file(cycle_state_path(cycle_number, run_id))
+    except FileNotFoundError:
+        return None
+
+def _forget_run_state(run_id):
+    """Drop a run's entries from the in-process state caches (the state files are kept)"""
+    for key in [k for k in _CYCLE_STATE_CACHE if k[0] == run_id]:
+        del _CYCLE_STATE_CACHE[key]
+    _LAST_PROPOSED_PROMPT.pop(run_id, None)
+
+def _archived_cycle_numbers(run_id=None):
+    """Cycle numbers that have an archive, from the in-memory cache plus a single scan of the state dir"""
+    prefix = f"run_{run_id}_cycle_" if run_id else "cycle_"
+    cycles = {c for (r, c) in _CYCLE_STATE_CACHE if r == run_id}
+    with os.scandir(get_state_dir()) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith(prefix) and name.endswith("_state.json"):
+                number = name[len(prefix):-len("_state.json")]
+                if number.isdigit():
+                    cycles.add(int(number))
+    return cycles
 
 def _get_state_instance_url(state):
     """Extract instance_url from state (supports legacy state without top-level instance_url)."""
@@ -266,14 +582,14 @@ def _sites_match(current_url, state_url):
 def load_state(resume_from_step=None, resume_from_cycle=None, run_id=None, instance_url=None, prompt_template_name=None):
     """Load workflow state from JSON file. Filters by instance_url (site isolation)
     and prompt_template_name (pipeline isolation) when provided."""
+    flush_state_writes()
     state_dir = get_state_dir()
 
     def _load_and_validate(path):
         if not path or not path.exists():
             return None
         try:
-            with open(path, 'r') as f:
-                state = json.load(f)
+            state = read_state_file(path)
             if instance_url:
                 state_url = _get_state_instance_url(state)
                 if not _sites_match(instance_url, state_url):
@@ -306,8 +622,7 @@ def load_state(resume_from_step=None, resume_from_cycle=None, run_id=None, insta
     candidates = []
     for p in state_files:
         try:
-            with open(p, 'r') as f:
-                s = json.load(f)
+            s = read_state_file(p)
             if instance_url:
                 state_url = _get_state_instance_url(s)
                 if not _sites_match(instance_url, state_url):
@@ -329,6 +644,8 @@ def load_state(resume_from_step=None, resume_from_cycle=None, run_id=None, insta
 
 def validate_state(state, excel_file):
     """Validate that state is consistent with Excel file"""
+    import pandas as pd
+    
     if not state:
         return False, "No state to validate"
     
@@ -383,6 +700,9 @@ def validate_state(state, excel_file):
 
 def clean_state():
     """Delete all state files"""
+    flush_state_writes()
+    _CYCLE_STATE_CACHE.clear()
+    _LAST_PROPOSED_PROMPT.clear()
     state_dir = get_state_dir()
     state_file = state_dir / "current_state.json"
     
@@ -395,8 +715,26 @@ def clean_state():
         archive_file.unlink()
         log_print(f"  🗑️  Deleted {archive_file.name}")
     
+    _prune_yaml_snapshots()
     log_print("  ✅ State files cleaned")
 
+def _prune_yaml_snapshots():
+    """Delete stored YAML config snapshots that no remaining state file references"""
+    state_dir = get_state_dir()
+    referenced = set()
+    for path in state_dir.glob("*_state.json"):
+        try:
+            config_hash = _state_loads(path.read_bytes()).get('yaml_config_hash')
+        except (OSError, ValueError, AttributeError):
+            continue
+        if config_hash:
+            referenced.add(config_hash)
+    _YAML_SNAPSHOT_REFS.clear()  # its hashes may point at files deleted below
+    for snapshot_file in (state_dir / YAML_SNAPSHOT_DIRNAME).glob("*.json"):
+        if snapshot_file.stem not in referenced:
+            snapshot_file.unlink(missing_ok=True)
+            log_print(f"  🗑️  Deleted YAML config snapshot {snapshot_file.name}")
+
 def show_state():
     """Display current state without resuming"""
     state = load_state()
@@ -428,12 +766,27 @@ def extract_results_from_sheet(excel_file, sheet_name):
         dict with keys: timestamp, pass_count, fail_count, total, pass_rate, 
         avg_safety, stage_status, question_results
     """
-    from datetime import datetime
     import pandas as pd
     
     try:
         df = pd.read_excel(excel_file, sheet_name=sheet_name, header=None)
-        
+    except Exception as e:
+        log_print(f"  ⚠️  Error extracting results from sheet: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+    return extract_results_from_frame(df, sheet_name)
+
+
+def extract_results_from_frame(df, sheet_name):
+    """
+    Same as extract_results_from_sheet, for a cycle sheet already loaded with header=None
+    (analyze_with_gemini uses this on the frame it just wrote instead of re-reading the workbook).
+    """
+    from datetime import datetime
+    import pandas as pd
+    
+    try:
         # Find header row
         header_row_idx = None
         for idx in range(min(20, len(df))):
@@ -446,18 +799,18 @@ def extract_results_from_sheet(excel_file, sheet_name):
             log_print(f"  ⚠️  Could not find header row in sheet {sheet_name}")
             return None
         
-        # Read data starting from header row
-        data_df = pd.read_excel(excel_file, sheet_name=sheet_name, header=header_row_idx)
-        
-        # Find columns
+        # Find columns in the header row (last Pass/Fail / Safety Score match wins, first Q#)
         pf_col = None
         safety_col = None
-        for col in data_df.columns:
-            col_str = str(col).lower()
+        q_col = None
+        for col_idx, header in enumerate(df.iloc[header_row_idx].values):
+            col_str = str(header).lower()
             if 'pass/fail' in col_str:
-                pf_col = col
+                pf_col = col_idx
             elif 'safety score' in col_str:
-                safety_col = col
+                safety_col = col_idx
+            if q_col is None and str(header).strip() == 'Q#':
+                q_col = col_idx
         
         if pf_col is None:
             log_print(f"  ⚠️  Could not find Pass/Fail column in sheet {sheet_name}")
@@ -470,14 +823,7 @@ def extract_results_from_sheet(excel_file, sheet_name):
         safety_scores = []
         question_results = []
         
-        # Find Q# column
-        q_col = None
-        for col in data_df.columns:
-            if str(col).strip() == 'Q#':
-                q_col = col
-                break
-        
-        for idx, row in data_df.iterrows():
+        for row in df.iloc[header_row_idx + 1:].itertuples(index=False, name=None):
             pf_val = str(row[pf_col]).upper() if pd.notna(row[pf_col]) else ''
             if 'PARTIAL' in pf_val or '🔶' in pf_val:
                 partial_count += 1
@@ -491,7 +837,7 @@ def extract_results_from_sheet(excel_file, sheet_name):
             else:
                 continue
             
-            if safety_col and pd.notna(row[safety_col]):
+            if safety_col is not None and pd.notna(row[safety_col]):
                 try:
                     score = float(row[safety_col])
                     safety_scores.append(score)
@@ -500,7 +846,7 @@ def extract_results_from_sheet(excel_file, sheet_name):
             
             # Get question number
             q_number = None
-            if q_col and pd.notna(row[q_col]):
+            if q_col is not None and pd.notna(row[q_col]):
                 q_number = str(row[q_col]).strip()
             
             if q_number:
@@ -514,14 +860,14 @@ def extract_results_from_sheet(excel_file, sheet_name):
         avg_safety = sum(safety_scores) / len(safety_scores) if safety_scores else 0
         
         # Get stage status from sheet metadata
-        stage_status = 'needs_improvement'  # Default
+        stage_status = StageStatus.NEEDS_IMPROVEMENT  # Default
         try:
             for idx in range(min(10, len(df))):
                 cell_val = str(df.iloc[idx, 0]) if pd.notna(df.iloc[idx, 0]) else ''
                 if 'Stage Status' in cell_val and idx + 1 < len(df):
                     status_val = df.iloc[idx, 1]
                     if pd.notna(status_val):
-                        stage_status = str(status_val).strip()
+                        stage_status = parse_stage_status(str(status_val).strip())
                         break
         except:
             pass
@@ -568,6 +914,8 @@ def analyze_with_gemini(excel_file, sheet_name, pdf_files=None, model_name=None,
         rejection_context: Dict with rejection reason from a previous attempt (for retry-with-constraints).
             Keys: reason (str), and context-specific fields (regressions, protected_questions, max_allowed, etc.)
     """
+    import pandas as pd
+    
     # Handle backward compatibility: if pdf_files is a string, convert to list
     if pdf_files and isinstance(pdf_files, (str, Path)):
         pdf_files = [Path(pdf_files)]
@@ -682,6 +1030,7 @@ def analyze_with_gemini(excel_file, sheet_name, pdf_files=None, model_name=None,
     GEMINI_TIMEOUT_SECONDS = 180  # 3 minutes timeout
     GEMINI_UPLOAD_MAX_ATTEMPTS = 5  # retry up to 5 times per file
     GEMINI_UPLOAD_RETRY_DELAY_SEC = 5  # wait between retries
+    from gemini_client import genai  # Imported on first use: google-generativeai is slow to import
     genai.configure(api_key=api_key)
     
     # Upload all PDF files if provided
@@ -1226,7 +1575,7 @@ def analyze_with_gemini(excel_file, sheet_name, pdf_files=None, model_name=None,
                         log_print(f"  ✓ Added row {len(df) - 1} (Excel row {len(df)}) to accommodate Instructions value")
                     
                     # Write to row idx+1, column 1 (Excel row idx+2, column B)
-                    instructions_str = str(full_gemini_instructions)[:50000]  # Limit to 50k chars for Excel
+                    instructions_str = _excel_cell(str(full_gemini_instructions))
                     df.iloc[idx + 1, 1] = instructions_str
                     log_print(f"  ✅ Written Instructions to Gemini to metadata row {idx + 1} (Excel row {idx + 2}, column B)")
                     log_print(f"     Written {len(instructions_str):,} characters (BEFORE Gemini call)")
@@ -1332,46 +1681,17 @@ def analyze_with_gemini(excel_file, sheet_name, pdf_files=None, model_name=None,
         except json.JSONDecodeError as e:
             log_print(f"  ⚠️  JSON parsing error: {e}")
             log_print(f"  🔍 Attempting to fix JSON...")
-            # Try to fix common JSON issues
             json_str = json_array_match.group(0)
             
-            # Fix unescaped newlines, quotes, and other control characters in string values
-            # This is a more aggressive fix that handles common JSON issues from LLM responses
-            def fix_json_string(match):
-                content = match.group(1)
-                # Escape newlines, carriage returns, tabs
-                content = content.replace('\\', '\\\\')  # Escape backslashes first
-                content = content.replace('\n', '\\n')
-                content = content.replace('\r', '\\r')
-                content = content.replace('\t', '\\t')
-                content = content.replace('"', '\\"')  # Escape quotes
-                return f'"{content}"'
-            
-            # Try multiple fix strategies
+            # json_repair is built for LLM-emitted JSON: unescaped quotes/newlines,
+            # trailing commas and truncated arrays are repaired in a single pass
+            # (and true/false/null stay valid, unlike ast.literal_eval)
             try:
-                # Strategy 1: Use json5 or manual fixing for common issues
-                # Replace problematic characters in string values
-                fixed_str = json_str
-                # Fix unescaped quotes within strings (basic approach)
-                # This is tricky - we'll try a simpler approach: use ast.literal_eval as fallback
-                import ast
-                try:
-                    # Try using ast.literal_eval which is more lenient
-                    results = ast.literal_eval(json_str)
-                    log_print(f"  ✅ Fixed JSON using ast.literal_eval")
-                except:
-                    # Strategy 2: Try to extract just the array content and rebuild
-                    # Find the content between first [ and last ]
-                    start_idx = json_str.find('[')
-                    end_idx = json_str.rfind(']')
-                    if start_idx >= 0 and end_idx > start_idx:
-                        array_content = json_str[start_idx+1:end_idx]
-                        # Try to parse as Python list literal
-                        try:
-                            results = ast.literal_eval('[' + array_content + ']')
-                            log_print(f"  ✅ Fixed JSON by extracting array content")
-                        except:
-                            raise
+                import json_repair
+                results = json_repair.loads(json_str)
+                if not isinstance(results, list):
+                    raise ValueError(f"Repaired JSON is {type(results).__name__}, expected array")
+                log_print(f"  ✅ Fixed JSON using json_repair")
             except Exception as fix_error:
                 log_print(f"  ❌ Could not fix JSON: {fix_error}")
                 log_print(f"  📄 Raw JSON string (first 1000 chars):")
@@ -1385,7 +1705,10 @@ def analyze_with_gemini(excel_file, sheet_name, pdf_files=None, model_name=None,
     proposed_agentforce_config = ""
     if refinement_stage == "response_prompt":
         # Look for JSON object that contains both proposed prompts
-        json_object_match = re.search(r'\{[^{}]*"LLM_Parser_Prompt_Proposed_from_Gemini"[^}]*"Prompt_Builder_Prompt_Proposed_from_Gemini"[^}]*\}', response_text, re.DOTALL)
+        # (cheap substring check first - the combined pattern backtracks heavily on long responses)
+        json_object_match = None
+        if '"Prompt_Builder_Prompt_Proposed_from_Gemini"' in response_text and '"LLM_Parser_Prompt_Proposed_from_Gemini"' in response_text:
+            json_object_match = re.search(r'\{[^{}]*"LLM_Parser_Prompt_Proposed_from_Gemini"[^}]*"Prompt_Builder_Prompt_Proposed_from_Gemini"[^}]*\}', response_text, re.DOTALL)
         # If not found together, try to find them separately
         if not json_object_match:
             json_object_match = re.search(r'\{[^{}]*"LLM_Parser_Prompt_Proposed_from_Gemini"[^}]*\}', response_text, re.DOTALL)
@@ -1413,9 +1736,14 @@ def analyze_with_gemini(excel_file, sheet_name, pdf_files=None, model_name=None,
                     stage_complete_reason = reason_match.group(1)
     elif refinement_stage == "agentforce_agent":
         # Look for JSON object that contains all three proposed configurations
-        json_object_match = re.search(r'\{[^{}]*"LLM_Parser_Prompt_Proposed_from_Gemini"[^}]*"Prompt_Builder_Prompt_Proposed_from_Gemini"[^}]*"Agentforce_Agent_Configuration_Proposed_from_Gemini"[^}]*\}', response_text, re.DOTALL)
+        # (skip both patterns outright when the agent key is absent - neither can match)
+        json_object_match = None
+        has_agentforce_key = '"Agentforce_Agent_Configuration_Proposed_from_Gemini"' in response_text
+        if (has_agentforce_key and '"Prompt_Builder_Prompt_Proposed_from_Gemini"' in response_text
+                and '"LLM_Parser_Prompt_Proposed_from_Gemini"' in response_text):
+            json_object_match = re.search(r'\{[^{}]*"LLM_Parser_Prompt_Proposed_from_Gemini"[^}]*"Prompt_Builder_Prompt_Proposed_from_Gemini"[^}]*"Agentforce_Agent_Configuration_Proposed_from_Gemini"[^}]*\}', response_text, re.DOTALL)
         # If not found together, try to find them separately
-        if not json_object_match:
+        if not json_object_match and has_agentforce_key:
             json_object_match = re.search(r'\{.*?"Agentforce_Agent_Configuration_Proposed_from_Gemini".*?\}', response_text, re.DOTALL)
         if json_object_match:
             try:
@@ -1468,24 +1796,22 @@ def analyze_with_gemini(excel_file, sheet_name, pdf_files=None, model_name=None,
     # Find the first data row (after header row)
     data_start_row = header_row_idx + 1 if header_row_idx is not None else 7
     
-    for i, result in enumerate(results):
-        # Calculate the actual row index in the DataFrame
-        row_idx = data_start_row + i
-        if row_idx >= len(df):
-            log_print(f"  ⚠️  Warning: Result {i} exceeds DataFrame length, skipping")
-            break
-        
-        # Update using column indices
-        if 'Pass/Fail' in result and col_indices['Pass/Fail'] is not None:
-            df.iloc[row_idx, col_indices['Pass/Fail']] = result['Pass/Fail']
-        if 'Safety Score' in result and col_indices['Safety Score'] is not None:
-            df.iloc[row_idx, col_indices['Safety Score']] = result['Safety Score']
-        if 'Root Cause/Explanation' in result and col_indices['Root Cause/Explanation'] is not None:
-            df.iloc[row_idx, col_indices['Root Cause/Explanation']] = result['Root Cause/Explanation']
-        if 'Prompt Modification Next Version' in result and col_indices['Prompt Modification Next Version'] is not None:
-            df.iloc[row_idx, col_indices['Prompt Modification Next Version']] = result['Prompt Modification Next Version']
-    
-    log_print(f"  ✅ Updated {min(len(results), len(df) - data_start_row)} rows with analysis results")
+    num_rows = max(0, min(len(results), len(df) - data_start_row))
+    if num_rows < len(results):
+        log_print(f"  ⚠️  Warning: Result {num_rows} exceeds DataFrame length, skipping")
+    rows = results[:num_rows]
+    
+    # One slice assignment per column instead of one scalar write per cell.
+    # Results missing a key keep whatever the sheet already had in that cell.
+    for key, col_idx in col_indices.items():
+        if col_idx is None or not any(key in result for result in rows):
+            continue
+        current = df.iloc[data_start_row:data_start_row + num_rows, col_idx].tolist()
+        df.iloc[data_start_row:data_start_row + num_rows, col_idx] = [
+            result.get(key, existing) for result, existing in zip(rows, current)
+        ]
+    
+    log_print(f"  ✅ Updated {num_rows} rows with analysis results")
     
     # Update Stage Status in top metadata rows (rows 3-4)
     if stage_status or stage_complete_reason:
@@ -1499,7 +1825,7 @@ def analyze_with_gemini(excel_file, sheet_name, pdf_files=None, model_name=None,
                         log_print(f"  ✅ Updated Stage Status: {stage_status}")
                     # Update Stage Status Reason (row idx+1, column 1)
                     if stage_complete_reason:
-                        df.iloc[idx + 1, 1] = stage_complete_reason[:50000]  # Limit to 50k chars for Excel
+                        df.iat[idx + 1, 1] = _excel_cell(stage_complete_reason)
                         log_print(f"  ✅ Updated Stage Status Reason (length: {len(stage_complete_reason)} chars)")
                 break
     
@@ -1512,7 +1838,7 @@ def analyze_with_gemini(excel_file, sheet_name, pdf_files=None, model_name=None,
         for idx in range(len(df)):
             if str(df.iloc[idx, 0]).strip() == 'LLM Parser Prompt Proposed from Gemini:':
                 if idx + 1 < len(df):
-                    df.iloc[idx + 1, 1] = proposed_llm_parser_prompt[:50000]  # Limit to 50k chars for Excel
+                    df.iat[idx + 1, 1] = _excel_cell(proposed_llm_parser_prompt)
                     log_print(f"  ✅ Updated metadata row {idx + 1} with proposed LLM Parser Prompt")
                 break
     
@@ -1522,7 +1848,7 @@ def analyze_with_gemini(excel_file, sheet_name, pdf_files=None, model_name=None,
         for idx in range(len(df)):
             if str(df.iloc[idx, 0]).strip() == 'Prompt Builder Prompt Proposed from Gemini:':
                 if idx + 1 < len(df):
-                    df.iloc[idx + 1, 1] = proposed_response_prompt[:50000]  # Limit to 50k chars for Excel
+                    df.iat[idx + 1, 1] = _excel_cell(proposed_response_prompt)
                     log_print(f"  ✅ Updated metadata row {idx + 1} with proposed Prompt Builder Prompt")
                 break
     elif refinement_stage != "response_prompt":
@@ -1534,7 +1860,7 @@ def analyze_with_gemini(excel_file, sheet_name, pdf_files=None, model_name=None,
         for idx in range(len(df)):
             if str(df.iloc[idx, 0]).strip() == 'Agentforce Agent Configuration Proposed from Gemini:':
                 if idx + 1 < len(df):
-                    df.iloc[idx + 1, 1] = proposed_agentforce_config[:50000]  # Limit to 50k chars for Excel
+                    df.iat[idx + 1, 1] = _excel_cell(proposed_agentforce_config)
                     log_print(f"  ✅ Updated metadata row {idx + 1} with proposed Agentforce Agent Configuration")
                 break
     elif refinement_stage != "agentforce_agent":
@@ -1572,12 +1898,72 @@ def analyze_with_gemini(excel_file, sheet_name, pdf_files=None, model_name=None,
     return {
         'proposed_llm_parser_prompt': proposed_llm_parser_prompt,
         'proposed_response_prompt': proposed_response_prompt,
-        'stage_status': stage_status,
+        'stage_status': parse_stage_status(stage_status),
         'stage_complete_reason': stage_complete_reason,
-        'sheet_name': sheet_name  # Same sheet, updated with analysis
+        'sheet_name': sheet_name,  # Same sheet, updated with analysis
+        'results_data': extract_results_from_frame(df, sheet_name)  # Summary of the sheet as saved above
     }
 
 
+# Per-step wording for _handle_step_failure: (step name, what the workflow needs, possible solutions)
+_STEP_FAILURE_TEXT = {
+    1: ("Search Index and Retriever Creation", "creating the search index and retriever", (
+        "Ensure Playwright browsers are installed: 'playwright install chromium'",
+        "Check network connectivity to Salesforce",
+        "Verify search index ID and credentials are correct",
+    )),
+    2: ("Testing Index & Invoking Prompts", "testing the index and invoking prompts", (
+        "Check Salesforce credentials and connectivity",
+        "Verify search index ID and prompt template API name are correct",
+        "Ensure test questions are properly formatted",
+    )),
+    3: ("Analyzing Results with Gemini", "analyzing results", (
+        "Check Gemini API key is set correctly",
+        "Verify network connectivity to Gemini API",
+        "Check that the Excel sheet was created correctly in Step 2",
+    )),
+}
+
+
+def _handle_step_failure(step, detail, *, progress_callback, run_id, cycle_number, refinement_stage,
+                         excel_file, yaml_config, sheet_name=None, log_detail=None, notify_message=None,
+                         notify_error=None, reason_detail=None):
+    """Log, report and checkpoint a failed workflow step; returns the RuntimeError that stops the run"""
+    step_name, needs, solutions = _STEP_FAILURE_TEXT[step]
+    log_print(f"\n❌ Step {step} Failed: {log_detail or detail}")
+    
+    # Progress callback - report error
+    _notify(progress_callback, 'error', run_id, cycle_number, step,
+            notify_message or f"Step {step} Failed: {detail}", error=notify_error or detail)
+    
+    log_print(f"\n❌ CRITICAL ERROR: Step {step} ({step_name}) failed.")
+    log_print(f"❌ The workflow cannot continue without successfully {needs}.")
+    log_print("❌ This is a critical step and cannot be skipped.")
+    log_print(f"❌ Error details: {detail}")
+    log_print("\n💡 Possible solutions:")
+    for number, solution in enumerate(solutions, start=1):
+        log_print(f"   {number}. {solution}")
+    log_print(f"   {len(solutions) + 1}. Review the full error message above for specific issues")
+    
+    # Save error state
+    save_state(
+        cycle_number=cycle_number,
+        last_completed_step=step - 1,
+        sheet_name=sheet_name,
+        refinement_stage=refinement_stage,
+        stage_status=StageStatus.ERROR,
+        proposed_llm_parser_prompt=None,
+        proposed_response_prompt=None,
+        stage_complete_reason=f"Step {step} failed: {reason_detail or detail}",
+        excel_file=excel_file,
+        run_id=run_id,
+        yaml_config_snapshot=yaml_config
+    )
+    
+    # Stop the workflow - don't continue
+    return RuntimeError(f"Step {step} ({step_name}) failed: {detail}. Workflow stopped.")
+
+
 # ============================================================================
 # MAIN
 # ============================================================================
@@ -1612,9 +1998,13 @@ def run_full_workflow(excel_file=None, pdf_file=None, model_name=None, yaml_inpu
         clean_state()
         log_print("  ✅ Starting fresh workflow")
     
-    log_print("="*80)
+    # Imported past the --show-state exit: pandas and openpyxl dominate the module's import time
+    import pandas as pd
+    from excel_io import create_analysis_sheet_with_prompts, update_run_summary_sheet
+    
+    log_print(_RULE_EQ)
     log_print("FULL ITERATIVE WORKFLOW: Complete Optimization Cycle")
-    log_print("="*80)
+    log_print(_RULE_EQ)
     
     # Read YAML configuration - accept dict or file path
     if yaml_config_dict:
@@ -1627,8 +2017,7 @@ def run_full_workflow(excel_file=None, pdf_file=None, model_name=None, yaml_inpu
             log_print(f"   Path: {yaml_path}")
             sys.exit(1)
         log_print(f"📋 Reading YAML configuration: {yaml_path}")
-        with open(yaml_path, 'r') as f:
-            yaml_config = yaml.safe_load(f)
+        yaml_config = load_yaml_config(yaml_path)
         log_print("  ✅ YAML config frozen for this run")
     else:
         log_print("❌ ERROR: Either yaml_input file or yaml_config_dict is REQUIRED for full workflow")
@@ -1638,13 +2027,16 @@ def run_full_workflow(excel_file=None, pdf_file=None, model_name=None, yaml_inpu
     questions_config = yaml_config.get('questions', [])
     log_print(f"  📋 Loaded {len(questions_config)} questions from YAML")
     
+    # Scalar settings parsed once; YAML values override the command line args
+    settings = WorkflowConfig.from_yaml(yaml_config, max_cycles=max_cycles, model_name=model_name)
+    
     # Get maxCycles from YAML (override command line arg if provided)
-    max_cycles = config.get('maxCycles', max_cycles)
-    min_cycles = config.get('minCycles', max_cycles)
+    max_cycles = settings.max_cycles
+    min_cycles = settings.min_cycles
     log_print(f"  ℹ️  Refinement cycles: min={min_cycles}, max={max_cycles}")
     
     # Get Gemini model from YAML (override command line arg if provided)
-    gemini_model = config.get('geminiModel', model_name)  # Use YAML value, fallback to command line arg
+    gemini_model = settings.gemini_model  # Use YAML value, fallback to command line arg
     if gemini_model != model_name:
         log_print(f"  ℹ️  Using Gemini model from YAML: {gemini_model} (overriding command line: {model_name})")
     else:
@@ -1655,12 +2047,12 @@ def run_full_workflow(excel_file=None, pdf_file=None, model_name=None, yaml_inpu
     pdf_files = []
     if run_id:
         try:
-            # Try worker_utils first (no Streamlit dependency), fallback to app
-            try:
-                from worker_utils import load_pdfs_from_db
-            except ImportError:
-                from app import load_pdfs_from_db
-            pdf_files_restored = load_pdfs_from_db(run_id)
+            # worker_utils first (no Streamlit dependency), fallback to app
+            if load_pdfs_from_db is not None:
+                pdf_files_restored = load_pdfs_from_db(run_id)
+            else:
+                from app import load_pdfs_from_db as app_load_pdfs_from_db
+                pdf_files_restored = app_load_pdfs_from_db(run_id)
             if pdf_files_restored:
                 pdf_files = [Path(p) for p in pdf_files_restored]
                 log_print(f"  📁 Loaded {len(pdf_files)} PDF file(s) from database")
@@ -1672,21 +2064,33 @@ def run_full_workflow(excel_file=None, pdf_file=None, model_name=None, yaml_inpu
     
     # If no PDFs from database, try filesystem (local only; Heroku uses DB)
     if not pdf_files:
-        pdf_directory = config.get('pdfDirectory', '')
+        pdf_directory = settings.pdf_directory
         if pdf_directory:
             pdf_dir_path = Path(pdf_directory).expanduser()
             if not pdf_dir_path.is_absolute():
                 log_print("❌ ERROR: pdfDirectory must be an absolute path for local runs. Example: /Users/you/project/inputs/pdf/RiteHite")
                 sys.exit(1)
             pdf_dir_path = pdf_dir_path.resolve()
-            if pdf_dir_path.exists() and pdf_dir_path.is_dir():
-                pdf_files = sorted(list(pdf_dir_path.glob('*.pdf')))
+            # One stat answers both "exists" and "is a directory"
+            try:
+                pdf_dir_mode = os.stat(pdf_dir_path).st_mode
+            except OSError:
+                pdf_dir_mode = None
+            if pdf_dir_mode is not None and stat.S_ISDIR(pdf_dir_mode):
+                # One readdir pass; DirEntry caches the file type so non-PDFs cost no extra stat
+                with os.scandir(pdf_dir_path) as entries:
+                    pdf_files = sorted(
+                        Path(entry.path) for entry in entries
+                        if entry.name.lower().endswith('.pdf') and entry.is_file()
+                    )
                 if pdf_files:
                     log_print(f"  📁 Found {len(pdf_files)} PDF file(s) in directory: {pdf_dir_path}")
                     for pdf_file in pdf_files:
                         log_print(f"     - {pdf_file.name}")
                 else:
                     log_print(f"  ⚠️  No PDF files found in directory: {pdf_dir_path}")
+            elif pdf_dir_mode is not None:
+                log_print(f"  ⚠️  pdfDirectory is not a directory: {pdf_dir_path}")
             else:
                 log_print(f"  ⚠️  PDF directory not found: {pdf_dir_path}")
         else:
@@ -1700,26 +2104,17 @@ def run_full_workflow(excel_file=None, pdf_file=None, model_name=None, yaml_inpu
         sys.exit(1)
 
     # Call progress callback if provided
-    if progress_callback:
-        try:
-            progress_callback({'status': 'starting', 'cycle': 0, 'step': 0, 'run_id': run_id})
-        except:
-            pass  # Don't fail if callback errors
+    _notify(progress_callback, 'starting', run_id, 0, 0)
     
     # Generate run_id if not provided (for backward compatibility)
-    import random
-    from datetime import datetime
     if not run_id:
         run_id = f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.randint(1000,9999)}"
     
     # Create run-specific Excel file path in app_data/outputs directory (relative to script)
-    app_data = Path(__file__).parent / "app_data"
-    app_data.mkdir(exist_ok=True)
-    outputs_dir = app_data / "outputs"
-    outputs_dir.mkdir(exist_ok=True)
+    outputs_dir = ensure_dir(Path(__file__).parent / "app_data" / "outputs")
     
     # Project name from YAML (used as Excel filename prefix); default for backward compatibility
-    project_name_raw = config.get('projectName', 'prompt_optimization')
+    project_name_raw = settings.project_name
     project_name_safe = re.sub(r'[^\w\-]', '_', str(project_name_raw).strip()).strip('_') or 'prompt_optimization'
     run_excel_file = outputs_dir / f"{project_name_safe}_{run_id}.xlsx"
     log_print(f"  ✅ Run ID: {run_id}")
@@ -1730,24 +2125,25 @@ def run_full_workflow(excel_file=None, pdf_file=None, model_name=None, yaml_inpu
     excel_file = str(run_excel_file)
     
     # Extract configuration values
-    prompt_template_name = config.get('promptTemplateApiName')  # API name (DeveloperName), not display name
-    search_index_id = config.get('searchIndexId')
-    refinement_stage = config.get('refinementStage', 'llm_parser')
-    salesforce_config = config.get('salesforce', {})
-    username = salesforce_config.get('username')
-    password = salesforce_config.get('password')
-    instance_url = salesforce_config.get('instanceUrl')
-    take_screenshots = config.get('takeScreenshots', False)
-    
-    if not prompt_template_name:
-        log_print("❌ ERROR: promptTemplateApiName is required in YAML configuration")
-        log_print("   This must be the DeveloperName (API name) with underscores, not the display name")
-        sys.exit(1)
-    if not search_index_id:
-        log_print("❌ ERROR: searchIndexId is required in YAML configuration")
-        sys.exit(1)
-    if not username or not password or not instance_url:
-        log_print("❌ ERROR: Salesforce credentials (username, password, instanceUrl) are required in YAML configuration")
+    prompt_template_name = settings.prompt_template_name  # API name (DeveloperName), not display name
+    search_index_id = settings.search_index_id
+    refinement_stage = settings.refinement_stage
+    username = settings.username
+    password = settings.password
+    instance_url = settings.instance_url
+    take_screenshots = settings.take_screenshots
+    
+    missing_keys = [key for key, value in (
+        ('promptTemplateApiName', prompt_template_name),
+        ('searchIndexId', search_index_id),
+        ('salesforce.username', username),
+        ('salesforce.password', password),
+        ('salesforce.instanceUrl', instance_url),
+    ) if not value]
+    if missing_keys:
+        log_print(f"❌ ERROR: Required YAML configuration missing: {', '.join(missing_keys)}")
+        if 'promptTemplateApiName' in missing_keys:
+            log_print("   promptTemplateApiName must be the DeveloperName (API name) with underscores, not the display name")
         sys.exit(1)
     
     # Extract questions list. When promptInputs is set, pass full dict per question so excel_io can use inputs for multi-input; else tuple (number, text, expectedAnswer).
@@ -1787,109 +2183,75 @@ def run_full_workflow(excel_file=None, pdf_file=None, model_name=None, yaml_inpu
     state = None
     resume_step = None
     if resume or resume_from_step or resume_from_cycle:
-        log_print("\n" + "-"*80)
+        log_print(_SEP_DASH)
         log_print("RESUME MODE: Loading checkpoint state")
-        log_print("-"*80)
+        log_print(_RULE_DASH)
         
         # First, try to load from database checkpoint_info if run_id is provided
         if run_id:
             try:
-                from worker_utils import get_db_connection
-                try:
-                    import psycopg2.extras
-                except ImportError:
-                    # Fallback if psycopg2.extras not available
-                    import psycopg2
-                    psycopg2.extras = None
-                conn = get_db_connection()
-                if conn:
-                    try:
-                        # Use RealDictCursor if available, otherwise regular cursor
-                        if psycopg2.extras:
-                            cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                row = fetch_run_checkpoint(run_id) if fetch_run_checkpoint else None
+                if row:
+                    checkpoint = row['checkpoint_info']
+                    excel_file_path = row['excel_file_path']
+                    config_data = row['config']
+                    
+                    if checkpoint:
+                        # Site isolation: refuse to resume if checkpoint is from a different org
+                        current_instance_url = settings.instance_url or ''
+                        checkpoint_instance_url = ''
+                        if config_data:
+                            checkpoint_instance_url = (config_data.get('configuration') or {}).get('salesforce', {}).get('instanceUrl', '')
+                        if not _sites_match(current_instance_url, checkpoint_instance_url):
+                            log_print("  ❌ Cannot resume: Database checkpoint is from a different site")
+                            log_print(f"     Current YAML site: {current_instance_url or 'unknown'}")
+                            log_print(f"     Checkpoint site: {checkpoint_instance_url or 'unknown'}")
                         else:
-                            cur = conn.cursor()
-                        try:
-                            cur.execute("""
-                                SELECT checkpoint_info, config, excel_file_path, progress
-                                FROM runs 
-                                WHERE run_id = %s
-                            """, (run_id,))
-                            row = cur.fetchone()
-                            if row:
-                                # Handle both dict (RealDictCursor) and tuple (regular cursor)
-                                if isinstance(row, dict):
-                                    checkpoint = row.get('checkpoint_info')
-                                    excel_file_path = row.get('excel_file_path')
-                                    config_data = row.get('config')
-                                else:
-                                    # Tuple: (checkpoint_info, config, excel_file_path, progress)
-                                    checkpoint = row[0] if len(row) > 0 else None
-                                    config_data = row[1] if len(row) > 1 else None
-                                    excel_file_path = row[2] if len(row) > 2 else None
-                                
-                                if checkpoint:
-                                    # Site isolation: refuse to resume if checkpoint is from a different org
-                                    current_instance_url = (config.get('salesforce') or {}).get('instanceUrl', '')
-                                    checkpoint_instance_url = ''
-                                    if config_data:
-                                        checkpoint_instance_url = (config_data.get('configuration') or {}).get('salesforce', {}).get('instanceUrl', '')
-                                    if not _sites_match(current_instance_url, checkpoint_instance_url):
-                                        log_print("  ❌ Cannot resume: Database checkpoint is from a different site")
-                                        log_print(f"     Current YAML site: {current_instance_url or 'unknown'}")
-                                        log_print(f"     Checkpoint site: {checkpoint_instance_url or 'unknown'}")
-                                    else:
-                                        log_print(f"  ✅ Found checkpoint in database: Cycle {checkpoint.get('cycle')}, Step {checkpoint.get('step')}")
-                                        
-                                        # CRITICAL: Load Excel file from database if it exists but not on disk
-                                        resolved_excel_file = excel_file_path or excel_file
-                                        if excel_file_path and not Path(excel_file_path).exists():
-                                            try:
-                                                from app import load_excel_from_db
-                                                loaded_path = load_excel_from_db(run_id)
-                                                if loaded_path:
-                                                    resolved_excel_file = loaded_path
-                                                    log_print(f"  ✅ Loaded Excel file from database: {Path(loaded_path).name}")
-                                            except Exception as e:
-                                                log_print(f"  ⚠️  Could not load Excel from DB: {e}")
-                                        
-                                        # Build state-like structure from checkpoint_info
-                                        state = {
-                                            'cycle_number': checkpoint.get('cycle', 1),
-                                            'last_completed_step': checkpoint.get('step', 0) - 1 if checkpoint.get('step', 0) > 0 else 0,
-                                            'run_id': run_id,
-                                            'instance_url': current_instance_url or checkpoint_instance_url,
-                                            'excel_file': resolved_excel_file,
-                                            'yaml_config_snapshot': config_data if config_data else yaml_config,
-                                            '_from_database_checkpoint': True  # Flag to skip validation
-                                        }
-                                        
-                                        # Override resume parameters from checkpoint
-                                        if checkpoint.get('cycle'):
-                                            resume_from_cycle = checkpoint.get('cycle')
-                                        if checkpoint.get('step'):
-                                            resume_from_step = checkpoint.get('step')
-                                        
-                                        log_print(f"  ✅ Resuming from Cycle {resume_from_cycle}, Step {resume_from_step}")
-                            else:
-                                log_print("  ℹ️  No checkpoint_info found in database, trying state files...")
-                        finally:
-                            cur.close()
-                    finally:
-                        conn.close()
+                            log_print(f"  ✅ Found checkpoint in database: Cycle {checkpoint.get('cycle')}, Step {checkpoint.get('step')}")
+                            
+                            # CRITICAL: Load Excel file from database if it exists but not on disk
+                            resolved_excel_file = excel_file_path or excel_file
+                            if excel_file_path and not Path(excel_file_path).exists():
+                                try:
+                                    from app import load_excel_from_db
+                                    loaded_path = load_excel_from_db(run_id)
+                                    if loaded_path:
+                                        resolved_excel_file = loaded_path
+                                        log_print(f"  ✅ Loaded Excel file from database: {Path(loaded_path).name}")
+                                except Exception as e:
+                                    log_print(f"  ⚠️  Could not load Excel from DB: {e}")
+                            
+                            # Build state-like structure from checkpoint_info
+                            state = {
+                                'cycle_number': checkpoint.get('cycle', 1),
+                                'last_completed_step': checkpoint.get('step', 0) - 1 if checkpoint.get('step', 0) > 0 else 0,
+                                'run_id': run_id,
+                                'instance_url': current_instance_url or checkpoint_instance_url,
+                                'excel_file': resolved_excel_file,
+                                'yaml_config_snapshot': config_data if config_data else yaml_config,
+                                '_from_database_checkpoint': True  # Flag to skip validation
+                            }
+                            
+                            # Override resume parameters from checkpoint
+                            if checkpoint.get('cycle'):
+                                resume_from_cycle = checkpoint.get('cycle')
+                            if checkpoint.get('step'):
+                                resume_from_step = checkpoint.get('step')
+                            
+                            log_print(f"  ✅ Resuming from Cycle {resume_from_cycle}, Step {resume_from_step}")
+                else:
+                    log_print("  ℹ️  No checkpoint_info found in database, trying state files...")
             except Exception as e:
-                log_print(f"  ⚠️  Warning: Could not load checkpoint from database: {e}")
-                import traceback
-                traceback.print_exc()
+                log_print(f"  ⚠️  Warning: Could not load checkpoint from database: {e!r}")
         
         # Fallback to state files if database checkpoint not found
         # Require instance_url so we only consider same-site state; never resume from wrong org
-        current_instance_url = (config.get('salesforce') or {}).get('instanceUrl')
+        current_instance_url = settings.instance_url
         if not current_instance_url:
             log_print("  ❌ Cannot resume: instanceUrl required in YAML configuration (site isolation)")
             raise RuntimeError("Cannot resume: instanceUrl required for site isolation")
         
-        current_template_name = config.get('promptTemplateApiName')
+        current_template_name = settings.prompt_template_name
         if not state:
             state = load_state(resume_from_step=resume_from_step, resume_from_cycle=resume_from_cycle, run_id=None, instance_url=current_instance_url, prompt_template_name=current_template_name)
         
@@ -1907,9 +2269,13 @@ def run_full_workflow(excel_file=None, pdf_file=None, model_name=None, yaml_inpu
                 questions_config = yaml_config.get('questions', [])
                 # Re-extract credentials from state config (critical for correct org)
                 sf = config.get('salesforce', {})
-                username = sf.get('username')
-                password = sf.get('password')
-                instance_url = sf.get('instanceUrl')
+                settings = dataclasses.replace(
+                    settings, username=sf.get('username'), password=sf.get('password'), instance_url=sf.get('instanceUrl'),
+                    headless=config.get('headless', False), index_prefix=config.get('indexPrefix')
+                )
+                username = settings.username
+                password = settings.password
+                instance_url = settings.instance_url
                 if username:
                     log_print(f"  🔑 Credentials from state: {username} @ {instance_url or '(instance)'}")
             else:
@@ -1922,20 +2288,16 @@ def run_full_workflow(excel_file=None, pdf_file=None, model_name=None, yaml_inpu
             
             # If sheet_name is None (e.g. after Step 1 failure) but we have a previous cycle, recover from prev cycle state
             if not state.get('sheet_name') and state.get('cycle_number', 1) > 1:
-                state_dir = get_state_dir()
                 prev_cycle = state.get('cycle_number', 2) - 1
-                prev_file = state_dir / f"run_{run_id}_cycle_{prev_cycle}_state.json" if run_id else state_dir / f"cycle_{prev_cycle}_state.json"
-                if prev_file.exists():
-                    try:
-                        with open(prev_file, 'r') as f:
-                            prev = json.load(f)
-                        prev_sheet = prev.get('sheet_name')
-                        if prev_sheet:
-                            state['sheet_name'] = prev_sheet
-                            disp = (prev_sheet[:57] + '...') if len(prev_sheet) > 60 else prev_sheet
-                            log_print(f"  ℹ️  Recovered sheet_name from Cycle {prev_cycle} state: {disp}")
-                    except Exception as e:
-                        log_print(f"  ⚠️  Could not recover sheet from prev cycle: {e}")
+                try:
+                    prev = load_cycle_state(prev_cycle, run_id)
+                    prev_sheet = prev.get('sheet_name') if prev else None
+                    if prev_sheet:
+                        state['sheet_name'] = prev_sheet
+                        disp = (prev_sheet[:57] + '...') if len(prev_sheet) > 60 else prev_sheet
+                        log_print(f"  ℹ️  Recovered sheet_name from Cycle {prev_cycle} state: {disp}")
+                except Exception as e:
+                    log_print(f"  ⚠️  Could not recover sheet from prev cycle: {e}")
             
             # Validate state (skip validation if loading from database checkpoint - Excel file might not exist yet)
             if state.get('_from_database_checkpoint'):
@@ -1992,7 +2354,7 @@ def run_full_workflow(excel_file=None, pdf_file=None, model_name=None, yaml_inpu
             cycle_number = state.get('cycle_number', 1)
         new_sheet_name = state.get('sheet_name')
         proposed_llm_parser_prompt = state.get('proposed_llm_parser_prompt', '')
-        stage_status = state.get('stage_status', '')
+        stage_status = parse_stage_status(state.get('stage_status', ''))
         stage_complete_reason = state.get('stage_complete_reason', '')
         is_resuming = True  # Flag to track if we're resuming
     else:
@@ -2004,825 +2366,696 @@ def run_full_workflow(excel_file=None, pdf_file=None, model_name=None, yaml_inpu
         stage_complete_reason = ''
         is_resuming = False
     
-    # Initialize heartbeat tracking
-    last_heartbeat = datetime.now()
-    heartbeat_interval = 30  # Update heartbeat every 30 seconds during long operations
+    # Initialize heartbeat tracking (monotonic clock: immune to wall-clock jumps, no datetime allocation)
+    last_heartbeat = time.monotonic()
+    heartbeat_interval = 30  # Update heartbeat every 30 seconds during long operations (at most once per interval)
     
     # Consecutive no-improvement tracking (exit after 2 consecutive stalls)
     consecutive_no_improvement = 0
     MAX_CONSECUTIVE_NO_IMPROVEMENT = 2
     prev_composite_score = -1  # composite = pass_count * 2 + partial_count
     
-    while cycle_number <= max_cycles:
-        # Clear resume flag if we were resuming
-        if is_resuming:
-            is_resuming = False
+    # Loop-invariant: yaml_config, run_id and excel_file are settled before the first cycle.
+    # CRITICAL: Step 2 passes run_id in config_dict so excel_io.py can load from DB if needed
+    yaml_config_with_run_id = {**yaml_config, '_run_id': run_id}
+    excel_file_str = str(excel_file) if excel_file else None
+    next_cycle_session = None  # Future from prefetch_salesforce_session, started once the next cycle is certain
+    # One event loop for every Step 1 of this run (asyncio.run() would rebuild the selector and
+    # default executor each cycle); created on first use and closed when the run ends
+    step1_runner = None
+    
+    # Cycle states cached by save_state() are dropped when the run ends, under the resolved run_id
+    try:
+        while cycle_number <= max_cycles:
+            # Clear resume flag if we were resuming
+            if is_resuming:
+                is_resuming = False
         
-        # Update heartbeat if it's been more than heartbeat_interval seconds
-        if (datetime.now() - last_heartbeat).total_seconds() > heartbeat_interval:
-            if progress_callback:
-                try:
-                    progress_callback({
-                        'status': 'heartbeat',
-                        'run_id': run_id,
-                        'cycle': cycle_number,
-                        'step': 0,
-                        'message': f'Heartbeat - Cycle {cycle_number} in progress'
-                    })
-                except:
-                    pass
-            last_heartbeat = datetime.now()
+            # Update heartbeat if it's been more than heartbeat_interval seconds
+            now = time.monotonic()
+            if now - last_heartbeat > heartbeat_interval:
+                if progress_callback:
+                    _notify(progress_callback, 'heartbeat', run_id, cycle_number, 0, f'Heartbeat - Cycle {cycle_number} in progress')
+                last_heartbeat = now
         
-        log_print("\n" + "="*80)
-        log_print(f"🔄 REFINEMENT CYCLE {cycle_number}")
-        log_print("="*80)
+            log_print(_SEP_EQ)
+            log_print(f"🔄 REFINEMENT CYCLE {cycle_number}")
+            log_print(_RULE_EQ)
         
-        # Progress callback
-        if progress_callback:
-            try:
-                progress_callback({'status': 'cycle_start', 'cycle': cycle_number, 'step': 0, 'run_id': run_id})
-            except:
-                pass
-            last_heartbeat = datetime.now()  # Reset heartbeat on cycle start
+            # Progress callback
+            if progress_callback:
+                _notify(progress_callback, 'cycle_start', run_id, cycle_number, 0)
+                last_heartbeat = time.monotonic()  # Reset heartbeat on cycle start
         
-        # Determine if this is Cycle 1 (baseline test, no update needed)
-        # Cycle 1 is when cycle_number == 1 AND we don't have a previous cycle's proposed prompt
-        # Check if previous cycle state exists (run-specific when run_id provided)
-        state_dir = get_state_dir()
-        if run_id:
-            prev_cycle_file = state_dir / f"run_{run_id}_cycle_{cycle_number - 1}_state.json"
-        else:
-            prev_cycle_file = state_dir / f"cycle_{cycle_number - 1}_state.json"
-        has_previous_cycle = prev_cycle_file.exists()
-        is_cycle_1 = (cycle_number == 1 and not has_previous_cycle)
+            # Determine if this is Cycle 1 (baseline test, no update needed)
+            # Cycle 1 is when cycle_number == 1 AND we don't have a previous cycle's proposed prompt
+            # Check if previous cycle state exists (run-specific when run_id provided)
+            has_previous_cycle = (run_id, cycle_number - 1) in _CYCLE_STATE_CACHE or cycle_state_path(cycle_number - 1, run_id).exists()
+            is_cycle_1 = (cycle_number == 1 and not has_previous_cycle)
         
-        # Step 1: Update Index (beginning of cycle, except Cycle 1)
-        # Cycle 1 skips this step - it tests the baseline index
-        # Cycle 2+ starts here - updates index using previous cycle's proposed prompt
-        if is_cycle_1:
-            log_print("\n" + "-"*80)
-            log_print("STEP 1: SKIPPED (Cycle 1 - testing baseline index, no update needed)")
-            log_print("-"*80)
-            # For Cycle 1, we don't have a previous cycle's prompt to apply
-            # We'll test the current/baseline index state
-        elif resume_step and resume_step > 1:
-            log_print("\n" + "-"*80)
-            log_print("STEP 1: SKIPPED (Resuming from Step 2+)")
-            log_print("-"*80)
-            log_print(f"  ℹ️  Index update was already completed or skipped")
-        else:
-            # Cycle 2+: Update index using previous cycle's proposed prompt
-            # Try to load from previous cycle's state file first, then fall back to main state file
-            previous_cycle_prompt = None
-            if prev_cycle_file.exists():
-                # Load from previous cycle's state file
-                try:
-                    with open(prev_cycle_file, 'r') as f:
-                        prev_state = json.load(f)
-                        previous_cycle_prompt = prev_state.get('proposed_llm_parser_prompt', '')
-                except Exception as e:
-                    log_print(f"  ⚠️  Warning: Could not load previous cycle state: {e}")
-                    pass
+            # Step 1: Update Index (beginning of cycle, except Cycle 1)
+            # Cycle 1 skips this step - it tests the baseline index
+            # Cycle 2+ starts here - updates index using previous cycle's proposed prompt
+            if is_cycle_1:
+                log_print(_SEP_DASH)
+                log_print("STEP 1: SKIPPED (Cycle 1 - testing baseline index, no update needed)")
+                log_print(_RULE_DASH)
+                # For Cycle 1, we don't have a previous cycle's prompt to apply
+                # We'll test the current/baseline index state
+            elif resume_step and resume_step > 1:
+                log_print(_SEP_DASH)
+                log_print("STEP 1: SKIPPED (Resuming from Step 2+)")
+                log_print(_RULE_DASH)
+                log_print(f"  ℹ️  Index update was already completed or skipped")
             else:
-                # Fall back to main state file if cycle-specific file doesn't exist
-                # When resuming after a completed cycle, the main state file has Cycle N-1's proposed prompt
-                # But we need to check if the state's cycle_number matches the previous cycle
-                if state:
-                    state_cycle = state.get('cycle_number', 0)
-                    # If state is from previous cycle (cycle_number - 1), use its proposed prompt
-                    if state_cycle == cycle_number - 1:
-                        previous_cycle_prompt = state.get('proposed_llm_parser_prompt', '')
-                        if previous_cycle_prompt:
-                            log_print(f"  ℹ️  Using proposed prompt from main state file (Cycle {cycle_number - 1})")
-                    else:
-                        # State is from current or different cycle - try to load from any available cycle file
-                        log_print(f"  ⚠️  Main state is from Cycle {state_cycle}, but we need Cycle {cycle_number - 1}")
-                        # Try to find any cycle file that might have the previous cycle's prompt
-                        for try_cycle in range(cycle_number - 1, 0, -1):
-                            if run_id:
-                                try_file = state_dir / f"run_{run_id}_cycle_{try_cycle}_state.json"
-                            else:
-                                try_file = state_dir / f"cycle_{try_cycle}_state.json"
-                            if try_file.exists():
-                                try:
-                                    with open(try_file, 'r') as f:
-                                        try_state = json.load(f)
+                # Cycle 2+: Update index using previous cycle's proposed prompt
+                # Try to load from previous cycle's state file first, then fall back to main state file
+                previous_cycle_prompt = None
+                if has_previous_cycle:
+                    # Load from previous cycle's state (in-memory archive or state file)
+                    try:
+                        prev_state = load_cycle_state(cycle_number - 1, run_id) or {}
+                        previous_cycle_prompt = prev_state.get('proposed_llm_parser_prompt', '')
+                    except Exception as e:
+                        log_print(f"  ⚠️  Warning: Could not load previous cycle state: {e}")
+                        pass
+                else:
+                    # Fall back to main state file if cycle-specific file doesn't exist
+                    # When resuming after a completed cycle, the main state file has Cycle N-1's proposed prompt
+                    # But we need to check if the state's cycle_number matches the previous cycle
+                    if state:
+                        state_cycle = state.get('cycle_number', 0)
+                        # If state is from previous cycle (cycle_number - 1), use its proposed prompt
+                        if state_cycle == cycle_number - 1:
+                            previous_cycle_prompt = state.get('proposed_llm_parser_prompt', '')
+                            if previous_cycle_prompt:
+                                log_print(f"  ℹ️  Using proposed prompt from main state file (Cycle {cycle_number - 1})")
+                        else:
+                            # State is from current or different cycle - try to load from any available cycle file
+                            log_print(f"  ⚠️  Main state is from Cycle {state_cycle}, but we need Cycle {cycle_number - 1}")
+                            # Latest prompt this process saved for the run answers in O(1); otherwise
+                            # try to find any cycle archive that might have the previous cycle's prompt
+                            last_saved = _LAST_PROPOSED_PROMPT.get(run_id)
+                            if last_saved and last_saved[0] < cycle_number:
+                                previous_cycle_prompt = last_saved[1]
+                                log_print(f"  ℹ️  Found proposed prompt from Cycle {last_saved[0]} state")
+                            archived_cycles = _archived_cycle_numbers(run_id) if not previous_cycle_prompt else ()
+                            for try_cycle in range(cycle_number - 1, 0, -1):
+                                if try_cycle in archived_cycles:
+                                    try:
+                                        try_state = load_cycle_state(try_cycle, run_id) or {}
                                         previous_cycle_prompt = try_state.get('proposed_llm_parser_prompt', '')
                                         if previous_cycle_prompt:
                                             log_print(f"  ℹ️  Found proposed prompt from Cycle {try_cycle} state file")
                                             break
-                                except:
-                                    pass
+                                    except:
+                                        pass
             
-            if not previous_cycle_prompt:
-                log_print("\n" + "-"*80)
-                log_print("STEP 1: SKIPPED (No previous cycle prompt found)")
-                log_print("-"*80)
-                log_print("  ⚠️  Warning: Cannot update index without previous cycle's proposed prompt")
-                log_print("  ℹ️  Proceeding to test current index state")
-            elif refinement_stage == "llm_parser":
-                log_print("\n" + "-"*80)
-                log_print(f"STEP 1: Create Index + Retriever (applying Cycle {cycle_number - 1}'s improvements)")
-                log_print("-"*80)
+                if not previous_cycle_prompt:
+                    log_print(_SEP_DASH)
+                    log_print("STEP 1: SKIPPED (No previous cycle prompt found)")
+                    log_print(_RULE_DASH)
+                    log_print("  ⚠️  Warning: Cannot update index without previous cycle's proposed prompt")
+                    log_print("  ℹ️  Proceeding to test current index state")
+                elif refinement_stage == "llm_parser":
+                    log_print(_SEP_DASH)
+                    log_print(f"STEP 1: Create Index + Retriever (applying Cycle {cycle_number - 1}'s improvements)")
+                    log_print(_RULE_DASH)
                 
-                # Progress callback - step start
-                if progress_callback:
-                    try:
-                        progress_callback({'status': 'step_start', 'cycle': cycle_number, 'step': 1, 'run_id': run_id, 'message': f'Step 1: Creating Search Index and Retriever with Cycle {cycle_number - 1} improvements'})
-                    except:
-                        pass
+                    # Progress callback - step start
+                    if progress_callback is not None:
+                        _notify(progress_callback, 'step_start', run_id, cycle_number, 1, f'Step 1: Creating Search Index and Retriever with Cycle {cycle_number - 1} improvements')
                 
-                # Lock per prompt template (design: one run at a time per template)
-                is_locked, error_msg = check_prompt_template_lock(prompt_template_name)
-                if is_locked:
-                    log_print(f"\n❌ ERROR: {error_msg}")
-                    log_print("❌ Cannot proceed - there's already a job running on this prompt template.")
-                    sys.exit(1)
+                    # Lock per prompt template (design: one run at a time per template)
+                    is_locked, error_msg = check_prompt_template_lock(prompt_template_name)
+                    if is_locked:
+                        log_print(f"\n❌ ERROR: {error_msg}")
+                        log_print("❌ Cannot proceed - there's already a job running on this prompt template.")
+                        sys.exit(1)
                 
-                lock_acquired, lock_error = acquire_prompt_template_lock(prompt_template_name, run_id)
-                if not lock_acquired:
-                    log_print(f"\n❌ ERROR: Failed to acquire lock: {lock_error}")
-                    sys.exit(1)
-                log_print(f"   🔒 Acquired lock for prompt template {prompt_template_name}")
+                    lock_acquired, lock_error = acquire_prompt_template_lock(prompt_template_name, run_id)
+                    if not lock_acquired:
+                        log_print(f"\n❌ ERROR: Failed to acquire lock: {lock_error}")
+                        sys.exit(1)
+                    log_print(f"   🔒 Acquired lock for prompt template {prompt_template_name}")
                 
-                log_print(f"   Previous cycle's prompt length: {len(previous_cycle_prompt)} chars")
+                    log_print(f"   Previous cycle's prompt length: {len(previous_cycle_prompt)} chars")
                 
-                try:
-                    headless_mode = config.get('headless', False)
-                    state_dir = get_state_dir()
+                    try:
+                        headless_mode = settings.headless
+                        state_dir = get_state_dir()
 
-                    # Create state save callback for substep checkpoints
-                    def save_substep_state(**substep_args):
-                        save_state(
-                            cycle_number=cycle_number,
-                            last_completed_step=0,  # Still in Step 1
-                            sheet_name=None,
-                            refinement_stage=refinement_stage,
-                            stage_status='in_progress',
-                            excel_file=excel_file,
-                            run_id=run_id,
-                            yaml_config_snapshot=config,
-                            **substep_args  # step_1_substep, step_1_index_id, etc.
-                        )
+                        # Create state save callback for substep checkpoints
+                        def save_substep_state(**substep_args):
+                            save_state(
+                                cycle_number=cycle_number,
+                                last_completed_step=0,  # Still in Step 1
+                                sheet_name=None,
+                                refinement_stage=refinement_stage,
+                                stage_status=StageStatus.IN_PROGRESS,
+                                excel_file=excel_file,
+                                run_id=run_id,
+                                yaml_config_snapshot=config,
+                                **substep_args  # step_1_substep, step_1_index_id, etc.
+                            )
 
-                    # Pass resume state if available - check cycle-specific state first
-                    resume_state_for_step1 = None
-                    if state:
-                        # Try to load cycle-specific state (may have substep info)
-                        cycle_state_file = state_dir / f"run_{run_id}_cycle_{cycle_number}_state.json"
-                        if cycle_state_file.exists():
+                        # Salesforce session authenticated during the pause before this cycle
+                        prefetched_access_token = None
+                        if next_cycle_session is not None:
                             try:
-                                with open(cycle_state_file, 'r') as f:
-                                    cycle_state = json.load(f)
-                                if cycle_state.get('cycle_number') == cycle_number and cycle_state.get('last_completed_step') == 0:
+                                _, prefetched_access_token = next_cycle_session.result()
+                            except Exception as e:
+                                log_print(f"  ⚠️  Pre-authenticated session unavailable, authenticating again: {e!r}")
+                            next_cycle_session = None
+
+                        # Pass resume state if available - check cycle-specific state first
+                        resume_state_for_step1 = None
+                        if state:
+                            # Try to load cycle-specific state (may have substep info)
+                            try:
+                                cycle_state = load_cycle_state(cycle_number, run_id)
+                                if cycle_state and cycle_state.get('cycle_number') == cycle_number and cycle_state.get('last_completed_step') == 0:
                                     resume_state_for_step1 = cycle_state
                                     log_print(f"  ℹ️  Loaded Cycle {cycle_number} state for substep resume")
                             except:
                                 pass
-                        # Fallback to main state
-                        if not resume_state_for_step1 and state.get('last_completed_step') == 0:
-                            resume_state_for_step1 = state
-
-                    new_index_id, new_retriever_api_name = asyncio.run(run_new_index_pipeline(
-                        username=username,
-                        password=password,
-                        instance_url=instance_url,
-                        prompt_template_api_name=prompt_template_name,
-                        previous_cycle_prompt=previous_cycle_prompt,
-                        source_index_id=search_index_id,
-                        state_dir=state_dir,
-                        run_id=run_id,
-                        headless=headless_mode,
-                        index_prefix=config.get('indexPrefix'),
-                        resume_state=resume_state_for_step1,
-                        save_state_callback=save_substep_state,
-                    ))
+                            # Fallback to main state
+                            if not resume_state_for_step1 and state.get('last_completed_step') == 0:
+                                resume_state_for_step1 = state
+
+                        from playwright_scripts import run_new_index_pipeline  # Playwright is only needed from Cycle 2 on
+                        if step1_runner is None:
+                            step1_runner = asyncio.Runner()
+                        new_index_id, new_retriever_api_name = step1_runner.run(run_new_index_pipeline(
+                            username=username,
+                            password=password,
+                            instance_url=instance_url,
+                            prompt_template_api_name=prompt_template_name,
+                            previous_cycle_prompt=previous_cycle_prompt,
+                            source_index_id=search_index_id,
+                            state_dir=state_dir,
+                            run_id=run_id,
+                            headless=headless_mode,
+                            index_prefix=settings.index_prefix,
+                            resume_state=resume_state_for_step1,
+                            save_state_callback=save_substep_state,
+                            access_token=prefetched_access_token,
+                        ))
                     
-                    if not new_index_id or not new_retriever_api_name:
-                        raise RuntimeError("Pipeline did not complete (aborted or failed)")
+                        if not new_index_id or not new_retriever_api_name:
+                            raise RuntimeError("Pipeline did not complete (aborted or failed)")
                     
-                    # Use new index for rest of cycle (Step 2 fetches parser prompt from it)
-                    search_index_id = new_index_id
-                    log_print("\n✅ Step 1 Complete: Search Index and Retriever created, prompt template updated")
+                        # Use new index for rest of cycle (Step 2 fetches parser prompt from it)
+                        search_index_id = new_index_id
+                        log_print("\n✅ Step 1 Complete: Search Index and Retriever created, prompt template updated")
                     
-                    if progress_callback:
-                        try:
-                            progress_callback({'status': 'step_complete', 'cycle': cycle_number, 'step': 1, 'run_id': run_id, 'message': 'Search Index and Retriever created'})
-                        except:
-                            pass
+                        _notify(progress_callback, 'step_complete', run_id, cycle_number, 1, 'Search Index and Retriever created')
                     
-                    release_prompt_template_lock(prompt_template_name)
-                    log_print(f"   🔓 Released lock for prompt template {prompt_template_name}")
+                        release_prompt_template_lock(prompt_template_name)
+                        log_print(f"   🔓 Released lock for prompt template {prompt_template_name}")
                     
-                    save_state(
-                        cycle_number=cycle_number,
-                        last_completed_step=1,
-                        sheet_name=new_sheet_name,
-                        refinement_stage=refinement_stage,
-                        stage_status=None,
-                        proposed_llm_parser_prompt=None,
-                        proposed_response_prompt=None,
-                        stage_complete_reason=None,
-                        excel_file=excel_file,
-                        run_id=run_id,
-                        yaml_config_snapshot=yaml_config
-                    )
-                except Exception as e:
-                    release_prompt_template_lock(prompt_template_name)
-                    log_print(f"   🔓 Released lock for prompt template {prompt_template_name} (after error)")
-                    log_print(f"\n❌ Step 1 Failed: {str(e)}")
-                    
-                    # Progress callback - report error
-                    if progress_callback:
-                        try:
-                            error_msg = f"Step 1 Failed: {str(e)}"
-                            if "Executable doesn't exist" in str(e) or "BrowserType.launch" in str(e):
-                                error_msg = "Step 1 Failed: Playwright browser not installed. Cannot update search index. Please ensure browsers are installed."
-                            elif "playwright install" in str(e).lower():
-                                error_msg = "Step 1 Failed: Playwright browser installation required. Run 'playwright install chromium' to fix."
-                            progress_callback({'status': 'error', 'cycle': cycle_number, 'step': 1, 'run_id': run_id, 'message': error_msg, 'error': str(e)})
-                        except:
-                            pass
-                    
-                    log_print("\n❌ CRITICAL ERROR: Step 1 (Search Index and Retriever Creation) failed.")
-                    log_print("❌ The workflow cannot continue without successfully creating the search index and retriever.")
-                    log_print("❌ This is a critical step and cannot be skipped.")
-                    log_print(f"❌ Error details: {str(e)}")
-                    log_print("\n💡 Possible solutions:")
-                    log_print("   1. Ensure Playwright browsers are installed: 'playwright install chromium'")
-                    log_print("   2. Check network connectivity to Salesforce")
-                    log_print("   3. Verify search index ID and credentials are correct")
-                    log_print("   4. Review the full error message above for specific issues")
-                    
-                    # Save error state
-                    save_state(
-                        cycle_number=cycle_number,
-                        last_completed_step=0,  # No steps completed
-                        sheet_name=None,
-                        refinement_stage=refinement_stage,
-                        stage_status='error',
-                        proposed_llm_parser_prompt=None,
-                        proposed_response_prompt=None,
-                        stage_complete_reason=f"Step 1 failed: {str(e)}",
-                        excel_file=excel_file,
-                        run_id=run_id,
-                        yaml_config_snapshot=yaml_config
-                    )
-                    
-                    # Stop the workflow - don't continue
-                    raise RuntimeError(f"Step 1 (Search Index and Retriever Creation) failed: {str(e)}. Workflow stopped.")
-            else:
-                log_print("\n" + "-"*80)
-                log_print(f"STEP 1: SKIPPED (Current refinement stage is '{refinement_stage}', not 'llm_parser')")
-                log_print("-"*80)
-                log_print("   Step 1 (Update Index) only runs for 'llm_parser' stage")
+                        save_state(
+                            cycle_number=cycle_number,
+                            last_completed_step=1,
+                            sheet_name=new_sheet_name,
+                            refinement_stage=refinement_stage,
+                            stage_status=None,
+                            proposed_llm_parser_prompt=None,
+                            proposed_response_prompt=None,
+                            stage_complete_reason=None,
+                            excel_file=excel_file,
+                            run_id=run_id,
+                            yaml_config_snapshot=yaml_config
+                        )
+                    except Exception as e:
+                        err_text = str(e)
+                        release_prompt_template_lock(prompt_template_name)
+                        log_print(f"   🔓 Released lock for prompt template {prompt_template_name} (after error)")
+                        error_msg = None
+                        if "Executable doesn't exist" in err_text or "BrowserType.launch" in err_text:
+                            error_msg = "Step 1 Failed: Playwright browser not installed. Cannot update search index. Please ensure browsers are installed."
+                        elif "playwright install" in err_text.lower():
+                            error_msg = "Step 1 Failed: Playwright browser installation required. Run 'playwright install chromium' to fix."
+                        failure = _handle_step_failure(
+                            1, err_text, progress_callback=progress_callback, run_id=run_id, cycle_number=cycle_number,
+                            refinement_stage=refinement_stage, excel_file=excel_file, yaml_config=yaml_config,
+                            notify_message=error_msg
+                        )
+                        raise failure
+                else:
+                    log_print(_SEP_DASH)
+                    log_print(f"STEP 1: SKIPPED (Current refinement stage is '{refinement_stage}', not 'llm_parser')")
+                    log_print(_RULE_DASH)
+                    log_print("   Step 1 (Update Index) only runs for 'llm_parser' stage")
         
-        # Step 2: Test Index (create sheet, invoke prompts)
-        if resume_step and resume_step > 2:
-            log_print("\n" + "-"*80)
-            log_print("STEP 2: SKIPPED (Resuming from Step 3+)")
-            log_print("-"*80)
-            log_print(f"  ℹ️  Using existing sheet: {new_sheet_name}")
-        else:
-            log_print("\n" + "-"*80)
-            if is_cycle_1:
-                log_print("STEP 2: Testing Baseline Index (Cycle 1)")
+            # Step 2: Test Index (create sheet, invoke prompts)
+            if resume_step and resume_step > 2:
+                log_print(_SEP_DASH)
+                log_print("STEP 2: SKIPPED (Resuming from Step 3+)")
+                log_print(_RULE_DASH)
+                log_print(f"  ℹ️  Using existing sheet: {new_sheet_name}")
             else:
-                log_print(f"STEP 2: Testing Updated Index (Cycle {cycle_number})")
-            log_print("-"*80)
+                log_print(_SEP_DASH)
+                if is_cycle_1:
+                    log_print("STEP 2: Testing Baseline Index (Cycle 1)")
+                else:
+                    log_print(f"STEP 2: Testing Updated Index (Cycle {cycle_number})")
+                log_print(_RULE_DASH)
             
-            # Progress callback - step start
-            if progress_callback:
-                try:
+                # Progress callback - step start
+                if progress_callback is not None:
                     step_msg = 'Testing Baseline Index' if is_cycle_1 else f'Testing Updated Index (Cycle {cycle_number})'
-                    progress_callback({'status': 'step_start', 'cycle': cycle_number, 'step': 2, 'run_id': run_id, 'message': f'Step 2: {step_msg}'})
-                except:
-                    pass
+                    _notify(progress_callback, 'step_start', run_id, cycle_number, 2, f'Step 2: {step_msg}')
             
-            try:
-                # CRITICAL: Pass run_id in config_dict so excel_io.py can load from DB if needed
-                yaml_config_with_run_id = yaml_config.copy()
-                yaml_config_with_run_id['_run_id'] = run_id
-                
-                new_sheet_name = create_analysis_sheet_with_prompts(
-                    excel_file=excel_file,
-                    questions_list=questions_list,
-                    prompt_template_name=prompt_template_name,
-                    search_index_id=search_index_id,
-                    models_list=models_list,
-                    refinement_stage=refinement_stage,
-                    cycle_number=cycle_number,
-                    config_dict=yaml_config_with_run_id
-                )
-                # Abort if job was killed during prompt invocations
                 try:
-                    from worker_utils import get_db_connection
-                    status_check = None
-                    conn = get_db_connection()
-                    if conn:
-                        with conn.cursor() as cur:
-                            cur.execute("SELECT status FROM runs WHERE run_id = %s", (run_id,))
-                            row = cur.fetchone()
-                            if row:
-                                status_check = row[0]
-                    if conn:
-                        conn.close()
-                    if status_check and status_check not in ('running', 'queued', 'interrupted'):
-                        log_print(f"❌ Job {run_id} status changed to '{status_check}' during Step 2. Aborting workflow.")
-                        raise RuntimeError(f"Job aborted due to status '{status_check}'")
-                except Exception as e:
-                    # Re-raise to be caught by outer handler
-                    raise
-                
-                log_print(f"\n✅ Step 2 Complete: Created sheet '{new_sheet_name}' with prompt responses")
-                
-                # Progress callback - include Excel file path so it can be saved to DB immediately
-                if progress_callback:
-                    try:
-                        progress_callback({
-                            'status': 'step_complete', 
-                            'cycle': cycle_number, 
-                            'step': 2, 
-                            'run_id': run_id, 
-                            'message': f'Test sheet created: {new_sheet_name}',
-                            'excel_file': str(excel_file) if excel_file else None
-                        })
-                    except:
-                        pass
-                
-                # Save state after Step 2
-                save_state(
-                    cycle_number=cycle_number,
-                    last_completed_step=2,
-                    sheet_name=new_sheet_name,
-                    refinement_stage=refinement_stage,
-                    excel_file=excel_file,
-                    run_id=run_id,
-                    yaml_config_snapshot=yaml_config
-                )
-            except Exception as e:
-                log_print(f"\n❌ Step 2 Failed: {str(e)}")
                 
-                # Progress callback - report error
-                if progress_callback:
+                    new_sheet_name = create_analysis_sheet_with_prompts(
+                        excel_file=excel_file,
+                        questions_list=questions_list,
+                        prompt_template_name=prompt_template_name,
+                        search_index_id=search_index_id,
+                        models_list=models_list,
+                        refinement_stage=refinement_stage,
+                        cycle_number=cycle_number,
+                        config_dict=yaml_config_with_run_id
+                    )
+                    # Abort if job was killed during prompt invocations
                     try:
-                        error_msg = f"Step 2 Failed: {str(e)}"
-                        progress_callback({'status': 'error', 'cycle': cycle_number, 'step': 2, 'run_id': run_id, 'message': error_msg, 'error': str(e)})
-                    except:
-                        pass
+                        status_check = None
+                        conn = get_db_connection() if get_db_connection else None
+                        if conn:
+                            with conn.cursor() as cur:
+                                cur.execute("SELECT status FROM runs WHERE run_id = %s", (run_id,))
+                                row = cur.fetchone()
+                                if row:
+                                    status_check = row[0]
+                        if conn:
+                            conn.close()
+                        if status_check and status_check not in ('running', 'queued', 'interrupted'):
+                            log_print(f"❌ Job {run_id} status changed to '{status_check}' during Step 2. Aborting workflow.")
+                            raise RuntimeError(f"Job aborted due to status '{status_check}'")
+                    except Exception as e:
+                        # Re-raise to be caught by outer handler
+                        raise
                 
-                log_print("\n❌ CRITICAL ERROR: Step 2 (Testing Index & Invoking Prompts) failed.")
-                log_print("❌ The workflow cannot continue without successfully testing the index and invoking prompts.")
-                log_print("❌ This is a critical step and cannot be skipped.")
-                log_print(f"❌ Error details: {str(e)}")
-                log_print("\n💡 Possible solutions:")
-                log_print("   1. Check Salesforce credentials and connectivity")
-                log_print("   2. Verify search index ID and prompt template API name are correct")
-                log_print("   3. Ensure test questions are properly formatted")
-                log_print("   4. Review the full error message above for specific issues")
+                    log_print(f"\n✅ Step 2 Complete: Created sheet '{new_sheet_name}' with prompt responses")
                 
-                # Save error state
-                save_state(
-                    cycle_number=cycle_number,
-                    last_completed_step=1,  # Only Step 1 completed
-                    sheet_name=None,
-                    refinement_stage=refinement_stage,
-                    stage_status='error',
-                    proposed_llm_parser_prompt=None,
-                    proposed_response_prompt=None,
-                    stage_complete_reason=f"Step 2 failed: {str(e)}",
-                    excel_file=excel_file,
-                    run_id=run_id,
-                    yaml_config_snapshot=yaml_config
-                )
+                    # Progress callback - include Excel file path so it can be saved to DB immediately
+                    if progress_callback is not None:
+                        _notify(progress_callback, 'step_complete', run_id, cycle_number, 2,
+                                f'Test sheet created: {new_sheet_name}', excel_file=excel_file_str)
                 
-                # Stop the workflow - don't continue
-                raise RuntimeError(f"Step 2 (Testing Index & Invoking Prompts) failed: {str(e)}. Workflow stopped.")
+                    # Save state after Step 2 (written in the background; error paths save synchronously)
+                    save_state(
+                        cycle_number=cycle_number,
+                        last_completed_step=2,
+                        sheet_name=new_sheet_name,
+                        refinement_stage=refinement_stage,
+                        excel_file=excel_file,
+                        run_id=run_id,
+                        yaml_config_snapshot=yaml_config,
+                        background=True
+                    )
+                except Exception as e:
+                    failure = _handle_step_failure(
+                        2, str(e), progress_callback=progress_callback, run_id=run_id, cycle_number=cycle_number,
+                        refinement_stage=refinement_stage, excel_file=excel_file, yaml_config=yaml_config
+                    )
+                    raise failure
         
-        # Step 3: Analyze Results (Gemini analysis)
-        if resume_step and resume_step > 3:
-            log_print("\n" + "-"*80)
-            log_print("STEP 3: SKIPPED (Resuming from beyond Step 3)")
-            log_print("-"*80)
-            log_print(f"  ℹ️  Using existing analysis results")
-            log_print(f"  📊 Stage Status: {stage_status}")
-            # Use values from state
-            analysis_result = {
-                'proposed_llm_parser_prompt': proposed_llm_parser_prompt,
-                'proposed_response_prompt': state.get('proposed_response_prompt', '') if state else '',
-                'stage_status': stage_status,
-                'stage_complete_reason': stage_complete_reason,
-                'sheet_name': new_sheet_name
-            }
-        else:
-            log_print("\n" + "-"*80)
-            if is_cycle_1:
-                log_print("STEP 3: Analyzing Baseline Results (Cycle 1)")
+            # Step 3: Analyze Results (Gemini analysis)
+            if resume_step and resume_step > 3:
+                log_print(_SEP_DASH)
+                log_print("STEP 3: SKIPPED (Resuming from beyond Step 3)")
+                log_print(_RULE_DASH)
+                log_print(f"  ℹ️  Using existing analysis results")
+                log_print(f"  📊 Stage Status: {stage_status}")
+                # Use values from state
+                analysis_result = {
+                    'proposed_llm_parser_prompt': proposed_llm_parser_prompt,
+                    'proposed_response_prompt': state.get('proposed_response_prompt', '') if state else '',
+                    'stage_status': stage_status,
+                    'stage_complete_reason': stage_complete_reason,
+                    'sheet_name': new_sheet_name
+                }
             else:
-                log_print(f"STEP 3: Analyzing Updated Index Results (Cycle {cycle_number})")
-            log_print("-"*80)
+                log_print(_SEP_DASH)
+                if is_cycle_1:
+                    log_print("STEP 3: Analyzing Baseline Results (Cycle 1)")
+                else:
+                    log_print(f"STEP 3: Analyzing Updated Index Results (Cycle {cycle_number})")
+                log_print(_RULE_DASH)
             
-            # Progress callback - step start
-            if progress_callback:
-                try:
+                # Progress callback - step start
+                if progress_callback is not None:
                     step_msg = 'Analyzing Baseline Results' if is_cycle_1 else f'Analyzing Updated Results (Cycle {cycle_number})'
-                    progress_callback({'status': 'step_start', 'cycle': cycle_number, 'step': 3, 'run_id': run_id, 'message': f'Step 3: {step_msg}'})
-                except:
-                    pass
+                    _notify(progress_callback, 'step_start', run_id, cycle_number, 3, f'Step 3: {step_msg}')
             
-            try:
-                # Abort check before Gemini (design: check at key points)
-                if run_id:
-                    from worker_utils import check_run_aborted
-                    if check_run_aborted(run_id):
-                        log_print("❌ Job aborted before Gemini analysis. Stopping workflow.")
-                        raise RuntimeError("Job aborted")
+                try:
+                    # Abort check before Gemini (design: check at key points)
+                    if run_id and check_run_aborted:
+                        if check_run_aborted(run_id):
+                            log_print("❌ Job aborted before Gemini analysis. Stopping workflow.")
+                            raise RuntimeError("Job aborted")
                 
-                # ============================================================
-                # SAFEGUARD: Build protected questions list from previous cycle
-                # ============================================================
-                prev_passing_questions = []
-                prev_pass_rate = 0.0
-                if cycle_number > 1:
-                    prev_cycle_sheets = []
-                    try:
-                        import re as _re
-                        xls = pd.ExcelFile(excel_file)
-                        for _s in xls.sheet_names:
-                            _m = _re.search(r'cycle(\d+)', _s)
-                            if _m and int(_m.group(1)) == cycle_number - 1:
-                                prev_cycle_sheets.append(_s)
-                    except Exception:
-                        pass
+                    # ============================================================
+                    # SAFEGUARD: Build protected questions list from previous cycle
+                    # ============================================================
+                    prev_passing_questions = []
+                    prev_pass_rate = 0.0
+                    if cycle_number > 1:
+                        prev_cycle_sheets = []
+                        try:
+                            xls = pd.ExcelFile(excel_file)
+                            for _s in xls.sheet_names:
+                                _m = re.search(r'cycle(\d+)', _s)
+                                if _m and int(_m.group(1)) == cycle_number - 1:
+                                    prev_cycle_sheets.append(_s)
+                        except Exception:
+                            pass
                     
-                    if prev_cycle_sheets:
-                        prev_cycle_sheets.sort(reverse=True)
-                        prev_results_data = extract_results_from_sheet(excel_file, prev_cycle_sheets[0])
-                        if prev_results_data:
-                            prev_pass_rate = prev_results_data.get('pass_rate', 0.0)
-                            for qr in prev_results_data.get('question_results', []):
-                                if qr.get('status') in ('PASS', 'PARTIAL'):
-                                    prev_passing_questions.append(qr['q_number'])
+                        if prev_cycle_sheets:
+                            prev_cycle_sheets.sort(reverse=True)
+                            prev_results_data = extract_results_from_sheet(excel_file, prev_cycle_sheets[0])
+                            if prev_results_data:
+                                prev_pass_rate = prev_results_data.get('pass_rate', 0.0)
+                                for qr in prev_results_data.get('question_results', []):
+                                    if qr.get('status') in ('PASS', 'PARTIAL'):
+                                        prev_passing_questions.append(qr['q_number'])
                 
-                # Build protected questions text for Gemini
-                protected_questions_text = ""
-                if prev_passing_questions:
-                    protected_lines = []
-                    for q_num in prev_passing_questions:
-                        q_match = next((q for q in questions_list if q.get('number') == q_num), None)
-                        if q_match:
-                            inputs = q_match.get('inputs', {})
-                            product = inputs.get('Input:Product', '')
-                            question = inputs.get('Input:Question', '')
-                            expected = q_match.get('expectedAnswer', '')
-                            protected_lines.append(f"- {q_num} [{product}]: {question[:60]}... -> {expected[:60]}...")
-                        else:
-                            protected_lines.append(f"- {q_num}: (currently passing)")
-                    protected_questions_text = '\n'.join(protected_lines)
-                    log_print(f"  ✓ Built protected questions list ({len(prev_passing_questions)} questions)")
+                    # Build protected questions text for Gemini
+                    protected_questions_text = ""
+                    if prev_passing_questions:
+                        protected_lines = []
+                        for q_num in prev_passing_questions:
+                            q_match = next((q for q in questions_list if q.get('number') == q_num), None)
+                            if q_match:
+                                inputs = q_match.get('inputs', {})
+                                product = inputs.get('Input:Product', '')
+                                question = inputs.get('Input:Question', '')
+                                expected = q_match.get('expectedAnswer', '')
+                                protected_lines.append(f"- {q_num} [{product}]: {question[:60]}... -> {expected[:60]}...")
+                            else:
+                                protected_lines.append(f"- {q_num}: (currently passing)")
+                        protected_questions_text = '\n'.join(protected_lines)
+                        log_print(f"  ✓ Built protected questions list ({len(prev_passing_questions)} questions)")
                 
-                # Inject protected questions into config for analyze_with_gemini
-                yaml_config_with_protected = yaml_config.copy()
-                if protected_questions_text:
-                    yaml_config_with_protected['_protected_questions_text'] = protected_questions_text
+                    # Inject protected questions into config for analyze_with_gemini
+                    yaml_config_with_protected = yaml_config.copy()
+                    if protected_questions_text:
+                        yaml_config_with_protected['_protected_questions_text'] = protected_questions_text
                 
-                # ============================================================
-                # SAFEGUARD: Retry loop with constraints
-                # ============================================================
-                MAX_RETRIES = 2
-                retry_count = 0
-                rejection_context = None
-                prompt_accepted = False
-
-                # Initialize variables to ensure they're defined even if extraction fails
-                proposed_llm_parser_prompt = ''
-                stage_status = ''
-                stage_complete_reason = ''
-                results_data = None
-
-                # Get current prompt length for size constraint
-                current_prompt_length = 0
-                if cycle_number > 1:
-                    state_dir = get_state_dir()
-                    prev_state_file = state_dir / f"run_{run_id}_cycle_{cycle_number - 1}_state.json" if run_id else state_dir / f"cycle_{cycle_number - 1}_state.json"
-                    if prev_state_file.exists():
+                    # ============================================================
+                    # SAFEGUARD: Retry loop with constraints
+                    # ============================================================
+                    MAX_RETRIES = 2
+                    retry_count = 0
+                    rejection_context = None
+                    prompt_accepted = False
+
+                    # Initialize variables to ensure they're defined even if extraction fails
+                    proposed_llm_parser_prompt = ''
+                    stage_status = ''
+                    stage_complete_reason = ''
+                    results_data = None
+
+                    # Get current prompt length for size constraint
+                    current_prompt_length = 0
+                    if cycle_number > 1:
                         try:
-                            with open(prev_state_file, 'r') as f:
-                                prev_state_data = json.load(f)
-                            current_prompt_length = len(prev_state_data.get('proposed_llm_parser_prompt', ''))
+                            prev_state_data = load_cycle_state(cycle_number - 1, run_id)
+                            if prev_state_data:
+                                current_prompt_length = len(prev_state_data.get('proposed_llm_parser_prompt') or '')
                         except Exception:
                             pass
                 
-                while retry_count <= MAX_RETRIES:
-                    if retry_count > 0:
-                        log_print(f"\n🔄 Retry {retry_count}/{MAX_RETRIES}: Asking Gemini to fix issues...")
+                    while retry_count <= MAX_RETRIES:
+                        if retry_count > 0:
+                            log_print(f"\n🔄 Retry {retry_count}/{MAX_RETRIES}: Asking Gemini to fix issues...")
                     
-                    analysis_result = analyze_with_gemini(
-                        excel_file=excel_file,
-                        sheet_name=new_sheet_name,
-                        pdf_files=pdf_files,
-                        model_name=gemini_model,
-                        config_dict=yaml_config_with_protected,
-                        cycle_number=cycle_number,
-                        rejection_context=rejection_context
-                    )
+                        analysis_result = analyze_with_gemini(
+                            excel_file=excel_file,
+                            sheet_name=new_sheet_name,
+                            pdf_files=pdf_files,
+                            model_name=gemini_model,
+                            config_dict=yaml_config_with_protected,
+                            cycle_number=cycle_number,
+                            rejection_context=rejection_context
+                        )
                     
-                    proposed_llm_parser_prompt = analysis_result.get('proposed_llm_parser_prompt', '')
-                    stage_status = analysis_result.get('stage_status', '')
-                    stage_complete_reason = analysis_result.get('stage_complete_reason', '')
+                        proposed_llm_parser_prompt = analysis_result.get('proposed_llm_parser_prompt', '')
+                        stage_status = analysis_result.get('stage_status', '')
+                        stage_complete_reason = analysis_result.get('stage_complete_reason', '')
                     
-                    log_print(f"\n✅ Step 3 Complete: Gemini analysis finished")
-                    log_print(f"   Stage Status: {stage_status}")
-                    if stage_complete_reason:
-                        log_print(f"   Reason: {stage_complete_reason[:100]}...")
+                        log_print(f"\n✅ Step 3 Complete: Gemini analysis finished")
+                        log_print(f"   Stage Status: {stage_status}")
+                        if stage_complete_reason:
+                            log_print(f"   Reason: {stage_complete_reason[:100]}...")
                     
-                    # Extract current cycle results for comparison
-                    results_data = extract_results_from_sheet(excel_file, new_sheet_name)
+                        # Current cycle results for comparison (computed from the sheet analyze_with_gemini wrote)
+                        results_data = analysis_result['results_data']
                     
-                    # ============================================================
-                    # SAFEGUARD 1: Prompt Size Constraint (150% max)
-                    # ============================================================
-                    if current_prompt_length > 0 and proposed_llm_parser_prompt:
-                        max_allowed = int(current_prompt_length * 1.5)
-                        proposed_length = len(proposed_llm_parser_prompt)
+                        # ============================================================
+                        # SAFEGUARD 1: Prompt Size Constraint (150% max)
+                        # ============================================================
+                        if current_prompt_length > 0 and proposed_llm_parser_prompt:
+                            max_allowed = int(current_prompt_length * 1.5)
+                            proposed_length = len(proposed_llm_parser_prompt)
                         
-                        if proposed_length > max_allowed:
-                            log_print(f"\n⚠️  PROMPT SIZE REJECTED: {proposed_length} chars > {max_allowed} max (150% of {current_prompt_length})")
-                            rejection_context = {
-                                'reason': 'prompt_too_large',
-                                'proposed_length': proposed_length,
-                                'current_length': current_prompt_length,
-                                'max_allowed': max_allowed
-                            }
-                            retry_count += 1
-                            continue
-                        else:
-                            log_print(f"   ✅ Prompt size OK: {proposed_length} chars (max: {max_allowed})")
+                            if proposed_length > max_allowed:
+                                log_print(f"\n⚠️  PROMPT SIZE REJECTED: {proposed_length} chars > {max_allowed} max (150% of {current_prompt_length})")
+                                rejection_context = {
+                                    'reason': 'prompt_too_large',
+                                    'proposed_length': proposed_length,
+                                    'current_length': current_prompt_length,
+                                    'max_allowed': max_allowed
+                                }
+                                retry_count += 1
+                                continue
+                            else:
+                                log_print(f"   ✅ Prompt size OK: {proposed_length} chars (max: {max_allowed})")
                     
-                    # ============================================================
-                    # SAFEGUARDS 2+3: Regression Detection + Net Improvement Gate
-                    # ============================================================
-                    if cycle_number > 1 and results_data and prev_passing_questions:
-                        curr_passing = [qr['q_number'] for qr in results_data.get('question_results', []) if qr.get('status') in ('PASS', 'PARTIAL')]
-                        curr_pass_rate = results_data.get('pass_rate', 0.0)
+                        # ============================================================
+                        # SAFEGUARDS 2+3: Regression Detection + Net Improvement Gate
+                        # ============================================================
+                        if cycle_number > 1 and results_data and prev_passing_questions:
+                            curr_passing = [qr['q_number'] for qr in results_data.get('question_results', []) if qr.get('status') in ('PASS', 'PARTIAL')]
+                            curr_pass_rate = results_data.get('pass_rate', 0.0)
                         
-                        regressions = sorted(set(prev_passing_questions) - set(curr_passing))
-                        new_passes = sorted(set(curr_passing) - set(prev_passing_questions))
-                        net_improvement = len(new_passes) - len(regressions)
+                            regressions = sorted(set(prev_passing_questions) - set(curr_passing))
+                            new_passes = sorted(set(curr_passing) - set(prev_passing_questions))
+                            net_improvement = len(new_passes) - len(regressions)
                         
-                        log_print(f"\n📊 Differential Analysis (Cycle {cycle_number} vs Cycle {cycle_number - 1}):")
-                        log_print(f"   Previous pass rate: {prev_pass_rate:.1f}% | Current: {curr_pass_rate:.1f}%")
-                        log_print(f"   New passes: {len(new_passes)} ({', '.join(new_passes) if new_passes else 'none'})")
-                        log_print(f"   Regressions: {len(regressions)} ({', '.join(regressions) if regressions else 'none'})")
-                        log_print(f"   Net improvement: {net_improvement:+d}")
+                            log_print(f"\n📊 Differential Analysis (Cycle {cycle_number} vs Cycle {cycle_number - 1}):")
+                            log_print(f"   Previous pass rate: {prev_pass_rate:.1f}% | Current: {curr_pass_rate:.1f}%")
+                            log_print(f"   New passes: {len(new_passes)} ({', '.join(new_passes) if new_passes else 'none'})")
+                            log_print(f"   Regressions: {len(regressions)} ({', '.join(regressions) if regressions else 'none'})")
+                            log_print(f"   Net improvement: {net_improvement:+d}")
                         
-                        if regressions and net_improvement <= 0:
-                            log_print(f"\n⚠️  REJECTED: Regressions detected with no net improvement (net={net_improvement})")
-                            rejection_context = {
-                                'reason': 'regressions_detected',
-                                'regressions': regressions,
-                                'new_passes': new_passes,
-                                'net_improvement': net_improvement,
-                                'protected_questions': prev_passing_questions,
-                                'protected_questions_text': protected_questions_text
-                            }
-                            retry_count += 1
-                            continue
-                        elif regressions and net_improvement > 0:
-                            log_print(f"   ⚠️  Regressions detected but net improvement is positive (+{net_improvement}). Accepting with warning.")
-                        else:
-                            log_print(f"   ✅ No regressions detected")
+                            if regressions and net_improvement <= 0:
+                                log_print(f"\n⚠️  REJECTED: Regressions detected with no net improvement (net={net_improvement})")
+                                rejection_context = {
+                                    'reason': 'regressions_detected',
+                                    'regressions': regressions,
+                                    'new_passes': new_passes,
+                                    'net_improvement': net_improvement,
+                                    'protected_questions': prev_passing_questions,
+                                    'protected_questions_text': protected_questions_text
+                                }
+                                retry_count += 1
+                                continue
+                            elif regressions and net_improvement > 0:
+                                log_print(f"   ⚠️  Regressions detected but net improvement is positive (+{net_improvement}). Accepting with warning.")
+                            else:
+                                log_print(f"   ✅ No regressions detected")
                     
-                    # All checks passed
-                    prompt_accepted = True
-                    break
+                        # All checks passed
+                        prompt_accepted = True
+                        break
                 
-                # ============================================================
-                # SAFEGUARD 4: Hard rollback if retries exhausted
-                # ============================================================
-                if not prompt_accepted:
-                    log_print(f"\n❌ Max retries ({MAX_RETRIES}) exhausted. Hard rollback to Cycle {cycle_number - 1} prompt.")
+                    # ============================================================
+                    # SAFEGUARD 4: Hard rollback if retries exhausted
+                    # ============================================================
+                    if not prompt_accepted:
+                        log_print(f"\n❌ Max retries ({MAX_RETRIES}) exhausted. Hard rollback to Cycle {cycle_number - 1} prompt.")
                     
-                    # Load previous cycle's prompt
-                    state_dir = get_state_dir()
-                    prev_state_file = state_dir / f"run_{run_id}_cycle_{cycle_number - 1}_state.json" if run_id else state_dir / f"cycle_{cycle_number - 1}_state.json"
-                    if prev_state_file.exists():
+                        # Load previous cycle's prompt
                         try:
-                            with open(prev_state_file, 'r') as f:
-                                prev_state_data = json.load(f)
-                            proposed_llm_parser_prompt = prev_state_data.get('proposed_llm_parser_prompt', '')
-                            log_print(f"   ✅ Rolled back to Cycle {cycle_number - 1} prompt ({len(proposed_llm_parser_prompt)} chars)")
+                            prev_state_data = load_cycle_state(cycle_number - 1, run_id)
+                            if prev_state_data:
+                                proposed_llm_parser_prompt = prev_state_data.get('proposed_llm_parser_prompt', '')
+                                log_print(f"   ✅ Rolled back to Cycle {cycle_number - 1} prompt ({len(proposed_llm_parser_prompt)} chars)")
                         except Exception as rollback_err:
                             log_print(f"   ⚠️  Rollback failed to load state: {rollback_err}")
                     
-                    stage_status = "rolled_back"
-                    stage_complete_reason = (
-                        f"Hard rollback after {MAX_RETRIES} failed retries. "
-                        f"Last rejection: {rejection_context.get('reason', 'unknown') if rejection_context else 'unknown'}. "
-                        f"Keeping best known prompt from Cycle {cycle_number - 1}."
-                    )
-                    log_print(f"   Stage Status: {stage_status}")
-                    log_print(f"   Reason: {stage_complete_reason}")
+                        stage_status = StageStatus.ROLLED_BACK
+                        stage_complete_reason = (
+                            f"Hard rollback after {MAX_RETRIES} failed retries. "
+                            f"Last rejection: {rejection_context.get('reason', 'unknown') if rejection_context else 'unknown'}. "
+                            f"Keeping best known prompt from Cycle {cycle_number - 1}."
+                        )
+                        log_print(f"   Stage Status: {stage_status}")
+                        log_print(f"   Reason: {stage_complete_reason}")
+                
+                    # Update Running_Score column (always, even on rollback) before step_complete uploads the Excel
+                    if results_data:
+                        update_run_summary_sheet(excel_file, run_id, cycle_number, results_data, yaml_config)
+                
+                    # Progress callback - include Excel file path AFTER it's been updated with analysis results
+                    if progress_callback is not None:
+                        _notify(progress_callback, 'step_complete', run_id, cycle_number, 3,
+                                f'Gemini analysis complete (Stage Status: {stage_status})',
+                                stage_status=stage_status, excel_file=excel_file_str)
                 
-                # Update Running_Score sheet (always, even on rollback)
-                if results_data:
-                    update_run_summary_sheet(
+                    # Save state after Step 3
+                    save_state(
+                        cycle_number=cycle_number,
+                        last_completed_step=3,
+                        sheet_name=new_sheet_name,
+                        refinement_stage=refinement_stage,
+                        stage_status=stage_status,
+                        proposed_llm_parser_prompt=proposed_llm_parser_prompt,
+                        proposed_response_prompt=analysis_result.get('proposed_response_prompt', ''),
+                        stage_complete_reason=stage_complete_reason,
                         excel_file=excel_file,
                         run_id=run_id,
-                        cycle_number=cycle_number,
-                        results_data=results_data,
-                        config_dict=yaml_config
+                        yaml_config_snapshot=yaml_config,
+                        background=True
                     )
                 
-                # Progress callback - include Excel file path AFTER it's been updated with analysis results
-                if progress_callback:
-                    try:
-                        progress_callback({
-                            'status': 'step_complete', 
-                            'cycle': cycle_number, 
-                            'step': 3, 
-                            'stage_status': stage_status, 
-                            'run_id': run_id, 
-                            'message': f'Gemini analysis complete (Stage Status: {stage_status})',
-                            'excel_file': str(excel_file) if excel_file else None
-                        })
-                    except:
-                        pass
-                
-                # Save state after Step 3
-                save_state(
-                    cycle_number=cycle_number,
-                    last_completed_step=3,
-                    sheet_name=new_sheet_name,
-                    refinement_stage=refinement_stage,
-                    stage_status=stage_status,
-                    proposed_llm_parser_prompt=proposed_llm_parser_prompt,
-                    proposed_response_prompt=analysis_result.get('proposed_response_prompt', ''),
-                    stage_complete_reason=stage_complete_reason,
-                    excel_file=excel_file,
-                    run_id=run_id,
-                    yaml_config_snapshot=yaml_config
-                )
-                
-            except Exception as e:
-                error_type = type(e).__name__
-                error_msg = str(e)
-                log_print(f"\n❌ Step 3 Failed: {error_type}: {error_msg[:500]}")
-                
-                # Progress callback - report error
-                if progress_callback:
-                    try:
-                        error_msg_full = f"Step 3 Failed: {error_type}: {error_msg}"
-                        progress_callback({'status': 'error', 'cycle': cycle_number, 'step': 3, 'run_id': run_id, 'message': error_msg_full, 'error': error_msg})
-                    except:
-                        pass
-                
-                log_print("\n❌ CRITICAL ERROR: Step 3 (Analyzing Results with Gemini) failed.")
-                log_print("❌ The workflow cannot continue without successfully analyzing results.")
-                log_print("❌ This is a critical step and cannot be skipped.")
-                log_print(f"❌ Error details: {error_type}: {error_msg}")
-                log_print("\n💡 Possible solutions:")
-                log_print("   1. Check Gemini API key is set correctly")
-                log_print("   2. Verify network connectivity to Gemini API")
-                log_print("   3. Check that the Excel sheet was created correctly in Step 2")
-                log_print("   4. Review the full error message above for specific issues")
-                
-                # Save error state
-                save_state(
-                    cycle_number=cycle_number,
-                    last_completed_step=2,  # Only Step 2 completed
-                    sheet_name=new_sheet_name,
-                    refinement_stage=refinement_stage,
-                    stage_status='error',
-                    proposed_llm_parser_prompt=None,
-                    proposed_response_prompt=None,
-                    stage_complete_reason=f"Step 3 failed: {error_type}: {error_msg[:200]}",
-                    excel_file=excel_file,
-                    run_id=run_id,
-                    yaml_config_snapshot=yaml_config
-                )
-                
-                # Stop the workflow - don't continue
-                raise RuntimeError(f"Step 3 (Analyzing Results with Gemini) failed: {error_type}: {error_msg}. Workflow stopped.")
+                except Exception as e:
+                    error_type = type(e).__name__
+                    error_msg = str(e)
+                    failure = _handle_step_failure(
+                        3, f"{error_type}: {error_msg}", progress_callback=progress_callback, run_id=run_id,
+                        cycle_number=cycle_number, refinement_stage=refinement_stage, excel_file=excel_file,
+                        yaml_config=yaml_config, sheet_name=new_sheet_name,
+                        log_detail=f"{error_type}: {error_msg[:500]}", notify_error=error_msg,
+                        reason_detail=f"{error_type}: {error_msg[:200]}"
+                    )
+                    raise failure
         
-        # Track composite score for consecutive no-improvement detection
-        if results_data:
-            curr_pass = results_data.get('pass_count', 0)
-            curr_partial = results_data.get('partial_count', 0)
-            curr_composite = curr_pass * 2 + curr_partial
-            log_print(f"\n📈 Composite Score: {curr_composite} (PASS={curr_pass}×2 + PARTIAL={curr_partial}×1)")
+            # Track composite score for consecutive no-improvement detection
+            if results_data:
+                curr_pass = results_data.get('pass_count', 0)
+                curr_partial = results_data.get('partial_count', 0)
+                curr_composite = curr_pass * 2 + curr_partial
+                log_print(f"\n📈 Composite Score: {curr_composite} (PASS={curr_pass}×2 + PARTIAL={curr_partial}×1)")
             
-            if prev_composite_score >= 0:
-                if curr_composite > prev_composite_score:
-                    consecutive_no_improvement = 0
-                    log_print(f"   ✅ Improvement detected: {prev_composite_score} → {curr_composite} (+{curr_composite - prev_composite_score})")
-                else:
-                    consecutive_no_improvement += 1
-                    log_print(f"   ⚠️  No improvement: {prev_composite_score} → {curr_composite} (stall {consecutive_no_improvement}/{MAX_CONSECUTIVE_NO_IMPROVEMENT})")
-            prev_composite_score = curr_composite
+                if prev_composite_score >= 0:
+                    if curr_composite > prev_composite_score:
+                        consecutive_no_improvement = 0
+                        log_print(f"   ✅ Improvement detected: {prev_composite_score} → {curr_composite} (+{curr_composite - prev_composite_score})")
+                    else:
+                        consecutive_no_improvement += 1
+                        log_print(f"   ⚠️  No improvement: {prev_composite_score} → {curr_composite} (stall {consecutive_no_improvement}/{MAX_CONSECUTIVE_NO_IMPROVEMENT})")
+                prev_composite_score = curr_composite
             
-            if consecutive_no_improvement >= MAX_CONSECUTIVE_NO_IMPROVEMENT:
+                if consecutive_no_improvement >= MAX_CONSECUTIVE_NO_IMPROVEMENT:
+                    if cycle_number >= min_cycles:
+                        log_print(_SEP_EQ)
+                        log_print("⏹️  STOPPING: No improvement for 2 consecutive cycles")
+                        log_print(_RULE_EQ)
+                        log_print(f"Composite score stalled at {curr_composite} (PASS={curr_pass}, PARTIAL={curr_partial})")
+                        log_print(f"The parser has likely reached its optimization ceiling for these questions.")
+                        break
+                    else:
+                        log_print(f"   ℹ️  Stalled but only {cycle_number}/{min_cycles} min cycles done — continuing")
+        
+            # Check if we should continue (respect minCycles before honoring early-exit signals)
+            if stage_status == StageStatus.OPTIMIZED:
                 if cycle_number >= min_cycles:
-                    log_print("\n" + "="*80)
-                    log_print("⏹️  STOPPING: No improvement for 2 consecutive cycles")
-                    log_print("="*80)
-                    log_print(f"Composite score stalled at {curr_composite} (PASS={curr_pass}, PARTIAL={curr_partial})")
-                    log_print(f"The parser has likely reached its optimization ceiling for these questions.")
+                    log_print(_SEP_EQ)
+                    log_print("✅ REFINEMENT COMPLETE!")
+                    log_print(_RULE_EQ)
+                    log_print(f"Stage '{refinement_stage}' is optimized after {cycle_number} cycle(s)")
                     break
                 else:
-                    log_print(f"   ℹ️  Stalled but only {cycle_number}/{min_cycles} min cycles done — continuing")
-        
-        # Check if we should continue (respect minCycles before honoring early-exit signals)
-        if stage_status == "optimized":
-            if cycle_number >= min_cycles:
-                log_print("\n" + "="*80)
-                log_print("✅ REFINEMENT COMPLETE!")
-                log_print("="*80)
-                log_print(f"Stage '{refinement_stage}' is optimized after {cycle_number} cycle(s)")
-                break
-            else:
-                log_print(f"\n   ℹ️  Gemini says 'optimized' but only {cycle_number}/{min_cycles} min cycles done — continuing")
-                stage_status = "needs_improvement"
+                    log_print(f"\n   ℹ️  Gemini says 'optimized' but only {cycle_number}/{min_cycles} min cycles done — continuing")
+                    stage_status = StageStatus.NEEDS_IMPROVEMENT
         
-        if stage_status == "rolled_back":
-            if cycle_number >= min_cycles:
-                log_print("\n" + "="*80)
-                log_print("⚠️  OPTIMIZATION STOPPED - ROLLBACK")
-                log_print("="*80)
-                log_print(f"Stage '{refinement_stage}' rolled back after {cycle_number} cycle(s)")
-                log_print(f"Reason: {stage_complete_reason}")
-                log_print("The optimizer could not improve without causing regressions.")
-                log_print("Consider: reviewing persistent failures manually, adjusting test questions, or trying a different model.")
-                break
-            else:
-                log_print(f"\n   ℹ️  Gemini says 'rolled_back' but only {cycle_number}/{min_cycles} min cycles done — continuing")
-                stage_status = "needs_improvement"
+            if stage_status == StageStatus.ROLLED_BACK:
+                if cycle_number >= min_cycles:
+                    log_print(_SEP_EQ)
+                    log_print("⚠️  OPTIMIZATION STOPPED - ROLLBACK")
+                    log_print(_RULE_EQ)
+                    log_print(f"Stage '{refinement_stage}' rolled back after {cycle_number} cycle(s)")
+                    log_print(f"Reason: {stage_complete_reason}")
+                    log_print("The optimizer could not improve without causing regressions.")
+                    log_print("Consider: reviewing persistent failures manually, adjusting test questions, or trying a different model.")
+                    break
+                else:
+                    log_print(f"\n   ℹ️  Gemini says 'rolled_back' but only {cycle_number}/{min_cycles} min cycles done — continuing")
+                    stage_status = StageStatus.NEEDS_IMPROVEMENT
         
-        # Continue to next cycle
-        # The proposed prompt from this cycle will be applied at the start of the next cycle (Step 1)
-        log_print(f"\n🔄 Stage Status: '{stage_status}' - Continuing to next refinement cycle...")
-        log_print(f"   Proposed prompt from Cycle {cycle_number} will be applied at the start of Cycle {cycle_number + 1} (Step 1)")
+            # Continue to next cycle
+            # The proposed prompt from this cycle will be applied at the start of the next cycle (Step 1)
+            log_print(f"\n🔄 Stage Status: '{stage_status}' - Continuing to next refinement cycle...")
+            log_print(f"   Proposed prompt from Cycle {cycle_number} will be applied at the start of Cycle {cycle_number + 1} (Step 1)")
         
-        # Increment cycle number for next iteration
-        cycle_number += 1
+            # Increment cycle number for next iteration
+            cycle_number += 1
         
-        if cycle_number <= max_cycles:
-            log_print("   Waiting 5 seconds before next cycle...")
-            # Update heartbeat before waiting
-            if progress_callback:
-                try:
-                    progress_callback({
-                        'status': 'heartbeat',
-                        'run_id': run_id,
-                        'cycle': cycle_number,
-                        'step': 0,
-                        'message': f'Preparing for next cycle...'
-                    })
-                except:
-                    pass
-            last_heartbeat = datetime.now()
-            time.sleep(5)
+            if cycle_number <= max_cycles:
+                # The next cycle will run Step 1, which needs a Salesforce session: authenticate during the pause
+                if refinement_stage == "llm_parser":
+                    next_cycle_session = prefetch_salesforce_session(username, password, instance_url)
+                log_print(f"   Waiting {INTER_CYCLE_WAIT_SECONDS} seconds before next cycle...")
+                # Wait in 1s slices: heartbeat each slice and stop early when the run was cancelled
+                for remaining in range(INTER_CYCLE_WAIT_SECONDS, 0, -1):
+                    if run_id and check_run_aborted and check_run_aborted(run_id):
+                        log_print(f"❌ Job aborted before Cycle {cycle_number}. Stopping workflow.")
+                        raise RuntimeError("Job aborted")
+                    if progress_callback:
+                        _notify(progress_callback, 'heartbeat', run_id, cycle_number, 0, f'Preparing for next cycle... ({remaining}s)')
+                    time.sleep(1.0)
+                last_heartbeat = time.monotonic()
         
-        # Clear resume_step flag after first iteration (so next cycle runs normally)
-        if resume_step:
-            resume_step = None
-    
-    if cycle_number > max_cycles:
-        log_print("\n" + "="*80)
-        log_print("⚠️  MAX CYCLES REACHED")
-        log_print("="*80)
-        log_print(f"Reached maximum of {max_cycles} cycles. Stopping.")
-        log_print("   Check Stage Status in Excel sheet to determine if optimization is complete.")
-    
-    log_print("\n" + "="*80)
-    log_print("✅ FULL WORKFLOW COMPLETE!")
-    log_print("="*80)
-    log_print(f"Completed {cycle_number} refinement cycle(s)")
-    if 'new_sheet_name' in locals() and new_sheet_name:
-        log_print(f"Final sheet: '{new_sheet_name}'")
-    log_print(f"Final Stage Status: {stage_status}")
-    
-    # Clean up state file on successful completion
-    if not resume:
-        clean_state()
-        log_print("  🧹 State files cleaned (workflow complete)")
-    
-    # Progress callback - completion
-    if progress_callback:
-        try:
-            progress_callback({'status': 'complete', 'cycle': cycle_number, 'stage_status': stage_status, 'excel_file': excel_file if 'excel_file' in locals() else None, 'run_id': run_id})
-        except:
-            pass
+            # Clear resume_step flag after first iteration (so next cycle runs normally)
+            if resume_step:
+                resume_step = None
     
-    # Return results for Streamlit
-    return {
-        'run_id': run_id if 'run_id' in locals() else None,
-        'excel_file': excel_file if 'excel_file' in locals() else None,
-        'final_sheet': new_sheet_name if 'new_sheet_name' in locals() else None,
-        'stage_status': stage_status if 'stage_status' in locals() else None,
-        'cycles_completed': cycle_number if 'cycle_number' in locals() else 0,
-        'success': True
-    }
+        if cycle_number > max_cycles:
+            log_print(_SEP_EQ)
+            log_print("⚠️  MAX CYCLES REACHED")
+            log_print(_RULE_EQ)
+            log_print(f"Reached maximum of {max_cycles} cycles. Stopping.")
+            log_print("   Check Stage Status in Excel sheet to determine if optimization is complete.")
+    
+        log_print(_SEP_EQ)
+        log_print("✅ FULL WORKFLOW COMPLETE!")
+        log_print(_RULE_EQ)
+        log_print(f"Completed {cycle_number} refinement cycle(s)")
+        if new_sheet_name:
+            log_print(f"Final sheet: '{new_sheet_name}'")
+        log_print(f"Final Stage Status: {stage_status}")
+        flush_state_writes()
+    
+        # Clean up state file on successful completion
+        if not resume:
+            clean_state()
+            log_print("  🧹 State files cleaned (workflow complete)")
+    
+        # Progress callback - completion
+        _notify(progress_callback, 'complete', run_id, cycle_number,
+                stage_status=stage_status, excel_file=excel_file)
+    
+        # Return results for Streamlit
+        return {
+            'run_id': run_id,
+            'excel_file': excel_file,
+            'final_sheet': new_sheet_name,
+            'stage_status': stage_status,
+            'cycles_completed': cycle_number,
+            'success': True
+        }
+    finally:
+        if next_cycle_session is not None:
+            next_cycle_session.cancel()
+        shutdown_cycle_prefetcher()
+        if step1_runner is not None:
+            step1_runner.close()
+        _forget_run_state(run_id)
 
 
 def main():
@@ -2861,8 +3094,7 @@ def main():
         if not args.yaml_input or not os.path.exists(args.yaml_input):
             log_print("❌ ERROR: --yaml-input is required for standalone analysis")
             sys.exit(1)
-        with open(args.yaml_input, 'r') as f:
-            yaml_config = yaml.safe_load(f)
+        yaml_config = load_yaml_config(args.yaml_input)
         analyze_with_gemini(
             excel_file=args.excel,
             sheet_name=args.sheet,
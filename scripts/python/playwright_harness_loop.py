@@ -5,6 +5,9 @@ Standalone Heroku harness loop for Playwright Cycle 2 Step 1.
 Purpose:
 - Run only the Search Index UI creation step in a repeatable loop.
 - Keep auth-state reuse behavior exactly as in core code.
+- Launch a fresh browser per attempt, as Step 1 does in production, so each attempt
+  reproduces the real login/storage-state path and a wedged browser cannot leak into
+  the next one; the per-attempt memory readings measure that path.
 - Produce deterministic artifacts per attempt for continuous improvement.
 """
 
@@ -12,19 +15,38 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import ctypes
+import gc
 import json
 import importlib.util
 import random
 import sys
+import threading
 import time
 import tempfile
+import traceback
+import tracemalloc
 from collections import deque
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import Callable, Optional
 
 import yaml
 
+# libyaml-backed loader when PyYAML was built with it; pure-Python SafeLoader otherwise
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+try:
+    import psutil  # Per-attempt memory accounting; skipped when unavailable
+except ImportError:
+    psutil = None
+
+try:
+    import uvloop  # Faster event loop for the Playwright pipe traffic; stdlib loop otherwise
+except ImportError:
+    uvloop = None
+
 SCRIPT_DIR = Path(__file__).resolve().parent
 if str(SCRIPT_DIR) not in sys.path:
     sys.path.insert(0, str(SCRIPT_DIR))
@@ -41,6 +63,36 @@ def _new_run_id() -> str:
     return f"harness_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{random.randint(1000, 9999)}"
 
 
+@dataclass(slots=True)
+class AttemptResult:
+    """One harness attempt, as written to the JSONL history."""
+    ok: bool
+    run_id: str
+    strategy: str
+    elapsed_seconds: float
+    timestamp: str
+    index_id: Optional[str] = None
+    index_name: Optional[str] = None
+    error: Optional[str] = None
+    traceback: Optional[str] = None
+    memory: dict = field(default_factory=dict)
+    browser_processes_after: Optional[int] = None
+    tracemalloc_top: Optional[list[str]] = None
+
+    def to_json(self, exclude: tuple[str, ...] = ()) -> str:
+        # Unset optional fields are omitted so success and failure lines keep their shapes.
+        return json.dumps(
+            {k: v for k, v in asdict(self).items() if v is not None and v != {} and k not in exclude}
+        )
+
+
+def _emit(lines: list[str]) -> None:
+    """Write a batch of log lines with one write + flush instead of one per line."""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+
 BASELINE_HYBRID_BLOCK = """        print("   [create_index] Builder opened. Hybrid + RagFileUDMO...", flush=True)
         hybrid_btn = builder.get_by_text("Hybrid search", exact=False).or_(builder.get_by_text("Hybrid Search", exact=False)).first
         await hybrid_btn.wait_for(state="visible", timeout=15000)
@@ -819,16 +871,32 @@ STRATEGY_BLOCKS: dict[str, str] = {
 }
 
 
+# Patched _create_search_index_ui per strategy, keyed on the source mtime so edits to
+# playwright_scripts.py are still picked up between attempts without a restart.
+_CREATE_INDEX_FUNCS: dict[str, tuple[int, Callable]] = {}
+
+
 def _load_create_index_func(strategy: str) -> Callable:
     source_path = SCRIPT_DIR / "playwright_scripts.py"
+    source_mtime = source_path.stat().st_mtime_ns
+    cached = _CREATE_INDEX_FUNCS.get(strategy)
+    if cached and cached[0] == source_mtime:
+        return cached[1]
+    func = _build_create_index_func(source_path, strategy)
+    _CREATE_INDEX_FUNCS[strategy] = (source_mtime, func)
+    return func
+
+
+def _build_create_index_func(source_path: Path, strategy: str) -> Callable:
     source = source_path.read_text(encoding="utf-8")
+    patch_warnings: list[str] = []
     if strategy not in STRATEGY_BLOCKS:
         strategy = "baseline"
     replacement = STRATEGY_BLOCKS[strategy]
     if BASELINE_SETUP_URL_LINE in source:
         source = source.replace(BASELINE_SETUP_URL_LINE, SETUP_URL_CANDIDATES_BLOCK, 1)
     else:
-        print("[harness] WARN: setup_url line not found; candidate setup patch skipped.", flush=True)
+        patch_warnings.append("[harness] WARN: setup_url line not found; candidate setup patch skipped.")
     if strategy == "setup_only_recovery":
         if BASELINE_OBJECT_NEW_FALLBACK not in source:
             raise RuntimeError("Could not find object-new fallback block for setup_only_recovery strategy.")
@@ -838,7 +906,7 @@ def _load_create_index_func(strategy: str) -> Callable:
     else:
         # Keep strategy execution alive even if upstream source formatting changed.
         # This prevents matrix runs from aborting on brittle text replacement.
-        print(f"[harness] WARN: hybrid patch block not found for strategy={strategy}; continuing without hybrid override.", flush=True)
+        patch_warnings.append(f"[harness] WARN: hybrid patch block not found for strategy={strategy}; continuing without hybrid override.")
     if BASELINE_CHUNK_INPUTS_LINE in source:
         source = source.replace(
             BASELINE_CHUNK_INPUTS_LINE,
@@ -846,31 +914,32 @@ def _load_create_index_func(strategy: str) -> Callable:
             1,
         )
     else:
-        print("[harness] WARN: chunk_inputs line not found; chunk-js patch skipped.", flush=True)
+        patch_warnings.append("[harness] WARN: chunk_inputs line not found; chunk-js patch skipped.")
     if BASELINE_CHUNK_ERROR_LINE in source:
         source = source.replace(BASELINE_CHUNK_ERROR_LINE, CHUNK_ERROR_REPLACEMENT, 1)
     else:
-        print("[harness] WARN: chunk error line not found; chunk-js strategy skipped.", flush=True)
+        patch_warnings.append("[harness] WARN: chunk error line not found; chunk-js strategy skipped.")
     if BASELINE_CHUNK_FILL_BLOCK in source:
         source = source.replace(BASELINE_CHUNK_FILL_BLOCK, CHUNK_FILL_BLOCK_REPLACEMENT, 1)
     else:
-        print("[harness] WARN: chunk fill block not found; chunk-js fill guard skipped.", flush=True)
+        patch_warnings.append("[harness] WARN: chunk fill block not found; chunk-js fill guard skipped.")
     if BASELINE_TABLE_SAVE_BLOCK in source:
         source = source.replace(BASELINE_TABLE_SAVE_BLOCK, TABLE_SAVE_REPLACEMENT, 1)
     else:
-        print("[harness] WARN: table save block not found; save-gate patch skipped.", flush=True)
+        patch_warnings.append("[harness] WARN: table save block not found; save-gate patch skipped.")
     if BASELINE_POST_CHUNK_NEXT_BLOCK in source:
         source = source.replace(BASELINE_POST_CHUNK_NEXT_BLOCK, POST_CHUNK_NEXT_REPLACEMENT, 1)
     else:
-        print("[harness] WARN: post-chunk Next block not found; step-probe patch skipped.", flush=True)
+        patch_warnings.append("[harness] WARN: post-chunk Next block not found; step-probe patch skipped.")
     if BASELINE_FINAL_SAVE_LINE in source:
         source = source.replace(BASELINE_FINAL_SAVE_LINE, FINAL_SAVE_REPLACEMENT, 1)
     else:
-        print("[harness] WARN: final Save line not found; final save-gate patch skipped.", flush=True)
+        patch_warnings.append("[harness] WARN: final Save line not found; final save-gate patch skipped.")
     if BASELINE_LOOKUP_RETURN_LINE in source:
         source = source.replace(BASELINE_LOOKUP_RETURN_LINE, LOOKUP_RETURN_REPLACEMENT, 1)
     else:
-        print("[harness] WARN: lookup return line not found; full_name retention patch skipped.", flush=True)
+        patch_warnings.append("[harness] WARN: lookup return line not found; full_name retention patch skipped.")
+    _emit(patch_warnings)
     with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False, encoding="utf-8") as tf:
         tf.write(source)
         temp_path = tf.name
@@ -878,13 +947,230 @@ def _load_create_index_func(strategy: str) -> Callable:
     if not spec or not spec.loader:
         raise RuntimeError("Failed to load temporary Playwright module.")
     module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        Path(temp_path).unlink(missing_ok=True)
     func = getattr(module, "_create_search_index_ui", None)
     if not callable(func):
         raise RuntimeError("Patched module missing _create_search_index_ui.")
     return func
 
 
+_PROC_STATUS_KEYS = ("VmRSS", "VmHWM", "VmSize", "VmPeak", "VmSwap")
+
+
+def _read_proc_status() -> dict:
+    """Harness process memory in MB from /proc/self/status, including the VmHWM/VmPeak
+    high-water marks psutil does not expose. Empty off Linux."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    out = {}
+    for line in lines:
+        key, _, value = line.partition(":")
+        if key in _PROC_STATUS_KEYS:
+            out[f"{key}_mb"] = round(int(value.split()[0]) / 1024, 1)  # reported in kB
+    return out
+
+
+# One handle for the harness process, reused by every sample instead of re-created per call.
+_SELF_PROCESS = psutil.Process() if psutil is not None else None
+
+_BROWSER_PROCESS_NAMES = frozenset({"chrome", "chromium", "headless_shell", "chrome_crashpad_handler"})
+
+
+def _count_browser_processes() -> int:
+    """Browser processes still descended from the harness (0 after a clean attempt).
+
+    Walks only our own children instead of every process on the dyno.
+    """
+    if _SELF_PROCESS is None:
+        return 0
+    try:
+        children = _SELF_PROCESS.children(recursive=True)
+    except psutil.Error:
+        return 0
+    count = 0
+    for child in children:
+        try:
+            if child.name().lower() in _BROWSER_PROCESS_NAMES:
+                count += 1
+        except psutil.Error:
+            continue
+    return count
+
+
+BROWSER_EXIT_TIMEOUT_SECONDS = 5.0
+
+
+async def _wait_for_browser_exit(baseline: int, timeout: float = BROWSER_EXIT_TIMEOUT_SECONDS) -> int:
+    """Poll until browser processes drop back to baseline (bounded); returns the final count."""
+    deadline = time.monotonic() + timeout
+    count = _count_browser_processes()
+    while count > baseline and time.monotonic() < deadline:
+        await asyncio.sleep(0.25)
+        count = _count_browser_processes()
+    return count
+
+
+# --mem-backend choices; each names the "<backend>_mb" key of _memory_usage() that
+# deltas and peaks are reported on.
+MEMORY_BACKENDS = ("rss", "vms", "uss", "pss", "tracemalloc")
+
+
+def _memory_usage() -> dict:
+    """USS/PSS/RSS/VMS in MB summed over the harness and its browser child processes.
+
+    USS is the default leak signal: RSS double-counts the libraries Chromium's helpers share.
+    PSS is Linux-only and USS can be denied on some platforms; both fall back to RSS.
+    tracemalloc_mb (Python heap of the harness only) is included while tracing.
+    """
+    out = {}
+    if tracemalloc.is_tracing():
+        out["tracemalloc_mb"] = round(tracemalloc.get_traced_memory()[0] / (1024 * 1024), 1)
+    if _SELF_PROCESS is None:
+        return out
+    me = _SELF_PROCESS
+    try:
+        procs = [me, *me.children(recursive=True)]
+    except psutil.Error:
+        procs = [me]
+    rss = vms = uss = pss = 0
+    for proc in procs:
+        try:
+            try:
+                info = proc.memory_full_info()
+            except psutil.AccessDenied:
+                info = proc.memory_info()
+        except psutil.Error:
+            continue  # child exited between the walk and the read
+        rss += info.rss
+        vms += info.vms
+        uss += getattr(info, "uss", info.rss)
+        pss += getattr(info, "pss", info.rss)
+    mb = 1024 * 1024
+    out.update(
+        uss_mb=round(uss / mb, 1),
+        pss_mb=round(pss / mb, 1),
+        rss_mb=round(rss / mb, 1),
+        vms_mb=round(vms / mb, 1),
+        processes=len(procs),
+    )
+    return out
+
+
+def _load_malloc_trim() -> Optional[Callable]:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL("libc.so.6", use_errno=True)
+    except OSError:
+        return None  # non-glibc (e.g. musl) images
+    return getattr(libc, "malloc_trim", None)
+
+
+_MALLOC_TRIM = _load_malloc_trim()
+
+
+def _release_freed_memory() -> None:
+    """Collect garbage and hand freed glibc arenas back to the OS before an after reading,
+    so pages glibc merely kept cached do not show up as a per-attempt leak."""
+    gc.collect()
+    if _MALLOC_TRIM is not None:
+        _MALLOC_TRIM(0)
+
+
+def _system_memory() -> dict:
+    """Dyno-wide memory; read once per attempt, not per sample (it parses /proc/meminfo)."""
+    if psutil is None:
+        return {}
+    vm = psutil.virtual_memory()
+    return {"available_mb": round(vm.available / (1024 * 1024), 1), "percent": vm.percent}
+
+
+# Each tick sums USS over every Chromium helper (one smaps read per process), so sample
+# a few times a second rather than in a tight loop that would compete for the GIL. That work
+# lands inside the timed attempt, so peak sampling is opt-in (--peak-sample-seconds).
+MEMORY_SAMPLE_INTERVAL_SECONDS = 0.25
+
+
+class _PeakMemorySampler:
+    """Background thread sampling _memory_usage() while an attempt runs, to catch its peak.
+
+    interval <= 0 disables sampling (peak() then returns {}).
+
+    With sample_path set, every sample is also appended there as a JSON line for plotting,
+    stamped with integer epoch nanoseconds (ts_ns); nothing is formatted per sample.
+    """
+
+    def __init__(
+        self,
+        run_id: str = "",
+        sample_path: Optional[Path] = None,
+        backend: str = "uss",
+        interval: float = MEMORY_SAMPLE_INTERVAL_SECONDS,
+    ):
+        self.run_id = run_id
+        self.metric = f"{backend}_mb"
+        self.sample_path = sample_path
+        self.interval = interval
+        self.samples: list[dict] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="harness-memory-sampler", daemon=True)
+
+    def __enter__(self) -> "_PeakMemorySampler":
+        if self.interval > 0 and (psutil is not None or tracemalloc.is_tracing()):
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self) -> None:
+        fp = self.sample_path.open("a", encoding="utf-8", buffering=8192) if self.sample_path else None
+        try:
+            while not self._stop.wait(self.interval):
+                usage = _memory_usage()
+                if not usage:
+                    continue
+                self.samples.append(usage)
+                if fp is not None:
+                    fp.write(json.dumps({"ts_ns": time.time_ns(), "run_id": self.run_id, **usage}) + "\n")
+        finally:
+            if fp is not None:
+                fp.close()
+
+    def peak(self) -> dict:
+        values = [s[self.metric] for s in self.samples if self.metric in s]
+        if not values:
+            return {}
+        return {"peak_mb": max(values), "samples": len(values)}
+
+
+_TRACEMALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+def _tracemalloc_growth(
+    prev: Optional[tracemalloc.Snapshot], limit: int = 10
+) -> tuple[tracemalloc.Snapshot, list[str]]:
+    """Take a post-GC snapshot and return it with the top Python-side growers since prev."""
+    gc.collect()
+    snap = tracemalloc.take_snapshot().filter_traces(_TRACEMALLOC_FILTERS)
+    if prev is None:
+        return snap, []
+    top = snap.compare_to(prev, "lineno")[:limit]
+    return snap, [str(stat) for stat in top if stat.size_diff > 0]
+
+
 def _resolve_yaml_path(path: Path) -> Path:
     if path.exists():
         return path
@@ -905,7 +1191,7 @@ def _resolve_yaml_path(path: Path) -> Path:
 def _load_yaml(path: Path) -> dict:
     resolved = _resolve_yaml_path(path)
     with resolved.open("r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+        return yaml.load(f, Loader=YAML_LOADER) or {}
 
 
 def _load_config_from_db() -> dict:
@@ -988,7 +1274,7 @@ async def _run_once(
     run_id: str,
     headless: bool,
     strategy: str,
-) -> dict:
+) -> AttemptResult:
     cfg_source = ""
     try:
         yaml_path = _resolve_yaml_path(yaml_path)
@@ -1030,26 +1316,29 @@ async def _run_once(
             "completed" if ok else "failed",
             f"index_id={index_id or 'none'} elapsed={elapsed}s",
         )
-        return {
-            "ok": ok,
-            "run_id": run_id,
-            "strategy": strategy,
-            "index_id": index_id,
-            "index_name": full_name or index_name,
-            "elapsed_seconds": elapsed,
-            "timestamp": _now(),
-        }
+        return AttemptResult(
+            ok=ok,
+            run_id=run_id,
+            strategy=strategy,
+            index_id=index_id,
+            index_name=full_name or index_name,
+            elapsed_seconds=elapsed,
+            timestamp=_now(),
+        )
     except Exception as e:
         elapsed = round(time.time() - started, 2)
+        # Formatted now but only written to the history file, not echoed into the live log.
+        tb = traceback.format_exc()
         _upsert_harness_run(run_id, "failed", f"{type(e).__name__}: {e}")
-        return {
-            "ok": False,
-            "run_id": run_id,
-            "strategy": strategy,
-            "error": f"{type(e).__name__}: {e}",
-            "elapsed_seconds": elapsed,
-            "timestamp": _now(),
-        }
+        return AttemptResult(
+            ok=False,
+            run_id=run_id,
+            strategy=strategy,
+            error=f"{type(e).__name__}: {e}",
+            traceback=tb,
+            elapsed_seconds=elapsed,
+            timestamp=_now(),
+        )
 
 
 async def main_async(args: argparse.Namespace) -> int:
@@ -1058,34 +1347,70 @@ async def main_async(args: argparse.Namespace) -> int:
     artifacts_dir = Path(args.artifacts_dir).resolve()
     artifacts_dir.mkdir(parents=True, exist_ok=True)
     summary_path = artifacts_dir / "playwright_harness_history.jsonl"
+    # The per-sample JSONL grows for as long as the loop runs, so it is only written on request
+    samples_path = artifacts_dir / "playwright_harness_memory.jsonl" if args.memory_samples else None
+    sample_interval = args.peak_sample_seconds
+    if args.memory_samples and sample_interval <= 0:
+        sample_interval = MEMORY_SAMPLE_INTERVAL_SECONDS
 
     count = 0
     strategy_list = [s.strip() for s in args.strategies.split(",") if s.strip()]
     if not strategy_list:
         strategy_list = ["baseline"]
     strategies = deque(strategy_list)
+    prev_snapshot: Optional[tracemalloc.Snapshot] = None
+    if args.tracemalloc_frames > 0:
+        tracemalloc.start(args.tracemalloc_frames)
+    elif args.mem_backend == "tracemalloc":
+        tracemalloc.start()
+    metric = f"{args.mem_backend}_mb"
     while True:
         count += 1
         run_id = args.run_id or _new_run_id()
         strategy = strategies[0]
         strategies.rotate(-1)
         print(f"[harness] attempt={count} run_id={run_id} strategy={strategy}", flush=True)
-        result = await _run_once(
-            yaml_path=Path(args.yaml).resolve(),
-            index_prefix=args.index_prefix,
-            parser_prompt=args.parser_prompt,
-            state_dir=state_dir,
-            run_id=run_id,
-            headless=args.headless,
-            strategy=strategy,
-        )
+        mem_before = _memory_usage()
+        browsers_before = _count_browser_processes()
+        with _PeakMemorySampler(run_id, samples_path, args.mem_backend, sample_interval) as sampler:
+            result = await _run_once(
+                yaml_path=Path(args.yaml).resolve(),
+                index_prefix=args.index_prefix,
+                parser_prompt=args.parser_prompt,
+                state_dir=state_dir,
+                run_id=run_id,
+                headless=args.headless,
+                strategy=strategy,
+            )
+        # Measure once Chromium has actually exited, not while it is still tearing down.
+        browsers_after = await _wait_for_browser_exit(browsers_before)
+        _release_freed_memory()
+        mem_after = _memory_usage()
+        if metric in mem_before and metric in mem_after:
+            result.memory = {
+                "backend": args.mem_backend,
+                "before": mem_before,
+                "after": mem_after,
+                **sampler.peak(),
+                "delta_mb": round(mem_after[metric] - mem_before[metric], 1),
+            }
+        if psutil is not None:
+            result.browser_processes_after = browsers_after
+        harness_status = _read_proc_status()
+        if harness_status:
+            result.memory["harness"] = harness_status
+        system_memory = _system_memory()
+        if system_memory:
+            result.memory["system"] = system_memory
+        if args.tracemalloc_frames > 0:
+            prev_snapshot, result.tracemalloc_top = _tracemalloc_growth(prev_snapshot)
         with summary_path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(result) + "\n")
-        print(f"[harness] result={json.dumps(result)}", flush=True)
+            f.write(result.to_json() + "\n")
+        log_lines = [f"[harness] result={result.to_json(exclude=('traceback',))}"]
 
         # Live-reactive strategy steering based on concrete failure signatures.
-        if not result.get("ok"):
-            err = (result.get("error") or "").lower()
+        if not result.ok:
+            err = (result.error or "").lower()
             preferred: list[str] = []
             if "hybrid search" in err or "searchbox" in err:
                 preferred = ["searchbox_first", "baseline", "hybrid_role_first"]
@@ -1097,15 +1422,16 @@ async def main_async(args: argparse.Namespace) -> int:
                 current = list(strategies)
                 rest = [s for s in current if s not in preferred]
                 strategies = deque([s for s in preferred if s in current] + rest)
-                print(f"[harness] adaptive_reorder err_hint='{preferred[0]}' next={list(strategies)}", flush=True)
+                log_lines.append(f"[harness] adaptive_reorder err_hint='{preferred[0]}' next={list(strategies)}")
+        _emit(log_lines)
 
         if args.max_attempts > 0 and count >= args.max_attempts:
             break
         # Faster retries when failures are deterministic.
         sleep_seconds = args.sleep_seconds
-        if not result.get("ok"):
+        if not result.ok:
             sleep_seconds = min(args.sleep_seconds, 30)
-        time.sleep(sleep_seconds)
+        await asyncio.sleep(sleep_seconds)
     return 0
 
 
@@ -1127,18 +1453,45 @@ def parse_args() -> argparse.Namespace:
         default="baseline,searchbox_first,hybrid_role_first,searchbox_only,setup_only_recovery",
         help="Comma-separated strategy sequence for harness-only rapid variants",
     )
+    p.add_argument(
+        "--mem-backend",
+        choices=MEMORY_BACKENDS,
+        default="uss",
+        help="Memory metric for per-attempt delta/peak (pss is Linux-only; tracemalloc is the Python heap)",
+    )
+    p.add_argument(
+        "--peak-sample-seconds",
+        type=float,
+        default=0,
+        help=f"Sample memory every N seconds during each attempt to report its peak "
+        f"(e.g. {MEMORY_SAMPLE_INTERVAL_SECONDS}; adds smaps reads to the timed attempt; 0 disables)",
+    )
+    p.add_argument(
+        "--memory-samples",
+        action="store_true",
+        help="Append every memory sample to playwright_harness_memory.jsonl in --artifacts-dir "
+        "(implies peak sampling; the file grows for as long as the loop runs)",
+    )
+    p.add_argument(
+        "--tracemalloc-frames",
+        type=int,
+        default=0,
+        help="Trace Python allocations with this stack depth and log top growers per attempt (0 disables)",
+    )
     p.add_argument("--state-dir", default="scripts/python/state", help="State directory")
     p.add_argument(
         "--artifacts-dir",
         default="scripts/python/app_data/harness",
-        help="Directory for JSONL attempt history",
+        help="Directory for JSONL attempt history and memory samples",
     )
     return p.parse_args()
 
 
 def main() -> int:
     args = parse_args()
-    return asyncio.run(main_async(args))
+    loop_factory = uvloop.new_event_loop if uvloop is not None else None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        return runner.run(main_async(args))
 
 
 if __name__ == "__main__":
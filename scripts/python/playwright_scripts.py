@@ -10,14 +10,17 @@ Currently includes:
 
 import asyncio
 import base64
+import hashlib
 import json
 import os
 import platform
 import re
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
 import subprocess
+import urllib.parse
 import urllib.request
 import yaml
 
@@ -25,6 +28,326 @@ from playwright.async_api import async_playwright
 
 from worker_utils import check_run_aborted, update_job_progress, consume_pending_mfa_code, reflag_mfa_code_pending
 
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)  # libyaml-backed when available
+
+# Union selectors for the Edit Index builder probes: one visibility wait covers every variant.
+# ":text()" is the CSS-union form of the "text=" engine (which can't be comma-joined).
+PARSING_SEL = (
+    ":text('Parsing'), button:has-text('Parsing'), a:has-text('Parsing'), "
+    ".slds-nav-vertical__item:has-text('Parsing'), [aria-label*='Parsing'], li:has-text('Parsing')"
+)
+LLM_PARSER_SEL = (
+    ":text('LLM-based Parser'), button:has-text('LLM-based Parser'), "
+    "[title*='LLM-based'], .slds-card:has-text('LLM-based')"
+)
+PROMPT_TEXTAREA_SEL = 'lightning-textarea textarea[name="prompt"]'
+# Review & Build submit button; get_by_role matches it in the page DOM and inside LWC shadow roots
+SAVE_BUTTON_NAME_RE = re.compile(r"^(Save|Save & Build|Build)$")
+
+# Edit Index builder readiness probes, installed once per context with add_init_script so each
+# poll only ships a one-line call instead of re-sending (and re-compiling) the whole predicate
+READINESS_INIT_JS = """
+// Headings, section titles and the current builder step: the text the probes below look for,
+// without serializing the whole body (hundreds of KB on a Lightning page) on every poll
+const HEADING_SEL = 'h1, h2, h3, h4, legend, [role="heading"], [class*="heading"], [class*="title"], [aria-current="step"], .slds-is-current, .slds-is-active';
+
+// test(text) against each element matching selector, stopping at the first hit;
+// null when nothing matches selector, so callers can fall back to body text
+window.__textIn = (selector, test) => {
+    const elements = document.querySelectorAll(selector);
+    if (elements.length === 0) return null;
+    for (let el of elements) {
+        if (test(el.textContent || '')) return true;
+    }
+    return false;
+};
+
+// Headings first, document.body.textContent only on a page without any
+const textOnPage = (test) => {
+    const hit = window.__textIn(HEADING_SEL, test);
+    return hit !== null ? hit : test(document.body.textContent || '');
+};
+
+// Step content is on screen, not just the step name
+window.__stepReady = (keywords) => {
+    // Check if there's actual interactive content (not just text)
+    const hasInteractiveContent = document.querySelector('input, select, button, [role="button"], [class*="input"], [class*="select"]') !== null;
+
+    // Check if main content area has loaded (only read when there is no interactive content)
+    const hasContent = () => {
+        const mainContent = document.querySelector('[class*="content"], [class*="main"], [role="main"]');
+        return !!mainContent && (mainContent.textContent || '').length > 100;
+    };
+
+    // Check if step keywords are present
+    return (hasInteractiveContent || hasContent()) && textOnPage(text => keywords.some(kw => text.includes(kw)));
+};
+
+// On the Review & Build step
+window.__onReviewBuild = () => textOnPage(text => text.includes('Review') && text.includes('Build'));
+
+// Save/Build button: visible regular <button> first, then lightning-button shadow roots.
+// An enabled hit is cached per document and reused while it is still attached, visible and
+// enabled; any insertion into the page drops it, since that may be a new button. Disabled hits
+// are never cached, so a different button becoming enabled is seen on the next call.
+(() => {
+    // One native XPath pass per root instead of reading textContent of every <button> in JS
+    const SAVE_XPATH = ".//button[normalize-space(.)='Save' or normalize-space(.)='Save & Build' or normalize-space(.)='Build']";
+    const saveButtonCache = new WeakMap();
+    let saveButtonObserver = null;
+    const isShown = (btn) => {
+        const rect = btn.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0;
+    };
+    // Keep the first visible match, but prefer an enabled one
+    const better = (found, btn) => !found || (found.disabled && !btn.disabled);
+    const xpathAll = (xpath, root) => {
+        const r = document.evaluate(xpath, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const nodes = [];
+        for (let i = 0; i < r.snapshotLength; i++) nodes.push(r.snapshotItem(i));
+        return nodes;
+    };
+
+    // Visible buttons whose text contains text (force-enable fallback in update_search_index_prompt)
+    window.__buttonsContaining = (text) => xpathAll(
+        `.//button[contains(normalize-space(.), ${JSON.stringify(text)})]`, document
+    ).filter(btn => btn.offsetParent !== null);
+
+    window.__findSaveButton = () => {
+        const cached = saveButtonCache.get(document);
+        if (cached && cached.isConnected && !cached.disabled && isShown(cached)) {
+            return cached;
+        }
+        saveButtonCache.delete(document);
+        if (!saveButtonObserver && document.body) {
+            saveButtonObserver = new MutationObserver((records) => {
+                if (records.some(r => r.addedNodes.length > 0)) {
+                    saveButtonCache.delete(document);
+                }
+            });
+            saveButtonObserver.observe(document.body, { childList: true, subtree: true });
+        }
+
+        let found = null;
+        for (let btn of xpathAll(SAVE_XPATH, document)) {
+            if (btn.offsetParent === null) continue;
+            if (better(found, btn)) {
+                found = btn;
+                if (!btn.disabled) break;
+            }
+        }
+        if (!found || found.disabled) {
+            for (let component of document.querySelectorAll('lightning-button, button[is]')) {
+                if (!component.shadowRoot) continue;
+                for (let btn of xpathAll(SAVE_XPATH, component.shadowRoot)) {
+                    if (isShown(btn) && better(found, btn)) {
+                        found = btn;
+                    }
+                }
+                if (found && !found.disabled) break;
+            }
+        }
+        if (found && !found.disabled) {
+            saveButtonCache.set(document, found);
+        }
+        return found;
+    };
+
+    // Resolves true as soon as a Save button is enabled, false after timeoutMs. Watches the body
+    // for new/changed buttons and each candidate button directly, since attribute changes inside
+    // a shadow root are not visible to an observer on the document.
+    window.__waitSaveEnabled = (timeoutMs) => new Promise((resolve) => {
+        const initial = window.__findSaveButton();
+        if (initial && !initial.disabled) {
+            resolve(true);
+            return;
+        }
+        const attributeFilter = ['disabled', 'aria-disabled', 'class'];
+        const watched = new WeakSet();
+        let timer = null;
+        const finish = (value) => {
+            observer.disconnect();
+            clearTimeout(timer);
+            resolve(value);
+        };
+        const watch = (btn) => {
+            if (btn && !watched.has(btn)) {
+                watched.add(btn);
+                observer.observe(btn, { attributes: true, attributeFilter: attributeFilter });
+            }
+        };
+        const observer = new MutationObserver(() => {
+            const btn = window.__findSaveButton();
+            if (btn && !btn.disabled) {
+                finish(true);
+            } else {
+                watch(btn);
+            }
+        });
+        observer.observe(document.body, { subtree: true, childList: true, attributes: true, attributeFilter: attributeFilter });
+        watch(initial);
+        timer = setTimeout(() => finish(false), timeoutMs);
+    });
+})();
+
+// Review & Build state: { isLoading, hasContent, saveEnabled }
+window.__reviewBuildState = () => {
+    // Check for loading indicators/spinners first
+    const spinners = document.querySelectorAll('[class*="spinner"], [class*="loading"], [class*="slds-spinner"], [aria-busy="true"]');
+    let isLoading = false;
+    for (let spinner of spinners) {
+        if (spinner.offsetParent !== null) {  // Visible
+            isLoading = true;
+            break;
+        }
+    }
+
+    // Check multiple ways content might appear
+    const reviewKeywords = ['Configuration', 'Search Index', 'Source DMO', 'Parsing', 'Review', 'Chunking', 'Vectorization'];
+
+    // Method 1: Check for specific review content keywords
+    let hasContent = textOnPage(text => reviewKeywords.some(kw => text.includes(kw)));
+
+    // Method 2: Check if main content area exists and has text
+    if (!hasContent) {
+        const mainContent = document.querySelector('[class*="content"], [class*="main"], [role="main"], [class*="body"]');
+        if (mainContent) {
+            const text = mainContent.textContent || '';
+            if (text.length > 50) {
+                hasContent = true;
+            }
+        }
+    }
+
+    // Method 3: Check if Save button is visible AND enabled (critical!)
+    // Check both regular DOM and Shadow DOM
+    const saveButton = window.__findSaveButton();
+    const saveEnabled = !!saveButton && !saveButton.disabled;
+
+    return { isLoading: isLoading, hasContent: hasContent, saveEnabled: saveEnabled };
+};
+
+// Review & Build done loading: content shown, no spinner, Save enabled
+window.__reviewBuildReady = () => {
+    const s = window.__reviewBuildState();
+    return s.hasContent && s.saveEnabled && !s.isLoading;
+};
+
+// Pre-Save validations settled: no visible error message and Save enabled
+window.__saveValidationsComplete = () => {
+    const errors = document.querySelectorAll('.slds-has-error, .slds-form-element__help, [role="alert"], .slds-theme_error');
+    for (let el of errors) {
+        if (el.offsetParent !== null && (el.textContent || '').trim().length > 0) {
+            return false;
+        }
+    }
+    const saveButton = window.__findSaveButton();
+    return !!saveButton && !saveButton.disabled;
+};
+
+// Chunking config rendered on Review & Build
+window.__chunkingLoaded = () => {
+    // Chunking fields rendered by the builder
+    if (document.querySelector('[class*="chunking"] [class*="input"], [data-field*="max_tokens"], [class*="passage-extraction"]')) {
+        return true;
+    }
+
+    // Also check if there's a chunking section visible
+    const chunkingSections = document.querySelectorAll('[class*="chunking"], [id*="chunking"], [data-id*="chunking"]');
+    for (let section of chunkingSections) {
+        if (section.offsetParent !== null) {
+            const text = section.textContent || '';
+            if (text.length > 20) {  // Has some content
+                return true;
+            }
+        }
+    }
+
+    // Fallback: look for indicators that chunking config is present in the page text
+    // Common terms: "Passage Extraction", "max_tokens", "Chunking", "8192", etc.
+    const indicators = [
+        'Passage Extraction',
+        'max_tokens',
+        'Chunking',
+        '8192',
+        'chunking',
+        'perFileExtension'
+    ];
+    const bodyText = document.body.textContent || '';
+    return indicators.some(indicator => bodyText.includes(indicator));
+};
+
+// Every Review & Build read in one round-trip
+window.__snapshot = () => ({
+    ...window.__reviewBuildState(),
+    chunkingLoaded: window.__chunkingLoaded(),
+    url: location.href
+});
+"""
+
+# Save fallback on a cached ElementHandle: force-enable + status, and click (update_search_index_prompt)
+SAVE_HANDLE_FORCE_ENABLE_JS = """
+    (btn) => {
+        if (!btn.isConnected) {
+            return { found: false, text: '', disabled: true, element: null };
+        }
+        btn.removeAttribute('disabled');
+        btn.disabled = false;
+        btn.classList.remove('slds-button--disabled', 'disabled');
+        btn.setAttribute('aria-disabled', 'false');
+        return {
+            found: true,
+            text: (btn.textContent || '').trim(),
+            disabled: btn.disabled || btn.getAttribute('aria-disabled') === 'true',
+            element: 'handle'
+        };
+    }
+"""
+SAVE_HANDLE_CLICK_JS = """
+    (btn) => {
+        btn.scrollIntoView({ behavior: 'smooth', block: 'center' });
+        btn.focus();
+        btn.click();
+        btn.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true }));
+        return { clicked: true, text: (btn.textContent || '').trim() };
+    }
+"""
+
+# Salesforce login form (update_search_index_prompt)
+LOGIN_PATHS = ('/secur/login_portal.jsp', '/')  # tried on the instance after login.salesforce.com
+LOGIN_USERNAME_SEL = "input#username, input[name='username'], input[type='email']"
+LOGIN_PASSWORD_SEL = "input#password, input[name='password']"
+LOGIN_BUTTON_SEL = "input#Login, button[name='Login'], input[type='submit']"
+
+# XPath scoped to tab-like elements instead of reading textContent of every candidate
+CONFIG_TAB_CLICK_JS = """
+    () => {
+        const r = document.evaluate(
+            "//*[self::a or self::button or @role='tab'][normalize-space(.)='Configuration']",
+            document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
+        if (r.singleNodeValue) {
+            r.singleNodeValue.click();
+            return true;
+        }
+        return false;
+    }
+"""
+
+# Only nodes whose own text is "Parsing" and that are (or sit inside) a nav item,
+# rather than walking every element on the page
+PARSING_CLICK_JS = """
+    () => {
+        const r = document.evaluate(
+            "//*[normalize-space(text())='Parsing'][self::a or self::button or @role='button' or @role='tab' or ancestor::li]",
+            document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
+        if (r.singleNodeValue) {
+            r.singleNodeValue.click();
+            return true;
+        }
+        return false;
+    }
+"""
+
 
 def _is_authenticated_url(url: str) -> bool:
     low = (url or "").lower()
@@ -38,6 +361,38 @@ def _is_mfa_or_verification_url(url: str) -> bool:
     return any(token in low for token in ["/_ui/identity/verification/", "mfa", "verify", "challenge"])
 
 
+def session_state_path(instance_url: str, username: str) -> Path:
+    """Saved Playwright session file for one org/user, under the workflow state directory"""
+    from main import get_state_dir  # imported lazily: main pulls in pandas and the Salesforce clients
+    key = hashlib.sha256(f"{(instance_url or '').rstrip('/').lower()}\n{username or ''}".encode('utf-8')).hexdigest()[:16]
+    return get_state_dir() / f"pw_session_{key}.json"
+
+
+def _write_private_json(path: Path, data) -> None:
+    """Write JSON readable by the owner only (0600), via a temp file swapped in atomically"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.chmod(tmp_path, 0o600)  # O_CREAT mode does not apply when the temp file already existed
+    os.replace(tmp_path, path)
+
+
+async def _backoff_attempts(total_seconds: float, first_delay: float = 0.1, max_delay: float = 2.0):
+    """Yield attempt numbers for up to total_seconds, sleeping 0.1s, 0.16s, ... (capped) in between"""
+    deadline = time.monotonic() + total_seconds
+    delay = first_delay
+    attempt = 0
+    while True:
+        yield attempt
+        attempt += 1
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 1.6, max_delay)
+
+
 async def _try_submit_mfa_code(page, code: str) -> bool:
     print(f"   [MFA] _try_submit_mfa_code called with code len={len(code)}", flush=True)
     print(f"   [MFA] Current URL: {page.url}", flush=True)
@@ -257,7 +612,9 @@ async def update_search_index_prompt(
     take_screenshots: bool = False,
     headless: bool = False,
     slow_mo: int = 0,
-    skip_wait: bool = False
+    skip_wait: bool = False,
+    reuse_session: bool = False,
+    storage_state_path: str = None
 ):
     """
     Update the LLM parser prompt for a Search Index.
@@ -268,28 +625,90 @@ async def update_search_index_prompt(
         Activate (Playwright) + update prompt template (REST API). This function remains
         for Cycle 1 (baseline) when an existing index/retriever is configured in YAML.
     
+    Each call launches its own browser, logs in and updates one index; there is no batched
+    multi-index mode (nothing calls it for more than one index per run, and the flow is
+    deprecated). Only with reuse_session (``--reuse-session`` on the command line) does a
+    call restore the previous run's saved session and skip the login form.
+    
     Args:
         username: Salesforce username
         password: Salesforce password
         instance_url: Salesforce instance URL
         search_index_id: Search Index record ID (e.g., "18lHu000000CgkCIAS")
         new_prompt: The new prompt text to set
+        reuse_session: Save the authenticated session (cookies/storage) after login and restore it
+            on the next run, skipping the login form. Off by default: the file holds live session
+            cookies (written with mode 0600)
+        storage_state_path: Session file for reuse_session; defaults to session_state_path()
+            (state directory, keyed by instance URL and username)
     """
     # Create screenshots directory (only if screenshots are enabled)
     screenshots_dir = Path("playwright_screenshots")
     if take_screenshots:
         screenshots_dir.mkdir(parents=True, exist_ok=True)
     
+    screenshot_sem = asyncio.Semaphore(2)  # at most two captures in flight
+    screenshot_tasks = []
+    last_screenshot_hash = None  # SHA-256 of the last written capture; reset after each goto
+    
     async def take_screenshot(name):
-        """Take a screenshot for debugging (only if enabled)"""
+        """Queue a screenshot for debugging (only if enabled); the flow doesn't wait for it"""
         if not take_screenshots:
             return None
         timestamp = datetime.now().strftime("%H%M%S")
-        screenshot_path = screenshots_dir / f"{timestamp}_{name}.png"
-        await page.screenshot(path=str(screenshot_path), full_page=True)
-        print(f"   📸 Screenshot saved: {screenshot_path.name}")
+        screenshot_path = screenshots_dir / f"{timestamp}_{name}.jpg"
+        target = page  # the page current at this step, even if `page` is reassigned later
+        
+        async def capture():
+            nonlocal last_screenshot_hash
+            async with screenshot_sem:
+                try:
+                    # Viewport JPEG: far cheaper than a full-page PNG; frozen animations and a
+                    # hidden caret keep identical states byte-identical for the dedup hash
+                    data = await target.screenshot(
+                        type='jpeg', quality=60, full_page=False, animations='disabled', caret='hide'
+                    )
+                    digest = hashlib.sha256(data).digest()
+                    if digest == last_screenshot_hash:
+                        print(f"   📸 Screenshot unchanged, skipped: {screenshot_path.name}")
+                        return
+                    last_screenshot_hash = digest
+                    screenshot_path.write_bytes(data)
+                    print(f"   📸 Screenshot saved: {screenshot_path.name}")
+                except Exception as e:
+                    print(f"   ⚠️  Screenshot {screenshot_path.name} failed: {e}")
+        
+        screenshot_tasks.append(asyncio.create_task(capture()))
         return screenshot_path
     
+    async def close_browser():
+        """Let queued screenshots finish, then close the browser"""
+        await asyncio.gather(*screenshot_tasks, return_exceptions=True)
+        screenshot_tasks.clear()
+        await browser.close()
+    
+    async def wait_visible(selector, timeout=10000):
+        """Wait until selector is visible; on timeout settle briefly and let the flow carry on."""
+        try:
+            await page.locator(selector).first.wait_for(state="visible", timeout=timeout)
+            return True
+        except Exception:
+            await asyncio.sleep(0.5)
+            return False
+    
+    async def wait_for_redirect(url_before, timeout=15000):
+        """Wait for the page to navigate away from url_before; True on navigation, False on timeout."""
+        try:
+            await page.wait_for_url(lambda url: url != url_before, wait_until="commit", timeout=timeout)
+            return True
+        except Exception:
+            return False
+    
+    async def deliberate():
+        """Pause for slow_mo ms before a human-visible step (the browser itself runs at full speed)"""
+        if slow_mo:
+            await asyncio.sleep(slow_mo / 1000)
+    
     def should_abort():
         """Check DB status for kill; return True to abort if not running."""
         if check_run_aborted(run_id):
@@ -310,62 +729,85 @@ async def update_search_index_prompt(
                 '--disable-software-rasterizer',
                 '--disable-extensions'
             ]
+        # slow_mo is applied by deliberate() at the visible steps only, not to every Playwright call
         browser = await p.chromium.launch(
             headless=headless,
-            slow_mo=slow_mo,  # Delay between actions in milliseconds (0 = no delay)
             **launch_args
         )
+        # Reuse the session saved by a previous run when there is one
+        if reuse_session and not storage_state_path:
+            storage_state_path = session_state_path(instance_url, username)
+        elif not reuse_session:
+            storage_state_path = None
+        saved_state = str(storage_state_path) if storage_state_path and Path(storage_state_path).exists() else None
         context = await browser.new_context(
-            viewport={'width': 1280, 'height': 720}  # Normal resolution
+            viewport={'width': 1280, 'height': 720},  # Normal resolution
+            storage_state=saved_state
         )
+        await context.add_init_script(script=READINESS_INIT_JS)
         page = await context.new_page()
         
         # Network monitoring - only if flag is enabled
         semantic_search_requests = []
-        all_requests = []  # Capture ALL PUT/POST requests for analysis
+        all_requests = []  # semanticSearch PUT/POSTs plus other PUTs (URL only) for analysis
+        pending_requests = {}  # Request object -> its all_requests entry, for O(1) response matching
+        max_pending_requests = 1000  # Oldest entries are evicted past this; the full list is still kept
         
         if capture_network:
             
             async def handle_request(request):
                 """Capture all network requests"""
-                # Capture PUT/POST requests that might be the update
-                if request.method in ['PUT', 'POST']:
-                    req_data = {
-                        'method': request.method,
-                        'url': request.url,
-                        'headers': dict(request.headers),
-                        'post_data': request.post_data,
-                        'timestamp': datetime.now().isoformat()
-                    }
-                    all_requests.append(req_data)
-                    
-                    # Specifically log semanticSearch requests
-                    if '/v1/semanticSearch/' in request.url or 'semanticSearch' in request.url.lower():
-                        semantic_search_requests.append(req_data)
-                        print(f"   🔍 CAPTURED semanticSearch REQUEST: {request.method} {request.url}")
-                        if request.post_data:
-                            print(f"      Payload: {request.post_data[:200]}...")
-                    elif 'PUT' in request.method:
-                        print(f"   🔍 CAPTURED PUT REQUEST: {request.url[:100]}...")
+                # Keep semanticSearch PUT/POSTs (the update) and PUTs; other POSTs are page chatter
+                if request.method not in ['PUT', 'POST']:
+                    return
+                is_semantic_search = 'semanticsearch' in request.url.lower()
+                if not (is_semantic_search or request.method == 'PUT'):
+                    return
+                req_data = {
+                    'method': request.method,
+                    'url': request.url,
+                    'timestamp': datetime.now().isoformat()
+                }
+                if is_semantic_search:
+                    # Headers/payload are only read for the requests we actually analyse
+                    req_data['headers'] = dict(request.headers)
+                    req_data['post_data'] = request.post_data
+                all_requests.append(req_data)
+                pending_requests[request] = req_data
+                if len(pending_requests) > max_pending_requests:
+                    del pending_requests[next(iter(pending_requests))]  # dicts keep insertion order
+                
+                # Specifically log semanticSearch requests
+                if is_semantic_search:
+                    semantic_search_requests.append(req_data)
+                    print(f"   🔍 CAPTURED semanticSearch REQUEST: {request.method} {request.url}")
+                    if req_data['post_data']:
+                        print(f"      Payload: {req_data['post_data'][:200]}...")
+                else:
+                    print(f"   🔍 CAPTURED PUT REQUEST: {request.url[:100]}...")
             
             async def handle_response(response):
                 """Capture all network responses"""
                 # Match responses to requests
                 if response.request.method in ['PUT', 'POST']:
-                    # Find matching request
-                    matching_req = None
-                    for req in all_requests:
-                        if req['url'] == response.url and req['method'] == response.request.method:
-                            matching_req = req
-                            break
+                    # Find matching request by identity (response.request is the same object handle_request saw)
+                    matching_req = pending_requests.pop(response.request, None)
                     
+                    is_semantic_search = 'semanticsearch' in response.url.lower()
                     try:
-                        body = await response.body()
+                        headers = response.headers
+                        # Only pull the body (an extra round-trip to the browser) for responses we report on;
+                        # tracked PUTs larger than the 10KB we keep are recorded without it
+                        fetch_body = is_semantic_search or (
+                            response.request.method == 'PUT' and matching_req is not None
+                            and int(headers.get('content-length') or 0) <= 10000
+                        )
+                        body = await response.body() if fetch_body else b''
                         resp_data = {
                             'url': response.url,
                             'status': response.status,
                             'status_text': response.status_text,
-                            'headers': dict(response.headers),
+                            'headers': dict(headers),
                             'body': body.decode('utf-8', errors='ignore')[:10000],  # First 10KB
                             'timestamp': datetime.now().isoformat()
                         }
@@ -374,7 +816,7 @@ async def update_search_index_prompt(
                             matching_req['response'] = resp_data
                         
                         # Specifically log semanticSearch responses
-                        if '/v1/semanticSearch/' in response.url or 'semanticSearch' in response.url.lower():
+                        if is_semantic_search:
                             print(f"   📥 CAPTURED semanticSearch RESPONSE: {response.status} {response.status_text}")
                             print(f"      Body: {resp_data['body'][:200]}...")
                         elif response.request.method == 'PUT':
@@ -382,80 +824,134 @@ async def update_search_index_prompt(
                     except Exception as e:
                         print(f"   ⚠️  Error capturing response: {e}")
             
-            # Set up network listeners
-            page.on('request', handle_request)
-            page.on('response', handle_response)
+            # Set up network listeners on the context so they follow whichever page wins the login race
+            context.on('request', handle_request)
+            context.on('response', handle_response)
             print("🌐 Browser window opened (should be visible now)")
             print("📡 Network monitoring enabled - capturing all semanticSearch requests")
         else:
             print("🌐 Browser window opened (should be visible now)")
         
         print("🔐 Logging into Salesforce...")
+        detail_url = f"{instance_url}/lightning/r/DataSemanticSearch/{search_index_id}/view"
         
-        # Try standard Salesforce login URL
-        login_urls = [
-            "https://login.salesforce.com",
-            f"{instance_url.rstrip('/')}/secur/login_portal.jsp",
-            f"{instance_url.rstrip('/')}/"
-        ]
-        
-        logged_in = False
-        for login_url in login_urls:
+        # A restored session is still good if the detail page loads without bouncing to login
+        # (check the path: the login redirect carries /lightning/ in its startURL query)
+        session_restored = False
+        if saved_state:
             try:
-                print(f"   Trying: {login_url}")
-                await page.goto(login_url, wait_until='networkidle', timeout=30000)
-                await asyncio.sleep(2)
-                
-                # Check if already logged in
-                current_url = page.url
-                if 'lightning' in current_url or ('salesforce.com' in current_url and 'login' not in current_url.lower()):
-                    print("   ✅ Already logged in!")
-                    logged_in = True
+                await page.goto(detail_url, wait_until='domcontentloaded', timeout=60000)
+                session_restored = urllib.parse.urlparse(page.url).path.startswith('/lightning/')
+            except Exception as e:
+                print(f"   ⚠️  Could not check saved session: {e}")
+            if session_restored:
+                print(f"   ✅ Reused saved session from {saved_state}")
+            else:
+                print("   ⚠️  Saved session expired - logging in again")
+        
+        logged_in = session_restored
+        if not session_restored:
+            # Try standard Salesforce login URL
+            instance_base = instance_url.rstrip('/')
+            login_urls = ["https://login.salesforce.com"] + [instance_base + path for path in LOGIN_PATHS]
+        
+            async def probe_login_url(login_url, probe_page):
+                """Load a login URL; return 'logged_in' or 'form' once usable, None if not."""
+                try:
+                    print(f"   Trying: {login_url}")
+                    await probe_page.goto(login_url, wait_until='networkidle', timeout=30000)
+                    current_url = probe_page.url
+                    # Only a Lightning page counts: a My Domain login page lives on *.salesforce.com too
+                    if _is_authenticated_url(current_url) and urllib.parse.urlparse(current_url).path.startswith('/lightning/'):
+                        return 'logged_in'
+                    username_field = probe_page.locator(LOGIN_USERNAME_SEL).first
+                    if await username_field.is_visible(timeout=5000):
+                        return 'form'
+                except Exception as e:
+                    print(f"   ⚠️  Error with {login_url}: {e}")
+                return None
+        
+            # Probe all login URLs at once (one page each) instead of paying up to 30s per slow URL in
+            # sequence, but keep their priority: use the first URL in login_urls order that is usable
+            probe_pages = [page] + [await context.new_page() for _ in login_urls[1:]]
+            probe_tasks = [
+                asyncio.create_task(probe_login_url(url, probe_page))
+                for url, probe_page in zip(login_urls, probe_pages)
+            ]
+            login_state = None
+            login_url = None
+            for task, url, probe_page in zip(probe_tasks, login_urls, probe_pages):
+                result = await task
+                if result:
+                    login_state, login_url, page = result, url, probe_page
                     break
+            for task in probe_tasks:
+                task.cancel()
+            await asyncio.gather(*probe_tasks, return_exceptions=True)
+            for probe_page in probe_pages:
+                if probe_page is not page:
+                    await probe_page.close()
+        
+            if login_state == 'logged_in':
+                print("   ✅ Already logged in!")
+                logged_in = True
+            elif login_state == 'form':
+                try:
+                    # Fill the login form on the winning page
+                    username_field = page.locator(LOGIN_USERNAME_SEL).first
+                    password_field = page.locator(LOGIN_PASSWORD_SEL).first
                 
-                # Try to find and fill login form
-                username_field = page.locator("input#username, input[name='username'], input[type='email']").first
-                password_field = page.locator("input#password, input[name='password']").first
-                
-                if await username_field.is_visible(timeout=5000):
-                    await username_field.fill(username)
-                    await password_field.fill(password)
+                    if await username_field.is_visible(timeout=5000):
+                        await username_field.fill(username)
+                        await password_field.fill(password)
                     
-                    # Click login
-                    login_button = page.locator("input#Login, button[name='Login'], input[type='submit']").first
-                    await login_button.click()
+                        # Click login
+                        login_button = page.locator(LOGIN_BUTTON_SEL).first
+                        await login_button.click()
                     
-                    # Wait for redirect
-                    await asyncio.sleep(5)
+                        # Wait for the redirect to land on an authenticated or 2FA page
+                        try:
+                            await page.wait_for_url(
+                                lambda u: _is_authenticated_url(u) or _is_mfa_or_verification_url(u),
+                                timeout=15000
+                            )
+                        except Exception:
+                            pass  # fall through to the URL checks below
                     
-                    # Check for 2FA
-                    current_url = page.url
-                    if 'mfa' in current_url.lower() or 'verify' in current_url.lower() or 'challenge' in current_url.lower():
-                        print("   ⚠️  2FA detected - please complete manually")
-                        await page.wait_for_url("**/lightning/**", timeout=300000)
+                        # Check for 2FA
+                        current_url = page.url
+                        if 'mfa' in current_url.lower() or 'verify' in current_url.lower() or 'challenge' in current_url.lower():
+                            print("   ⚠️  2FA detected - please complete manually")
+                            await page.wait_for_url("**/lightning/**", timeout=300000)
                     
-                    # Check if login successful
-                    final_url = page.url
-                    if 'lightning' in final_url or ('salesforce.com' in final_url and 'login' not in final_url.lower()):
-                        print("   ✅ Login successful!")
-                        logged_in = True
-                        break
-            except Exception as e:
-                print(f"   ⚠️  Error with {login_url}: {e}")
-                continue
+                        # Check if login successful
+                        final_url = page.url
+                        if 'lightning' in final_url or ('salesforce.com' in final_url and 'login' not in final_url.lower()):
+                            print("   ✅ Login successful!")
+                            logged_in = True
+                except Exception as e:
+                    print(f"   ⚠️  Error with {login_url}: {e}")
+            
+            if logged_in and storage_state_path:
+                try:
+                    _write_private_json(Path(storage_state_path), await context.storage_state())
+                    print(f"   💾 Saved session to {storage_state_path}")
+                except Exception as e:
+                    print(f"   ⚠️  Could not save session: {e}")
         
         if not logged_in:
             print("❌ Could not login automatically - please login manually in the browser")
             print("   Waiting 30 seconds for manual login...")
             await asyncio.sleep(30)
         
-        # Navigate to Search Index detail page first
-        detail_url = f"{instance_url}/lightning/r/DataSemanticSearch/{search_index_id}/view"
+        # Navigate to Search Index detail page first (already there when the saved session was reused)
         print(f"📂 Navigating to Search Index detail page...")
         print(f"   URL: {detail_url}")
         try:
-            await page.goto(detail_url, wait_until='domcontentloaded', timeout=60000)
-            await asyncio.sleep(5)  # Wait for Lightning to load
+            if not session_restored:
+                await page.goto(detail_url, wait_until='domcontentloaded', timeout=60000)
+            last_screenshot_hash = None  # new page, always capture the next step
+            await wait_visible('[role="tab"]', timeout=15000)  # Lightning record tabs rendered
             await take_screenshot("01_search_index_detail")
         except Exception as e:
             print(f"   ⚠️  Navigation timeout, but continuing... {e}")
@@ -463,26 +959,13 @@ async def update_search_index_prompt(
         
         # First click "Configuration" tab
         print("📑 Clicking 'Configuration' tab...")
-        await asyncio.sleep(2)
         
-        config_tab_clicked = await page.evaluate("""
-            () => {
-                // Find Configuration tab
-                const tabs = Array.from(document.querySelectorAll('a, button, [role="tab"]'));
-                for (let tab of tabs) {
-                    const text = (tab.textContent || tab.innerText || '').trim();
-                    if (text === 'Configuration') {
-                        tab.click();
-                        return true;
-                    }
-                }
-                return false;
-            }
-        """)
+        await deliberate()
+        config_tab_clicked = await page.evaluate(CONFIG_TAB_CLICK_JS)
         
         if config_tab_clicked:
             print("   ✅ Clicked Configuration tab")
-            await asyncio.sleep(2)
+            await wait_visible("[role='tab'][aria-selected='true']:has-text('Configuration')", timeout=5000)
             await take_screenshot("02_after_config_tab")
         else:
             print("   ⚠️  Configuration tab not found, trying Playwright...")
@@ -490,7 +973,7 @@ async def update_search_index_prompt(
                 config_tab = page.locator("text=Configuration, a:has-text('Configuration'), [role='tab']:has-text('Configuration')").first
                 if await config_tab.is_visible(timeout=5000):
                     await config_tab.click()
-                    await asyncio.sleep(2)
+                    await wait_visible("[role='tab'][aria-selected='true']:has-text('Configuration')", timeout=5000)
                     await take_screenshot("02_after_config_tab")
                 else:
                     print("   ⚠️  Configuration tab not visible")
@@ -499,14 +982,14 @@ async def update_search_index_prompt(
         
         # Now look for Edit button in the Configuration tab content
         print("✏️  Looking for 'Edit' button in Configuration tab...")
-        await asyncio.sleep(2)
         
         # Try direct navigation to builder first (most reliable)
         print("   Trying direct navigation to builder...")
         builder_url = f"{instance_url}/runtime_cdp/searchIndexBuilder.app?mode=edit&recordId={search_index_id}"
         try:
             await page.goto(builder_url, wait_until='domcontentloaded', timeout=60000)
-            await asyncio.sleep(5)
+            last_screenshot_hash = None  # new page, always capture the next step
+            await wait_visible("text=Parsing", timeout=15000)  # builder step nav rendered
             await take_screenshot("02_builder_direct_nav")
             print("   ✅ Navigated directly to builder")
         except Exception as e:
@@ -546,7 +1029,7 @@ async def update_search_index_prompt(
             
             if edit_clicked:
                 print("   ✅ Clicked Edit button (not in modal)")
-                await asyncio.sleep(5)
+                await wait_visible("text=Parsing", timeout=15000)
                 await take_screenshot("02_after_edit_click")
             else:
                 print("   ❌ Could not find Edit button")
@@ -561,58 +1044,25 @@ async def update_search_index_prompt(
         
         # Look for Parsing step - AGGRESSIVE approach
         print("📝 Looking for 'Parsing' step...")
-        await asyncio.sleep(2)
         
         # Try JavaScript click as primary method
-        parsing_clicked = await page.evaluate("""
-            () => {
-                // Find all elements containing "Parsing"
-                const allElements = document.querySelectorAll('*');
-                for (let el of allElements) {
-                    const text = el.textContent || el.innerText || '';
-                    if (text.trim() === 'Parsing' || text.trim().includes('Parsing')) {
-                        // Check if it's clickable
-                        if (el.onclick || el.getAttribute('role') === 'button' || el.tagName === 'BUTTON' || el.tagName === 'A') {
-                            el.click();
-                            return true;
-                        }
-                        // Try parent
-                        let parent = el.parentElement;
-                        if (parent && (parent.onclick || parent.getAttribute('role') === 'button' || parent.tagName === 'BUTTON' || parent.tagName === 'A')) {
-                            parent.click();
-                            return true;
-                        }
-                    }
-                }
-                return false;
-            }
-        """)
+        await deliberate()
+        parsing_clicked = await page.evaluate(PARSING_CLICK_JS)
         
         if parsing_clicked:
             print("   ✅ Clicked Parsing via JavaScript")
-            await asyncio.sleep(2)
+            await wait_visible("text=LLM-based Parser", timeout=10000)
         else:
-            # Fallback to Playwright selectors
-            parsing_selectors = [
-                "text=Parsing",
-                "button:has-text('Parsing')",
-                "a:has-text('Parsing')",
-                ".slds-nav-vertical__item:has-text('Parsing')",
-                "[aria-label*='Parsing']",
-                "li:has-text('Parsing')"
-            ]
-            
-            for selector in parsing_selectors:
-                try:
-                    locator = page.locator(selector).first
-                    if await locator.is_visible(timeout=2000):
-                        print(f"   ✅ Found Parsing with: {selector}")
-                        await locator.click()
-                        await asyncio.sleep(2)
-                        parsing_clicked = True
-                        break
-                except:
-                    continue
+            # Fallback to Playwright selectors - first visible match of any variant
+            try:
+                locator = page.locator(f"{PARSING_SEL} >> visible=true").first
+                await locator.wait_for(state="visible", timeout=3000)
+                print("   ✅ Found Parsing via selector fallback")
+                await locator.click()
+                await wait_visible("text=LLM-based Parser", timeout=10000)
+                parsing_clicked = True
+            except Exception:
+                pass
         
         await take_screenshot("03_after_parsing_click")
         
@@ -620,28 +1070,20 @@ async def update_search_index_prompt(
         print("🤖 Looking for 'LLM-based Parser' option...")
         await take_screenshot("04_before_parser_selection")
         
-        llm_parser_selectors = [
-            "text=LLM-based Parser",
-            "button:has-text('LLM-based Parser')",
-            "[title*='LLM-based']",
-            ".slds-card:has-text('LLM-based')"
-        ]
-        
         llm_parser = None
-        for selector in llm_parser_selectors:
-            try:
-                locator = page.locator(selector).first
-                if await locator.is_visible(timeout=2000):
-                    print(f"   ✅ Found LLM parser with selector: {selector}")
-                    llm_parser = locator
-                    break
-            except:
-                continue
+        try:
+            locator = page.locator(f"{LLM_PARSER_SEL} >> visible=true").first
+            await locator.wait_for(state="visible", timeout=3000)
+            print("   ✅ Found LLM parser option")
+            llm_parser = locator
+        except Exception:
+            pass
         
         if llm_parser:
             print("   Clicking LLM-based Parser...")
+            await deliberate()
             await llm_parser.click()
-            await asyncio.sleep(2)
+            await wait_visible(PROMPT_TEXTAREA_SEL, timeout=10000)
             await take_screenshot("05_after_parser_selection")
         else:
             print("   ⚠️  LLM-based Parser not found or already selected")
@@ -649,7 +1091,12 @@ async def update_search_index_prompt(
         
         # Wait for the prompt textarea to be visible
         print("⏳ Waiting for prompt textarea...")
-        await asyncio.sleep(3)
+        # Resolve the textarea once and reuse the handle for fill, fallbacks and re-verify
+        try:
+            prompt_handle = await page.wait_for_selector(PROMPT_TEXTAREA_SEL, state='visible', timeout=10000)
+        except Exception as e:
+            print(f"   ⚠️  Prompt textarea not resolved: {e}")
+            prompt_handle = None
         await take_screenshot("06_before_textarea_search")
         
         # Find the textarea - multiple methods
@@ -658,42 +1105,43 @@ async def update_search_index_prompt(
         # Find and fill textarea - Try multiple methods for Lightning components
         print("🔍 Finding and updating textarea...")
         prompt_updated = False
+        prompt_value = ''  # each write method reports the value it left in the textarea
+        fill_verified = False  # Methods 1/2 already compared the value with new_prompt
         
-        # Method 1: Use Playwright locator with type() to simulate real typing
-        try:
-            print("   Trying Method 1: Playwright type() (simulates real user input)...")
-            textarea_locator = page.locator('lightning-textarea textarea[name="prompt"]').first
-            if await textarea_locator.is_visible(timeout=5000):
-                # Clear using multiple methods to ensure complete deletion
-                await textarea_locator.click()
-                await textarea_locator.press('Control+a')  # Select all (Cmd+a on Mac)
-                await textarea_locator.press('Backspace')  # Delete selected
-                await textarea_locator.press('Delete')  # Delete again to be sure
-                await textarea_locator.fill('')  # Explicitly fill with empty string
-                await asyncio.sleep(0.5)
-                
-                # Verify it's actually empty
-                current_value = await textarea_locator.input_value()
-                if len(current_value) > 0:
-                    # Force clear via JavaScript if still not empty
-                    await textarea_locator.evaluate("el => { el.value = ''; el.dispatchEvent(new Event('input', { bubbles: true })); }")
-                    await asyncio.sleep(0.3)
-                
-                # Type the new text
-                await textarea_locator.type(new_prompt, delay=10)
-                await asyncio.sleep(2)
+        # Method 1: clear, set, fire input/change and blur in one round-trip; returns the final value
+        if prompt_handle:
+            try:
+                print("   Trying Method 1: single-evaluate clear + set + events...")
+                fill_result = await prompt_handle.evaluate("""
+                    (ta, v) => {
+                        const lt = ta.getRootNode().host;  // the lightning-textarea component
+                        ta.focus();
+                        ta.value = '';
+                        ta.dispatchEvent(new Event('input', { bubbles: true }));
+                        ta.value = v;
+                        if (lt && 'value' in lt) {
+                            lt.value = v;
+                        }
+                        ta.dispatchEvent(new Event('input', { bubbles: true }));
+                        ta.dispatchEvent(new Event('change', { bubbles: true }));
+                        if (lt) {
+                            lt.dispatchEvent(new Event('change', { bubbles: true }));
+                        }
+                        ta.blur();  // blur triggers the component's validation
+                        return { value: ta.value, matches: ta.value.trim() === v.trim() };
+                    }
+                """, new_prompt)
+                prompt_value = fill_result['value']
                 
-                # VERIFY immediately after typing
-                typed_value = await textarea_locator.input_value()
-                if typed_value.strip() == new_prompt.strip():
-                    prompt_updated = True
-                    print(f"   ✅ Updated via Playwright type() - verified: {len(typed_value)} chars")
+                if fill_result['matches']:
+                    prompt_updated = fill_verified = True
+                    print(f"   ✅ Updated via single evaluate - verified: {len(prompt_value)} chars")
                 else:
                     print(f"   ⚠️  Method 1: Value not set correctly")
                     print(f"      Expected: '{new_prompt}'")
-                    print(f"      Got: '{typed_value[:100]}...'")
-        except Exception as e:
-            print(f"   ⚠️  Method 1 failed: {e}")
+                    print(f"      Got: '{prompt_value[:100]}...'")
+            except Exception as e:
+                print(f"   ⚠️  Method 1 failed: {e}")
         
         # Method 2: Use JavaScript with component property setter
         if not prompt_updated:
@@ -730,17 +1178,20 @@ async def update_search_index_prompt(
                                     textarea.dispatchEvent(new Event('input', {{ bubbles: true, cancelable: true }}));
                                     textarea.dispatchEvent(new Event('change', {{ bubbles: true, cancelable: true }}));
                                     lt.dispatchEvent(new Event('change', {{ bubbles: true }}));
+                                    textarea.blur();
                                     
-                                    // Verify it was set correctly
-                                    return textarea.value === promptText;
+                                    // Report what was set so no separate read-back is needed
+                                    const value = textarea.value || lt.value || '';
+                                    return {{ value: value, matches: textarea.value === promptText }};
                                 }}
                             }}
                         }}
-                        return false;
+                        return {{ value: '', matches: false }};
                     }}
                 """, new_prompt)
-                if result:
-                    prompt_updated = True
+                prompt_value = result['value']
+                if result['matches']:
+                    prompt_updated = fill_verified = True
                     print("   ✅ Updated via JavaScript")
             except Exception as e:
                 print(f"   ⚠️  Method 2 failed: {e}")
@@ -748,9 +1199,9 @@ async def update_search_index_prompt(
         # Method 3: Use fill() as fallback
         if not prompt_updated:
             try:
-                print("   Trying Method 3: Playwright fill()...")
-                textarea_locator = page.locator('lightning-textarea textarea[name="prompt"]').first
-                if await textarea_locator.is_visible(timeout=3000):
+                textarea_locator = prompt_handle or page.locator(PROMPT_TEXTAREA_SEL).first
+                if prompt_handle or await textarea_locator.is_visible(timeout=3000):
+                    print("   Trying Method 3: Playwright fill()...")
                     # Clear using multiple methods to ensure complete deletion
                     await textarea_locator.click()
                     await textarea_locator.press('Control+a')
@@ -767,10 +1218,13 @@ async def update_search_index_prompt(
                     
                     # Now fill with new prompt
                     await textarea_locator.fill(new_prompt)
-                    await textarea_locator.evaluate("""
+                    prompt_value = await textarea_locator.evaluate("""
                         el => {
                             el.dispatchEvent(new Event('input', { bubbles: true }));
                             el.dispatchEvent(new Event('change', { bubbles: true }));
+                            el.blur();
+                            const lt = el.getRootNode().host;
+                            return el.value || (lt && lt.value) || '';
                         }
                     """)
                     prompt_updated = True
@@ -781,82 +1235,42 @@ async def update_search_index_prompt(
         if not prompt_updated:
             print("   ❌ All methods failed - could not update textarea")
             await take_screenshot("07_textarea_not_found")
-            await browser.close()
+            await close_browser()
             return False
         
         await take_screenshot("07_after_textarea_fill")
         print("✅ Prompt updated!")
-        
-        # Click away from the textarea to trigger blur/validation
-        print("🖱️  Clicking away from textarea to trigger validation...")
-        await page.evaluate("""
-            () => {
-                // Find the textarea and blur it
-                const lightningTextareas = document.querySelectorAll('lightning-textarea');
-                for (let lt of lightningTextareas) {
-                    if (lt.shadowRoot) {
-                        const textarea = lt.shadowRoot.querySelector('textarea[name="prompt"]');
-                        if (textarea) {
-                            textarea.blur();
-                            // Also click on the page body to ensure focus moves
-                            document.body.click();
-                            return true;
-                        }
-                    }
-                }
-                // Fallback: just click on body
-                document.body.click();
-                return false;
-            }
-        """)
-        await asyncio.sleep(1)  # Quick wait
-        
-        # Verify the prompt was actually set - check both textarea and component value
-        prompt_value = await page.evaluate(f"""
-            (expectedPrompt) => {{
-                const lightningTextareas = document.querySelectorAll('lightning-textarea');
-                for (let lt of lightningTextareas) {{
-                    if (lt.shadowRoot) {{
-                        const textarea = lt.shadowRoot.querySelector('textarea[name="prompt"]');
-                        if (textarea) {{
-                            // Check both textarea.value and component.value
-                            const textareaValue = textarea.value || '';
-                            const componentValue = lt.value || '';
-                            // Return whichever has content, or textarea value
-                            return textareaValue || componentValue;
-                        }}
-                    }}
-                }}
-                return '';
-            }}
-        """, new_prompt)
         print(f"   📝 Verified prompt value length: {len(prompt_value)} characters")
         
-        # If verification shows empty but we just set it, try to re-set it
-        if len(prompt_value) == 0 and prompt_updated:
-            print("   ⚠️  WARNING: Prompt appears empty after setting. Re-setting...")
-            try:
-                textarea_locator = page.locator('lightning-textarea textarea[name="prompt"]').first
-                await textarea_locator.click()
-                await textarea_locator.fill(new_prompt)
-                await textarea_locator.press('Tab')  # Tab away to trigger validation
-                await asyncio.sleep(0.5)
-                # Re-verify
-                prompt_value = await textarea_locator.input_value()
-                print(f"   📝 Re-verified prompt value length: {len(prompt_value)} characters")
-            except Exception as e:
-                print(f"   ⚠️  Could not re-set prompt: {e}")
-        
-        # Validate that the prompt content matches what we're trying to save
-        if prompt_value and new_prompt[:100] not in prompt_value:
-            print(f"   ⚠️  WARNING: Prompt content doesn't match!")
-            print(f"   Expected start: {new_prompt[:100]}")
-            print(f"   Actual start: {prompt_value[:100]}")
-            print("   ⚠️  Continuing anyway, but save may fail...")
-        elif prompt_value:
+        if fill_verified:
+            # Methods 1/2 compared the value in-page, so the re-set and content checks below are moot
             print(f"   ✅ Prompt content verified - matches expected value")
         else:
-            print(f"   ⚠️  WARNING: Prompt value is empty - save may fail!")
+            # If the write reported an empty value even though it went through, try to re-set it
+            if len(prompt_value) == 0:
+                print("   ⚠️  WARNING: Prompt appears empty after setting. Re-setting...")
+                try:
+                    textarea_locator = prompt_handle or page.locator(PROMPT_TEXTAREA_SEL).first
+                    await textarea_locator.click()
+                    await textarea_locator.fill(new_prompt)
+                    await textarea_locator.press('Tab')  # Tab away to trigger validation
+                    await asyncio.sleep(0.5)
+                    # Re-verify
+                    prompt_value = await textarea_locator.input_value()
+                    print(f"   📝 Re-verified prompt value length: {len(prompt_value)} characters")
+                except Exception as e:
+                    print(f"   ⚠️  Could not re-set prompt: {e}")
+        
+            # Validate that the prompt content matches what we're trying to save
+            if prompt_value and new_prompt[:100] not in prompt_value:
+                print(f"   ⚠️  WARNING: Prompt content doesn't match!")
+                print(f"   Expected start: {new_prompt[:100]}")
+                print(f"   Actual start: {prompt_value[:100]}")
+                print("   ⚠️  Continuing anyway, but save may fail...")
+            elif prompt_value:
+                print(f"   ✅ Prompt content verified - matches expected value")
+            else:
+                print(f"   ⚠️  WARNING: Prompt value is empty - save may fail!")
         
         # CRITICAL: Click Next through ALL steps sequentially, waiting for each to fully load
         # This mirrors exactly what a human does: click Next, wait to see step content, then proceed
@@ -872,74 +1286,48 @@ async def update_search_index_prompt(
         for step_name, step_keywords in steps_to_visit:
             print(f"   📍 Step: {step_name}")
             
-            # Click Next button using Playwright (real mouse click)
+            # Click Next button using Playwright (real mouse click); click() itself waits for
+            # the button to be attached, visible and enabled, so no separate state checks
             try:
-                next_btn = page.locator("button:has-text('Next')").first
-                await next_btn.wait_for(state="visible", timeout=5000)
-                await next_btn.wait_for(state="attached", timeout=2000)
-                
-                if await next_btn.is_enabled(timeout=3000):
-                    await next_btn.click()
-                    print(f"      ✅ Clicked Next")
-                else:
-                    print(f"      ⚠️  Next button not enabled, skipping...")
-                    continue
+                await deliberate()
+                await page.locator("button:has-text('Next'):not([disabled])").first.click(timeout=5000)
+                print(f"      ✅ Clicked Next")
             except Exception as e:
-                print(f"      ⚠️  Could not click Next: {e}")
+                print(f"      ⚠️  Could not click Next (missing or not enabled): {e}")
                 continue
             
             # CRITICAL: Wait for the step to actually load and be interactive
             # A human waits to SEE the step content, not just the step name
             print(f"      ⏳ Waiting for {step_name} to fully load...")
             step_loaded = False
+            step_wait_started = datetime.now()
             
-            for wait_attempt in range(10):  # Wait up to 10 seconds
-                # Check if step-specific content is visible (not just step name)
-                step_ready = await page.evaluate(f"""
-                    (keywords) => {{
-                        const bodyText = document.body.textContent || '';
-                        // Check if step keywords are present
-                        const hasKeywords = keywords.some(kw => bodyText.includes(kw));
-                        
-                        // Check if there's actual interactive content (not just text)
-                        const hasInteractiveContent = document.querySelectorAll('input, select, button, [role="button"], [class*="input"], [class*="select"]').length > 0;
-                        
-                        // Check if main content area has loaded
-                        const mainContent = document.querySelector('[class*="content"], [class*="main"], [role="main"]');
-                        const hasContent = mainContent && mainContent.textContent && mainContent.textContent.length > 100;
-                        
-                        return hasKeywords && (hasInteractiveContent || hasContent);
-                    }}
-                """, step_keywords)
-                
-                if step_ready:
-                    step_loaded = True
-                    print(f"      ✅ {step_name} is ready (waited {wait_attempt + 1}s)")
-                    break
-                
-                await asyncio.sleep(1)
+            # Resolves as soon as step-specific content is visible (not just the step name)
+            try:
+                await page.wait_for_function(
+                    "(keywords) => window.__stepReady(keywords)", arg=step_keywords, polling=250, timeout=10000
+                )
+                step_loaded = True
+                waited = (datetime.now() - step_wait_started).total_seconds()
+                print(f"      ✅ {step_name} is ready (waited {waited:.1f}s)")
+            except Exception:
+                pass
             
             if not step_loaded:
                 print(f"      ⚠️  {step_name} may not have fully loaded, but continuing...")
-            
-            # Small delay before next step (like a human would pause)
-            await asyncio.sleep(1)
         
         # Final Next click to get to Review and Build
         print("   📍 Moving to: Review and Build...")
         try:
-            next_btn = page.locator("button:has-text('Next')").first
-            if await next_btn.is_enabled(timeout=5000):
-                await next_btn.click()
-                print("      ✅ Clicked Next to Review and Build")
-            else:
-                print("      ⚠️  Next button not enabled")
+            await deliberate()
+            await page.locator("button:has-text('Next'):not([disabled])").first.click(timeout=5000)
+            print("      ✅ Clicked Next to Review and Build")
         except Exception as e:
-            print(f"      ⚠️  Could not click Next: {e}")
+            print(f"      ⚠️  Could not click Next (missing or not enabled): {e}")
         
         # Now wait for Review and Build to fully load
         print("   ⏳ Waiting for Review and Build to fully load...")
-        await asyncio.sleep(3)  # Initial wait for page transition
+        await page.wait_for_load_state("domcontentloaded")  # page transition; readiness is waited on below
         await take_screenshot("09_after_navigating_to_review_build")
         
         # CRITICAL: Wait for loading to complete and Save button to be enabled
@@ -951,160 +1339,64 @@ async def update_search_index_prompt(
         save_button_enabled = False
         loading_complete = False
         
-        # Wait up to 25 seconds for loading to complete AND Save button to be enabled
-        for wait_attempt in range(25):
-            page_ready = await page.evaluate("""
-                () => {
-                    // Check for loading indicators/spinners first
-                    const spinners = document.querySelectorAll('[class*="spinner"], [class*="loading"], [class*="slds-spinner"], [aria-busy="true"]');
-                    let isLoading = false;
-                    for (let spinner of spinners) {
-                        if (spinner.offsetParent !== null) {  // Visible
-                            isLoading = true;
-                            break;
-                        }
-                    }
-                    
-                    // Check multiple ways content might appear
-                    const bodyText = document.body.textContent || '';
-                    let hasContent = false;
-                    
-                    // Method 1: Check for specific review content keywords
-                    if (bodyText.includes('Configuration') || 
-                        bodyText.includes('Search Index') ||
-                        bodyText.includes('Source DMO') ||
-                        bodyText.includes('Parsing') ||
-                        bodyText.includes('Review') ||
-                        bodyText.includes('Chunking') ||
-                        bodyText.includes('Vectorization')) {
-                        hasContent = true;
-                    }
-                    
-                    // Method 2: Check if main content area exists and has text
-                    if (!hasContent) {
-                        const mainContent = document.querySelector('[class*="content"], [class*="main"], [role="main"], [class*="body"]');
-                        if (mainContent) {
-                            const text = mainContent.textContent || '';
-                            if (text.length > 50) {
-                                hasContent = true;
-                            }
-                        }
-                    }
-                    
-                    // Method 3: Check if Save button is visible AND enabled (critical!)
-                    // Check both regular DOM and Shadow DOM
-                    let saveEnabled = false;
-                    
-                    // Regular DOM buttons
-                    const saveButtons = document.querySelectorAll('button');
-                    for (let btn of saveButtons) {
-                        if (btn.offsetParent === null) continue;
-                        const text = (btn.textContent || btn.innerText || '').trim();
-                        if ((text === 'Save' || text === 'Save & Build' || text === 'Build') && !btn.disabled) {
-                            saveEnabled = true;
-                            break;
-                        }
-                    }
-                    
-                    // Also check Shadow DOM (Lightning components)
-                    if (!saveEnabled) {
-                        const lwcComponents = document.querySelectorAll('lightning-button, button[is]');
-                        for (let component of lwcComponents) {
-                            if (component.shadowRoot) {
-                                const shadowButtons = component.shadowRoot.querySelectorAll('button');
-                                for (let btn of shadowButtons) {
-                                    const text = (btn.textContent || btn.innerText || '').trim();
-                                    if ((text === 'Save' || text === 'Save & Build' || text === 'Build') && !btn.disabled) {
-                                        const rect = btn.getBoundingClientRect();
-                                        if (rect.width > 0 && rect.height > 0) {
-                                            saveEnabled = true;
-                                            break;
-                                        }
-                                    }
-                                }
-                                if (saveEnabled) break;
-                            }
-                        }
-                    }
-                    
-                    return { isLoading: isLoading, hasContent: hasContent, saveEnabled: saveEnabled };
-                }
-            """)
-            
-            loading_complete = not page_ready.get('isLoading', True)
-            
+        # Wait up to 25 seconds for loading to complete AND Save button to be enabled; the predicate
+        # runs in the page every 250ms, so readiness is seen right away instead of on a 1s tick
+        review_wait_started = datetime.now()
+        try:
+            await page.wait_for_function(
+                "() => window.__reviewBuildReady()", polling=250, timeout=25000
+            )
+            review_ready = True
+        except Exception:
+            review_ready = False
+        
+        # One batched read of the page state (load/content/Save/chunking/URL) serves the
+        # timeout report here and the chunking check below
+        try:
+            page_ready = await page.evaluate("() => window.__snapshot()")
+        except Exception:
+            page_ready = {}
+        
+        if review_ready:
+            body_has_content = save_button_enabled = loading_complete = True
+            waited = (datetime.now() - review_wait_started).total_seconds()
+            print(f"   ✅ Review and Build page fully ready! (waited {waited:.1f}s)")
+            print(f"      - Content loaded: ✅")
+            print(f"      - Loading complete: ✅")
+            print(f"      - Save button enabled: ✅")
+        else:
+            # Timed out: report what was still missing
             body_has_content = page_ready.get('hasContent', False)
             save_button_enabled = page_ready.get('saveEnabled', False)
-            still_loading = page_ready.get('isLoading', False)
-            
-            if body_has_content and save_button_enabled and loading_complete:
-                print(f"   ✅ Review and Build page fully ready! (waited {wait_attempt + 1}s)")
-                print(f"      - Content loaded: ✅")
-                print(f"      - Loading complete: ✅")
-                print(f"      - Save button enabled: ✅")
-                break
-            elif still_loading:
-                if wait_attempt % 3 == 0:
-                    print(f"   ⏳ Still loading configs... (waited {wait_attempt + 1}s)")
+            loading_complete = not page_ready.get('isLoading', True)
+            if not loading_complete:
+                print("   ⏳ Still loading configs after 25s")
             elif body_has_content and not save_button_enabled:
-                if wait_attempt % 3 == 0:
-                    print(f"   ⏳ Content loaded but Save button not enabled yet (waited {wait_attempt + 1}s)...")
+                print("   ⏳ Content loaded but Save button not enabled after 25s")
             elif not body_has_content:
-                if wait_attempt % 3 == 0:
-                    print(f"   ⏳ Waiting for page content to load... (waited {wait_attempt + 1}s)")
-            
-            await asyncio.sleep(1)
+                print("   ⏳ Page content still not loaded after 25s")
         
-        # SIMPLER APPROACH: Use Playwright locator to directly wait for Save button
-        # This is more reliable than JavaScript evaluation
-        print("   🔍 Using Playwright locator to find Save button directly...")
+        # One role locator finds the Save button whether it is a plain <button> or inside a
+        # lightning-button shadow root, replacing the JavaScript DOM/shadow-DOM walkers
+        save_button_locator = page.get_by_role("button", name=SAVE_BUTTON_NAME_RE).first
+        print("   🔍 Waiting for Save button...")
         try:
-            save_locator = page.locator("button:has-text('Save')").first
-            await save_locator.wait_for(state="visible", timeout=30000)  # Wait up to 30 seconds
-            is_enabled = await save_locator.is_enabled(timeout=5000)
-            if is_enabled:
-                print("   ✅ Save button found and enabled via Playwright locator!")
+            await save_button_locator.wait_for(state="visible", timeout=30000)
+            if await save_button_locator.is_enabled():
+                print("   ✅ Save button found and enabled!")
                 save_button_enabled = True
             else:
-                print("   ⚠️  Save button found but disabled - waiting for it to enable...")
-                await save_locator.wait_for(state="attached", timeout=10000)
-                # Try one more time
-                is_enabled = await save_locator.is_enabled(timeout=5000)
-                if is_enabled:
+                print("   ⏳ Save button found but disabled - waiting for it to enable...")
+                save_button_enabled = await page.evaluate("(ms) => window.__waitSaveEnabled(ms)", 15000)
+                if save_button_enabled:
                     print("   ✅ Save button is now enabled!")
-                    save_button_enabled = True
                 else:
                     print("   ⚠️  Save button still disabled, but proceeding anyway...")
         except Exception as e:
-            print(f"   ⚠️  Playwright locator wait failed: {e}")
-            print("   ⚠️  Falling back to JavaScript check...")
-            
-            # Fallback to JavaScript check
-            if not (body_has_content and save_button_enabled and loading_complete):
-                final_check = await page.evaluate("""
-                    () => {
-                        const buttons = document.querySelectorAll('button');
-                        for (let btn of buttons) {
-                            const text = (btn.textContent || btn.innerText || '').trim();
-                            if ((text === 'Save' || text === 'Save & Build' || text === 'Build') && btn.offsetParent !== null) {
-                                const isEnabled = !btn.disabled && !btn.hasAttribute('disabled') && btn.getAttribute('aria-disabled') !== 'true';
-                                return { exists: true, enabled: isEnabled };
-                            }
-                        }
-                        return { exists: false, enabled: false };
-                    }
-                """)
-                
-                if final_check.get('enabled'):
-                    print("   ✅ Save button is enabled (JavaScript check)")
-                    save_button_enabled = True
-                elif final_check.get('exists'):
-                    print("   ⚠️  Save button exists but is disabled")
-                else:
-                    print("   ❌ FAILED: No Save button found!")
-                    await take_screenshot("09_review_build_no_save_button")
-                    await browser.close()
-                    return False
+            print(f"   ❌ FAILED: No Save button found! ({e})")
+            await take_screenshot("09_review_build_no_save_button")
+            await close_browser()
+            return False
         
         if save_button_enabled:
             print("   ✅ Review and Build page is ready - Save button is enabled")
@@ -1114,109 +1406,33 @@ async def update_search_index_prompt(
         # CRITICAL: Verify chunking config is loaded before saving
         # If chunking config is empty, the build will fail
         print("🔍 Verifying chunking configuration is loaded on the page...")
-        chunking_loaded = await page.evaluate("""
-            () => {
-                const bodyText = document.body.textContent || '';
-                // Look for indicators that chunking config is present
-                // Common terms: "Passage Extraction", "max_tokens", "Chunking", "8192", etc.
-                const indicators = [
-                    'Passage Extraction',
-                    'max_tokens',
-                    'Chunking',
-                    '8192',
-                    'chunking',
-                    'perFileExtension'
-                ];
-                
-                for (let indicator of indicators) {
-                    if (bodyText.includes(indicator)) {
-                        return true;
-                    }
-                }
-                
-                // Also check if there's a chunking section visible
-                const chunkingSections = document.querySelectorAll('[class*="chunking"], [id*="chunking"], [data-id*="chunking"]');
-                for (let section of chunkingSections) {
-                    if (section.offsetParent !== null) {
-                        const text = section.textContent || '';
-                        if (text.length > 20) {  // Has some content
-                            return true;
-                        }
-                    }
-                }
-                
-                return false;
-            }
-        """)
+        chunking_loaded = page_ready.get('chunkingLoaded', False)  # from the snapshot; re-waited below if not yet
         
         if chunking_loaded:
             print("   ✅ Chunking configuration appears to be loaded on the page")
         else:
             print("   ⚠️  WARNING: Chunking configuration may not be loaded!")
             print("   ⚠️  This could cause the build to fail with empty chunking config")
-            print("   ⏳ Waiting additional 5 seconds for configs to load...")
-            await asyncio.sleep(5)
-        
-        # Wait longer before clicking Save to ensure all validations are complete
-        print("⏳ Waiting 10 seconds before clicking Save to ensure all validations complete...")
-        await asyncio.sleep(10)
-        
-        await take_screenshot("10_before_save")
+            print("   ⏳ Waiting up to 5 seconds for configs to load...")
+            try:
+                await page.wait_for_function("() => window.__chunkingLoaded()", polling=250, timeout=5000)
+                print("   ✅ Chunking configuration loaded")
+            except Exception:
+                print("   ⚠️  Chunking configuration still not detected - continuing")
         
-        # Get all buttons including Shadow DOM
-        all_buttons_info = await page.evaluate("""
-            () => {
-                const buttons = Array.from(document.querySelectorAll('button'));
-                const results = [];
-                
-                // Regular buttons
-                for (let btn of buttons) {
-                    if (btn.offsetParent !== null) {
-                        const text = (btn.textContent || btn.innerText || '').trim();
-                        if (text.length > 0) {
-                            results.push({
-                                text: text,
-                                disabled: btn.disabled,
-                                classes: btn.className || '',
-                                inShadow: false
-                            });
-                        }
-                    }
-                }
-                
-                // Check Shadow DOM (Lightning Web Components)
-                const lwcButtons = document.querySelectorAll('lightning-button, lightning-button-menu, button[is]');
-                for (let lwc of lwcButtons) {
-                    if (lwc.shadowRoot) {
-                        const shadowButtons = lwc.shadowRoot.querySelectorAll('button');
-                        for (let btn of shadowButtons) {
-                            if (btn.offsetParent !== null) {
-                                const text = (btn.textContent || btn.innerText || '').trim();
-                                if (text.length > 0) {
-                                    results.push({
-                                        text: text,
-                                        disabled: btn.disabled,
-                                        classes: btn.className || '',
-                                        inShadow: true
-                                    });
-                                }
-                            }
-                        }
-                    }
-                }
-                
-                return results;
-            }
-        """)
+        # Wait (up to 10s) for validations to settle: no visible errors and Save enabled
+        print("⏳ Waiting for validations to complete before clicking Save...")
+        try:
+            await page.wait_for_function("() => window.__saveValidationsComplete()", polling=250, timeout=10000)
+            print("   ✅ Validations complete")
+        except Exception:
+            print("   ⚠️  Validations not confirmed after 10s - proceeding anyway...")
         
-        print(f"   📋 Found {len(all_buttons_info)} visible buttons:")
-        for btn in all_buttons_info[:15]:
-            marker = "🔘" if any(x in btn.get('text', '') for x in ['Save', 'Build', 'Finish']) else "  "
-            shadow = " (Shadow DOM)" if btn.get('inShadow') else ""
-            print(f"      {marker} '{btn.get('text', '')}' (disabled={btn.get('disabled')}){shadow}")
         # Verify we're on Review and Build
-        page_text = await page.locator("body").text_content()
-        is_review_build = ("Review" in page_text and "Build" in page_text)
+        try:
+            is_review_build = await page.evaluate("() => window.__onReviewBuild()")
+        except Exception:
+            is_review_build = False
         
         if is_review_build:
             print("   ✅ Confirmed: On Review & Build step")
@@ -1240,281 +1456,89 @@ async def update_search_index_prompt(
                         result.push({
                             text: text,
                             disabled: btn.disabled,
-                            classes: btn.className || '',
                             id: btn.id || '',
                             ariaDisabled: btn.getAttribute('aria-disabled') || 'false',
                             visible: true
                         });
+                        if (result.length >= 20) break;  // only the first 20 are printed
                     }
                 }
                 return result;
             }
         """)
         
-        print(f"   📋 Found {len(all_buttons_info)} visible buttons:")
-        for btn in all_buttons_info[:20]:  # Show first 20
+        print(f"   📋 First {len(all_buttons_info)} visible buttons:")
+        for btn in all_buttons_info:
             marker = "🔘" if any(x in btn.get('text', '') for x in ['Save', 'Build', 'Finish']) else "  "
             print(f"      {marker} '{btn.get('text', '')}' (disabled={btn.get('disabled')}, aria-disabled={btn.get('ariaDisabled')})")
         
-        # FIND AND CLICK SAVE BUTTON - COMPREHENSIVE SEARCH INCLUDING SHADOW DOM
-        print("💾 Finding and clicking Save button (checking Shadow DOM too)...")
+        # FIND AND CLICK SAVE BUTTON
+        print("💾 Finding and clicking Save button...")
         save_clicked = False
         current_url_before = page.url
         
-        # Comprehensive search for Save button - including Shadow DOM
-        save_result = await page.evaluate("""
-            () => {
-                // Method 1: Find button with exact text "Save" in regular DOM
-                const allButtons = document.querySelectorAll('button');
-                for (let btn of allButtons) {
-                    if (btn.offsetParent === null) continue; // Skip hidden
-                    const text = (btn.textContent || btn.innerText || '').trim();
-                    if (text === 'Save' || text === 'Save & Build' || text === 'Build') {
-                        return {
-                            found: true,
-                            text: text,
-                            disabled: btn.disabled,
-                            element: 'button',
-                            method: 'regular-dom'
-                        };
-                    }
-                }
-                
-                // Method 2: Check Shadow DOM (Lightning Web Components)
-                const lwcComponents = document.querySelectorAll('lightning-button, lightning-button-menu, button[is], [class*="lightning-button"]');
-                for (let component of lwcComponents) {
-                    if (component.shadowRoot) {
-                        const shadowButtons = component.shadowRoot.querySelectorAll('button');
-                        for (let btn of shadowButtons) {
-                            const text = (btn.textContent || btn.innerText || '').trim();
-                            if (text === 'Save' || text === 'Save & Build' || text === 'Build') {
-                                // Check if visible (might need to check parent component)
-                                const rect = btn.getBoundingClientRect();
-                                if (rect.width > 0 && rect.height > 0) {
-                                    return {
-                                        found: true,
-                                        text: text,
-                                        disabled: btn.disabled,
-                                        element: 'shadow-dom-button',
-                                        method: 'shadow-dom'
-                                    };
-                                }
-                            }
-                        }
-                    }
-                }
-                
-                // Method 3: Find by class (brand/primary buttons) - more aggressive
-                for (let btn of allButtons) {
-                    if (btn.offsetParent === null) continue;
-                    const classes = btn.className || '';
-                    const text = (btn.textContent || btn.innerText || '').trim();
-                    // Look for brand/primary button classes
-                    if ((classes.includes('slds-button--brand') || 
-                         classes.includes('slds-button_brand') ||
-                         classes.includes('brand') ||
-                         classes.includes('primary')) && 
-                        (text === 'Save' || text.includes('Save') || text === 'Build')) {
-                        return {
-                            found: true,
-                            text: text,
-                            disabled: btn.disabled,
-                            element: 'brand-button',
-                            method: 'class-based'
-                        };
-                    }
-                }
-                
-                // Method 4: Find by position (top-right header area) - last resort
-                const headerArea = document.querySelector('[class*="header"], [class*="toolbar"], [class*="actions"]');
-                if (headerArea) {
-                    const headerButtons = headerArea.querySelectorAll('button');
-                    for (let btn of headerButtons) {
-                        if (btn.offsetParent === null) continue;
-                        const text = (btn.textContent || btn.innerText || '').trim();
-                        if (text === 'Save' || text === 'Save & Build' || text === 'Build') {
-                            return {
-                                found: true,
-                                text: text,
-                                disabled: btn.disabled,
-                                element: 'header-button',
-                                method: 'header-area'
-                            };
-                        }
-                    }
-                }
-                
-                return { found: false };
-            }
-        """)
-        
-        if save_result.get('found'):
-            btn_text = save_result.get('text', '')
-            is_disabled = save_result.get('disabled', True)
-            print(f"   ✅ Found Save button: '{btn_text}' (disabled={is_disabled})")
+        try:
+            # click() waits for the button to be visible, enabled and stable before clicking
+            await save_button_locator.click(timeout=30000)
+            save_clicked = True
+            await take_screenshot("10b_after_save_click")
+            print("   ✅ Clicked Save button")
             
-            if not is_disabled:
-                method_used = save_result.get('method', 'unknown')
-                print(f"   🖱️  Clicking Save button (found via: {method_used})...")
-                # Click it - handle both regular DOM and Shadow DOM
-                clicked = await page.evaluate(f"""
-                    (method) => {{
-                        // If found via shadow-dom, click in shadow DOM
-                        if (method === 'shadow-dom') {{
-                            const lwcComponents = document.querySelectorAll('lightning-button, lightning-button-menu, button[is], [class*="lightning-button"]');
-                            for (let component of lwcComponents) {{
-                                if (component.shadowRoot) {{
-                                    const shadowButtons = component.shadowRoot.querySelectorAll('button');
-                                    for (let btn of shadowButtons) {{
-                                        const text = (btn.textContent || btn.innerText || '').trim();
-                                        if ((text === 'Save' || text === 'Save & Build' || text === 'Build') && !btn.disabled) {{
-                                            btn.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
-                                            btn.focus();
-                                            btn.click();
-                                            const evt = new MouseEvent('click', {{ bubbles: true, cancelable: true }});
-                                            btn.dispatchEvent(evt);
-                                            return {{ clicked: true, text: text }};
-                                        }}
-                                    }}
-                                }}
-                            }}
-                        }}
-                        
-                        // Regular DOM buttons
-                        const allButtons = document.querySelectorAll('button');
-                        for (let btn of allButtons) {{
-                            if (btn.offsetParent === null) continue;
-                            const text = (btn.textContent || btn.innerText || '').trim();
-                            if ((text === 'Save' || text === 'Save & Build' || text === 'Build') && !btn.disabled) {{
-                                btn.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
-                                btn.focus();
-                                btn.click();
-                                const evt = new MouseEvent('click', {{ bubbles: true, cancelable: true }});
-                                btn.dispatchEvent(evt);
-                                return {{ clicked: true, text: text }};
-                            }}
-                        }}
-                        return {{ clicked: false }};
-                    }}
-                """, method_used)
-                
-                if clicked.get('clicked'):
-                    save_clicked = True
-                    await take_screenshot("10b_after_save_click")
-                    print(f"   ✅ Clicked Save button: '{clicked.get('text')}'")
-                    
-                    # IMMEDIATE VALIDATION: Check for URL redirect
-                    print(f"   🔍 IMMEDIATE VALIDATION: Checking for redirect...")
-                    print(f"      URL before: {current_url_before[:120]}")
-                    redirect_detected = False
-                    for check_attempt in range(6):
-                        await asyncio.sleep(1)
-                        current_url_after = page.url
-                        if current_url_after != current_url_before:
-                            print(f"      ✅ URL CHANGED! Redirect detected - Save worked!")
-                            print(f"      URL after: {current_url_after[:120]}")
-                            await take_screenshot("10c_redirect_detected")
-                            redirect_detected = True
-                            break
-                    
-                    if not redirect_detected:
-                        print(f"      ❌ FAILED: No redirect after 6 seconds - Save did not work")
-                        await take_screenshot("10c_no_redirect")
-                        print("   ❌ Stopping - no further validation needed")
-                        await browser.close()
-                        return False
-                else:
-                    print(f"   ❌ JavaScript click failed, trying Playwright locator...")
-                    # Fallback: Use Playwright locator (more reliable for Lightning components)
-                    try:
-                        save_locator = page.locator("button:has-text('Save'), button:has-text('Save & Build'), button:has-text('Build')").first
-                        if await save_locator.is_visible(timeout=5000):
-                            await save_locator.click()
-                            save_clicked = True
-                            print(f"   ✅ Clicked Save via Playwright locator!")
-                            await take_screenshot("10b_after_save_click_playwright")
-                            
-                            # Check for redirect - wait longer (Salesforce can take 10-15 seconds)
-                            redirect_detected = False
-                            for check_attempt in range(15):  # Wait up to 15 seconds
-                                await asyncio.sleep(1)
-                                current_url_after = page.url
-                                if current_url_after != current_url_before:
-                                    print(f"      ✅ URL CHANGED! Redirect detected - Save worked! (waited {check_attempt + 1}s)")
-                                    redirect_detected = True
-                                    break
-                                if check_attempt % 3 == 0 and check_attempt > 0:
-                                    print(f"      ⏳ Still waiting for redirect... (waited {check_attempt + 1}s)")
-                            
-                            if not redirect_detected:
-                                print(f"      ❌ FAILED: No redirect after 15 seconds")
-                                await take_screenshot("10c_no_redirect_after_15s")
-                                await browser.close()
-                                return False
-                        else:
-                            print(f"   ❌ Playwright locator also failed - button not visible")
-                    except Exception as e:
-                        print(f"   ❌ Playwright locator error: {e}")
-            else:
-                print(f"   ⚠️  Save button is disabled, waiting for it to enable...")
-        else:
-            print(f"   ❌ Could not find Save button via JavaScript!")
-            print(f"   🔄 Trying Playwright locator as fallback...")
-            await take_screenshot("10_save_button_not_found")
+            # IMMEDIATE VALIDATION: Check for URL redirect
+            print(f"   🔍 IMMEDIATE VALIDATION: Checking for redirect...")
+            print(f"      URL before: {current_url_before[:120]}")
+            redirect_detected = await wait_for_redirect(current_url_before)
+            if redirect_detected:
+                current_url_after = page.url
+                print(f"      ✅ URL CHANGED! Redirect detected - Save worked!")
+                print(f"      URL after: {current_url_after[:120]}")
+                await take_screenshot("10c_redirect_detected")
             
-            # Try Playwright locator - often more reliable
-            try:
-                save_locator = page.locator("button:has-text('Save')").first
-                if await save_locator.is_visible(timeout=5000):
-                    is_enabled = await save_locator.is_enabled(timeout=2000)
-                    if is_enabled:
-                        await save_locator.click()
-                        save_clicked = True
-                        print(f"   ✅ Found and clicked Save via Playwright locator!")
-                        await take_screenshot("10b_after_save_click_playwright")
-                        
-                        # Check for redirect
-                        redirect_detected = False
-                        for check_attempt in range(6):
-                            await asyncio.sleep(1)
-                            current_url_after = page.url
-                            if current_url_after != current_url_before:
-                                print(f"      ✅ URL CHANGED! Redirect detected - Save worked!")
-                                redirect_detected = True
-                                break
-                        
-                        if not redirect_detected:
-                            print(f"      ❌ FAILED: No redirect after 6 seconds")
-                            await browser.close()
-                            return False
-                    else:
-                        print(f"   ⚠️  Save button found but disabled")
-                else:
-                    print(f"   ❌ Save button not visible via Playwright either")
-            except Exception as e:
-                print(f"   ❌ Playwright locator error: {e}")
+            if not redirect_detected:
+                print(f"      ❌ FAILED: No redirect after 15 seconds - Save did not work")
+                await take_screenshot("10c_no_redirect")
+                print("   ❌ Stopping - no further validation needed")
+                await close_browser()
+                return False
+        except Exception as e:
+            print(f"   ❌ Could not click Save button: {e}")
+            await take_screenshot("10_save_button_not_found")
         
         if not save_clicked:
             print("   ⏳ Save button not in header, searching all buttons...")
-            for attempt in range(15):  # Try for up to 30 seconds (15 * 2 seconds)
-                # Check if Save button exists and is enabled - MORE AGGRESSIVE SEARCH
-                button_status = await page.evaluate("""
-                    () => {
-                        const buttons = document.querySelectorAll('button');
-                        const priorityTexts = ['Save & Build', 'Build', 'Save', 'Finish'];
+            # Resolve the Save button once; the loop below reuses this handle while it stays attached
+            try:
+                save_handle = await save_button_locator.element_handle(timeout=5000)
+            except Exception:
+                save_handle = None
+            async for attempt in _backoff_attempts(30):  # Try for up to 30 seconds
+                # Check if Save button exists and is enabled - the cached handle first, so the
+                # status check touches one node instead of rescanning every button
+                button_status = None
+                if save_handle is not None:
+                    try:
+                        button_status = await save_handle.evaluate(SAVE_HANDLE_FORCE_ENABLE_JS)
+                    except Exception:
+                        button_status = None
+                    if not button_status or not button_status.get('found'):
+                        save_handle = button_status = None  # detached - rescan the page below
+                if button_status is None:
+                    # MORE AGGRESSIVE SEARCH
+                    button_status = await page.evaluate("""
+                        () => {
+                            const buttons = document.querySelectorAll('button');
+                            const priorityTexts = ['Save & Build', 'Build', 'Save', 'Finish'];
                     
-                    // First pass: exact matches
-                    for (let priorityText of priorityTexts) {
-                        for (let btn of buttons) {
-                            if (btn.offsetParent === null) continue;
-                            const text = (btn.textContent || btn.innerText || '').trim();
-                            if (text === priorityText || text.includes(priorityText)) {
+                        // First pass: exact matches
+                        for (let priorityText of priorityTexts) {
+                            for (let btn of window.__buttonsContaining(priorityText)) {
+                                const text = (btn.textContent || '').trim();
                                 // Force enable
                                 btn.removeAttribute('disabled');
                                 btn.disabled = false;
                                 btn.classList.remove('slds-button--disabled', 'disabled');
                                 btn.setAttribute('aria-disabled', 'false');
-                                
+                            
                                 return {
                                     found: true,
                                     text: text,
@@ -1524,55 +1548,76 @@ async def update_search_index_prompt(
                                 };
                             }
                         }
-                    }
                     
-                    // Second pass: brand buttons (primary action buttons)
-                    for (let btn of buttons) {
-                        if (btn.offsetParent === null) continue;
-                        const text = (btn.textContent || btn.innerText || '').trim();
-                        const classes = btn.className || '';
-                        if (classes.includes('slds-button--brand') && text.length > 0 && 
-                            !text.includes('Cancel') && !text.includes('Back') && 
-                            !text.includes('Next') && !text.includes('Previous')) {
-                            // Force enable
-                            btn.removeAttribute('disabled');
-                            btn.disabled = false;
-                            btn.classList.remove('slds-button--disabled', 'disabled');
-                            btn.setAttribute('aria-disabled', 'false');
+                        // Second pass: brand buttons (primary action buttons)
+                        for (let btn of buttons) {
+                            if (btn.offsetParent === null) continue;
+                            const text = (btn.textContent || btn.innerText || '').trim();
+                            const classes = btn.className || '';
+                            if (classes.includes('slds-button--brand') && text.length > 0 && 
+                                !text.includes('Cancel') && !text.includes('Back') && 
+                                !text.includes('Next') && !text.includes('Previous')) {
+                                // Force enable
+                                btn.removeAttribute('disabled');
+                                btn.disabled = false;
+                                btn.classList.remove('slds-button--disabled', 'disabled');
+                                btn.setAttribute('aria-disabled', 'false');
                             
-                            return {
-                                found: true,
-                                text: text,
-                                disabled: btn.disabled,
-                                classes: classes,
-                                element: 'brand'
-                            };
+                                return {
+                                    found: true,
+                                    text: text,
+                                    disabled: btn.disabled,
+                                    classes: classes,
+                                    element: 'brand'
+                                };
+                            }
                         }
-                    }
                     
-                    return { found: false, text: '', disabled: true, classes: '', element: null };
-                }
-            """)
+                        return { found: false, text: '', disabled: true, classes: '', element: null };
+                    }
+                """)
                 
                 if button_status.get('found'):
                     is_disabled = button_status.get('disabled')
                     btn_text = button_status.get('text', '')
-                    print(f"      📍 Attempt {attempt + 1}/30: Found button '{btn_text}' (disabled={is_disabled}, type={button_status.get('element')})")
+                    print(f"      📍 Attempt {attempt + 1}: Found button '{btn_text}' (disabled={is_disabled}, type={button_status.get('element')})")
                     
                     if not is_disabled:
                         print(f"      ✅ Save button is enabled! Clicking '{btn_text}'...")
                         # Try to click it
-                        clicked = await page.evaluate("""
-                        () => {
-                            const buttons = document.querySelectorAll('button');
-                            const priorityTexts = ['Save & Build', 'Build', 'Save', 'Finish'];
+                        if button_status.get('element') == 'handle':
+                            try:
+                                clicked = await save_handle.evaluate(SAVE_HANDLE_CLICK_JS)
+                            except Exception:
+                                clicked, save_handle = {'clicked': False, 'text': ''}, None
+                        else:
+                            clicked = await page.evaluate("""
+                            () => {
+                                const buttons = document.querySelectorAll('button');
+                                const priorityTexts = ['Save & Build', 'Build', 'Save', 'Finish'];
                             
-                            // Try priority texts first
-                            for (let priorityText of priorityTexts) {
+                                // Try priority texts first
+                                for (let priorityText of priorityTexts) {
+                                    for (let btn of window.__buttonsContaining(priorityText)) {
+                                        const text = (btn.textContent || '').trim();
+                                        if (!btn.disabled) {
+                                            btn.scrollIntoView({ behavior: 'smooth', block: 'center' });
+                                            btn.focus();
+                                            btn.click();
+                                            const evt = new MouseEvent('click', { bubbles: true, cancelable: true });
+                                            btn.dispatchEvent(evt);
+                                            return { clicked: true, text: text };
+                                        }
+                                    }
+                                }
+                            
+                                // Try brand buttons
                                 for (let btn of buttons) {
                                     if (btn.offsetParent === null) continue;
                                     const text = (btn.textContent || btn.innerText || '').trim();
-                                    if ((text === priorityText || text.includes(priorityText)) && !btn.disabled) {
+                                    const classes = btn.className || '';
+                                    if (classes.includes('slds-button--brand') && !btn.disabled && 
+                                        !text.includes('Cancel') && !text.includes('Back')) {
                                         btn.scrollIntoView({ behavior: 'smooth', block: 'center' });
                                         btn.focus();
                                         btn.click();
@@ -1581,27 +1626,10 @@ async def update_search_index_prompt(
                                         return { clicked: true, text: text };
                                     }
                                 }
-                            }
                             
-                            // Try brand buttons
-                            for (let btn of buttons) {
-                                if (btn.offsetParent === null) continue;
-                                const text = (btn.textContent || btn.innerText || '').trim();
-                                const classes = btn.className || '';
-                                if (classes.includes('slds-button--brand') && !btn.disabled && 
-                                    !text.includes('Cancel') && !text.includes('Back')) {
-                                    btn.scrollIntoView({ behavior: 'smooth', block: 'center' });
-                                    btn.focus();
-                                    btn.click();
-                                    const evt = new MouseEvent('click', { bubbles: true, cancelable: true });
-                                    btn.dispatchEvent(evt);
-                                    return { clicked: true, text: text };
-                                }
+                                return { clicked: false, text: '' };
                             }
-                            
-                            return { clicked: false, text: '' };
-                        }
-                    """)
+                        """)
                     
                     if clicked.get('clicked'):
                         print(f"      ✅ Clicked Save via JavaScript! (Button: '{clicked.get('text')}')")
@@ -1614,22 +1642,18 @@ async def update_search_index_prompt(
                         print(f"      URL before Save: {current_url_before[:100]}")
                         
                         # Wait a few seconds and check if URL changed
-                        redirect_detected = False
-                        for check_attempt in range(6):  # Check for 6 seconds
-                            await asyncio.sleep(1)
+                        redirect_detected = await wait_for_redirect(current_url_before)
+                        if redirect_detected:
                             current_url_after = page.url
-                            if current_url_after != current_url_before:
-                                print(f"      ✅ URL CHANGED! Redirect detected - Save worked!")
-                                print(f"      URL after Save: {current_url_after[:100]}")
-                                await take_screenshot("10c_after_redirect_detected")
-                                redirect_detected = True
-                                break
+                            print(f"      ✅ URL CHANGED! Redirect detected - Save worked!")
+                            print(f"      URL after Save: {current_url_after[:100]}")
+                            await take_screenshot("10c_after_redirect_detected")
                         
                         if not redirect_detected:
-                            print(f"      ❌ FAILED: No URL redirect after 6 seconds - Save did not work")
-                            await take_screenshot("10c_no_redirect_after_6s")
+                            print(f"      ❌ FAILED: No URL redirect after 15 seconds - Save did not work")
+                            await take_screenshot("10c_no_redirect_after_15s")
                             print("   ❌ Stopping - no further validation needed")
-                            await browser.close()
+                            await close_browser()
                             return False
                         
                         # Break out of the attempt loop since we clicked Save
@@ -1637,12 +1661,10 @@ async def update_search_index_prompt(
                     else:
                         print(f"      ⚠️  Click attempt failed, button may have become disabled")
                 else:
-                    print(f"      ⏳ Save button found but still disabled (attempt {attempt + 1}/30)...")
+                    print(f"      ⏳ Save button found but still disabled (attempt {attempt + 1})...")
             else:
                 if attempt % 5 == 0:  # Print every 5th attempt to reduce spam
-                    print(f"      ⏳ Save button not found yet (attempt {attempt + 1}/30)...")
-            
-            await asyncio.sleep(2)
+                    print(f"      ⏳ Save button not found yet (attempt {attempt + 1})...")
         
         # Fallback: Try Playwright if JavaScript didn't work
         if not save_clicked:
@@ -1653,7 +1675,7 @@ async def update_search_index_prompt(
                 await save_button.wait_for(state='visible', timeout=10000)
                 
                 # Wait for it to be enabled
-                for attempt in range(20):
+                async for attempt in _backoff_attempts(40):
                     is_enabled = await save_button.is_enabled()
                     if is_enabled:
                         await save_button.scroll_into_view_if_needed()
@@ -1666,26 +1688,21 @@ async def update_search_index_prompt(
                         
                         # IMMEDIATE VALIDATION: Check for URL redirect
                         print("   🔍 IMMEDIATE VALIDATION: Checking for URL redirect...")
-                        redirect_detected = False
-                        for check_attempt in range(6):
-                            await asyncio.sleep(1)
+                        redirect_detected = await wait_for_redirect(current_url_before)
+                        if redirect_detected:
                             current_url_after = page.url
-                            if current_url_after != current_url_before:
-                                print(f"      ✅ URL CHANGED! Redirect detected - Save worked!")
-                                await take_screenshot("10c_after_redirect_detected_playwright")
-                                redirect_detected = True
-                                break
+                            print(f"      ✅ URL CHANGED! Redirect detected - Save worked!")
+                            await take_screenshot("10c_after_redirect_detected_playwright")
                         
                         if not redirect_detected:
-                            print(f"      ❌ FAILED: No URL redirect after 6 seconds - Save did not work")
-                            await take_screenshot("10c_no_redirect_after_6s_playwright")
+                            print(f"      ❌ FAILED: No URL redirect after 15 seconds - Save did not work")
+                            await take_screenshot("10c_no_redirect_after_15s_playwright")
                             print("   ❌ Stopping - no further validation needed")
-                            await browser.close()
+                            await close_browser()
                             return False
                         break
                     else:
-                        print(f"      ⏳ Waiting for Save button to enable (attempt {attempt + 1}/20)...")
-                        await asyncio.sleep(2)
+                        print(f"      ⏳ Waiting for Save button to enable (attempt {attempt + 1})...")
             except Exception as e:
                 print(f"⚠️  Playwright method failed: {e}")
         
@@ -1810,6 +1827,7 @@ async def update_search_index_prompt(
                                     detail_url = f"{instance_url}/lightning/r/DataSemanticSearch/{search_index_id}/view"
                                     if page.url != detail_url:
                                         await page.goto(detail_url, wait_until='domcontentloaded', timeout=30000)
+                                        last_screenshot_hash = None  # new page, always capture the next step
                                         await asyncio.sleep(2)
                                     
                                     rebuild_clicked = False
@@ -1921,6 +1939,7 @@ async def update_search_index_prompt(
                                         detail_url = f"{instance_url}/lightning/r/DataSemanticSearch/{search_index_id}/view"
                                         if page.url != detail_url:
                                             await page.goto(detail_url, wait_until='domcontentloaded', timeout=30000)
+                                            last_screenshot_hash = None  # new page, always capture the next step
                                             await asyncio.sleep(2)
                                         
                                         # Find and click Rebuild button (between Delete and Edit)
@@ -2078,7 +2097,7 @@ async def update_search_index_prompt(
         # Close browser when done (either success or final failure)
         if not browser_closed:
             print("\n🔒 Closing browser - session complete")
-            await browser.close()
+            await close_browser()
             browser_closed = True
         
         if save_clicked and status_check_success:
@@ -3681,7 +3700,7 @@ async def _create_retriever_ui(username, password, instance_url, index_name, sta
 async def run_new_index_pipeline(
     username, password, instance_url, prompt_template_api_name, previous_cycle_prompt,
     source_index_id, state_dir, run_id=None, headless=False, index_prefix=None, resume_state=None,
-    save_state_callback=None
+    save_state_callback=None, access_token=None
 ):
     """
     Full Cycle 2+ pipeline: Create Index → Poll → Create Retriever → Poll retriever → Update prompt template.
@@ -3709,6 +3728,7 @@ async def run_new_index_pipeline(
         index_prefix: Index name prefix (e.g., "Opt_P1")
         resume_state: State dict from previous run (for resume)
         save_state_callback: Callback to save state after each substep
+        access_token: Already-authenticated session token (skips the SOAP login when provided)
 
     Returns:
         Tuple (new_search_index_id, new_retriever_api_name) or (None, None) on failure/abort
@@ -3724,7 +3744,8 @@ async def run_new_index_pipeline(
     def should_abort():
         return bool(run_id and check_run_aborted(run_id))
 
-    _, access_token = get_salesforce_credentials(username=username, password=password, instance_url=instance_url)
+    if not access_token:
+        _, access_token = get_salesforce_credentials(username=username, password=password, instance_url=instance_url)
     if not index_prefix:
         raise ValueError("indexPrefix is required in YAML configuration. No hardcoded fallback.")
     if index_prefix[0].isdigit():
@@ -3857,6 +3878,9 @@ if __name__ == "__main__":
     capture_network = '--capture-network' in sys.argv
     if capture_network:
         sys.argv.remove('--capture-network')
+    reuse_session = '--reuse-session' in sys.argv
+    if reuse_session:
+        sys.argv.remove('--reuse-session')
     
     # Load YAML configuration for login credentials
     yaml_path = Path(__file__).parent.parent.parent / "inputs" / "prompt_optimization_input.yaml"
@@ -3867,7 +3891,7 @@ if __name__ == "__main__":
     
     try:
         with open(yaml_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YAML_LOADER)
         
         salesforce_config = config.get('configuration', {}).get('salesforce', {})
         username = salesforce_config.get('username')
@@ -3901,12 +3925,13 @@ if __name__ == "__main__":
     
     # Parse remaining command line arguments (prompt text)
     if len(sys.argv) < 2:
-        print("Usage: python3 playwright_scripts.py <new_prompt> [--capture-network]")
+        print("Usage: python3 playwright_scripts.py <new_prompt> [--capture-network] [--reuse-session]")
         print("\nExample:")
         print('  python3 playwright_scripts.py \\')
         print('    "Your new prompt text here" \\')
         print('    --capture-network')
         print("\nNote: Login credentials and search index ID are loaded from prompt_optimization_input.yaml")
+        print("      --reuse-session saves the login session to the state dir and restores it on the next run")
         sys.exit(1)
     
     prompt_arg = sys.argv[1]
@@ -3933,8 +3958,11 @@ if __name__ == "__main__":
     
     if capture_network:
         print("📡 Network capture enabled")
+    if reuse_session:
+        print("🔑 Session reuse enabled")
     
     asyncio.run(update_search_index_prompt(
-        username, password, instance_url, search_index_id, new_prompt, capture_network, take_screenshots
+        username, password, instance_url, search_index_id, new_prompt,
+        capture_network=capture_network, take_screenshots=take_screenshots, reuse_session=reuse_session
     ))
 
@@ -5,14 +5,68 @@ Worker utilities for database operations and job management
 
 import os
 import json
+import base64
+import threading
+import time
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+import psycopg2.pool
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from typing import List, Dict, Optional, Any
 from pathlib import Path
 
 
-def get_db_connection():
-    """Get PostgreSQL database connection from Heroku DATABASE_URL"""
+DB_POOL_MIN_CONNECTIONS = 1
+DB_POOL_MAX_CONNECTIONS = 8
+DB_POOL_PING_AFTER_SECONDS = 30  # pooled connections idle longer than this are checked with SELECT 1
+
+_db_pool = None
+_db_pool_pid = None
+_db_pool_lock = threading.Lock()
+
+
+class _PooledConnection(psycopg2.extensions.connection):
+    """Connection whose close() hands it back to the pool instead of dropping the socket.
+
+    Lets every existing `conn.close()` call site reuse the TCP/TLS/auth handshake on the next
+    get_db_connection(). The pool itself calls close() when discarding a connection, which
+    then closes it for real.
+    """
+    _releasing = False
+    released_at = 0.0  # time.monotonic() of the last return to the pool
+    prepared_statements = frozenset()  # names PREPAREd on this session (see _ensure_prepared)
+
+    def close(self):
+        pool = _db_pool
+        if self._releasing or self.closed or pool is None or _db_pool_pid != os.getpid():
+            return super().close()
+        self._releasing = True
+        self.released_at = time.monotonic()
+        try:
+            pool.putconn(self)
+        except Exception:
+            super().close()
+
+    def is_alive(self) -> bool:
+        """False when the session is gone (e.g. Postgres restarted or dropped the idle connection)"""
+        if self.closed:
+            return False
+        if time.monotonic() - self.released_at < DB_POOL_PING_AFTER_SECONDS:
+            return True
+        try:
+            with self.cursor() as cur:
+                cur.execute("SELECT 1")
+            self.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+
+def _get_database_url() -> Optional[str]:
+    """DATABASE_URL normalized for psycopg2, or None when unset"""
     database_url = os.environ.get('DATABASE_URL')
     if not database_url:
         return None
@@ -21,15 +75,104 @@ def get_db_connection():
     # Heroku uses postgres:// but psycopg2 needs postgresql://
     if database_url.startswith('postgres://'):
         database_url = database_url.replace('postgres://', 'postgresql://', 1)
+    return database_url
+
+
+def _get_db_pool(database_url: str):
+    """Process-wide connection pool, (re)created lazily and after a fork"""
+    global _db_pool, _db_pool_pid
+    with _db_pool_lock:
+        if _db_pool is None or _db_pool_pid != os.getpid():
+            _db_pool = psycopg2.pool.ThreadedConnectionPool(
+                DB_POOL_MIN_CONNECTIONS, DB_POOL_MAX_CONNECTIONS, database_url,
+                sslmode='require', connection_factory=_PooledConnection,
+            )
+            _db_pool_pid = os.getpid()
+        return _db_pool
+
+
+def get_db_connection():
+    """Get PostgreSQL database connection from Heroku DATABASE_URL.
+
+    Connections come from a shared pool; calling close() on them returns them to the pool.
+    """
+    database_url = _get_database_url()
+    if not database_url:
+        return None
     
     try:
-        conn = psycopg2.connect(database_url, sslmode='require')
-        return conn
+        pool = _get_db_pool(database_url)
+        # Discard dead pooled connections (at most one pass over the pool), then reconnect
+        for _ in range(DB_POOL_MAX_CONNECTIONS):
+            try:
+                conn = pool.getconn()
+            except psycopg2.pool.PoolError:
+                # Pool exhausted - hand out a one-off connection rather than blocking the caller
+                return psycopg2.connect(database_url, sslmode='require')
+            if not isinstance(conn, _PooledConnection) or conn.is_alive():
+                conn._releasing = False
+                return conn
+            conn._releasing = True  # close() below really closes it
+            pool.putconn(conn, close=True)
+        return psycopg2.connect(database_url, sslmode='require')
     except Exception as e:
         print(f"Error connecting to database: {e}", flush=True)
         return None
 
 
+# Server-side prepared statements, PREPAREd once per pooled session.
+_PREPARED_STATEMENTS = {
+    'get_run_checkpoint': """
+        PREPARE get_run_checkpoint (text) AS
+        SELECT checkpoint_info, config, excel_file_path, progress
+        FROM runs
+        WHERE run_id = $1
+    """,
+}
+
+
+def _ensure_prepared(conn, name: str) -> None:
+    """PREPARE the named statement on this connection unless this session already has it"""
+    pooled = isinstance(conn, _PooledConnection)
+    if pooled and name in conn.prepared_statements:
+        return
+    with conn.cursor() as cur:
+        cur.execute(_PREPARED_STATEMENTS[name])
+    conn.commit()
+    if pooled:
+        conn.prepared_statements = conn.prepared_statements | {name}
+
+
+def fetch_run_checkpoint(run_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch checkpoint_info, config, excel_file_path and progress for a run in one round trip.
+
+    Uses a per-session prepared statement so repeated resumes skip parse/plan. Returns None when
+    there is no database or no such run.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    try:
+        for retry in (False, True):
+            _ensure_prepared(conn, 'get_run_checkpoint')
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("EXECUTE get_run_checkpoint (%s)", (run_id,))
+                    row = cur.fetchone()
+                    if not row:
+                        return None
+                    return {col.name: value for col, value in zip(cur.description, row)}
+            except psycopg2.errors.InvalidSqlStatementName:
+                # The server lost the statement (DISCARD ALL, transaction pooler): PREPARE again once
+                conn.rollback()
+                if retry or not isinstance(conn, _PooledConnection):
+                    raise
+                conn.prepared_statements = conn.prepared_statements - {'get_run_checkpoint'}
+    finally:
+        conn.close()
+
+
 def get_queued_jobs() -> List[str]:
     """Get list of run_ids for jobs with status='queued'"""
     conn = get_db_connection()
@@ -219,17 +362,34 @@ def get_uploads_restore_dir() -> Path:
     return d
 
 
+PDF_RESTORE_MAX_WORKERS = 8
+
+
+def _restore_pdf_file(output_path: Path, pdf_info: Dict[str, Any]) -> Optional[str]:
+    """Decode one base64 PDF entry from runs.pdf_files and write it under output_path"""
+    filename = pdf_info.get('filename')
+    content_b64 = pdf_info.get('content')
+    if not filename or not content_b64:
+        return None
+    pdf_file_path = output_path / filename
+    # Convert base64 string back to bytes
+    pdf_content = base64.b64decode(content_b64)
+    with open(pdf_file_path, 'wb') as f:
+        f.write(pdf_content)
+    return str(pdf_file_path)
+
+
 def load_pdfs_from_db(run_id: str, output_dir: Optional[str] = None) -> List[str]:
-    """Load PDF files from Postgres database and save to filesystem"""
+    """Load PDF files from Postgres database and save to filesystem.
+
+    All PDFs arrive in one row; decoding and writing them is spread over a thread pool.
+    Returned paths keep the stored order.
+    """
     conn = get_db_connection()
     if not conn:
         return []
     
     try:
-        import json
-        import base64
-        from pathlib import Path
-        
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT pdf_files 
@@ -253,20 +413,12 @@ def load_pdfs_from_db(run_id: str, output_dir: Optional[str] = None) -> List[str
             output_path.mkdir(parents=True, exist_ok=True)
             
             # Restore PDF files
-            restored_paths = []
-            for pdf_info in pdf_data:
-                filename = pdf_info.get('filename')
-                content_b64 = pdf_info.get('content')
-                
-                if filename and content_b64:
-                    pdf_file_path = output_path / filename
-                    # Convert base64 string back to bytes
-                    pdf_content = base64.b64decode(content_b64)
-                    with open(pdf_file_path, 'wb') as f:
-                        f.write(pdf_content)
-                    restored_paths.append(str(pdf_file_path))
-            
-            return restored_paths
+            if not pdf_data:
+                return []
+            max_workers = min(PDF_RESTORE_MAX_WORKERS, os.cpu_count() or 1, len(pdf_data))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                restored = executor.map(partial(_restore_pdf_file, output_path), pdf_data)
+                return [p for p in restored if p]
     except Exception as e:
         print(f"Error loading PDF files from database: {e}", flush=True)
         import traceback
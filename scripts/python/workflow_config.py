@@ -0,0 +1,59 @@
+"""
+Typed settings for the optimization workflow.
+
+run_full_workflow reads the scalar settings of the YAML `configuration` section once into a
+frozen WorkflowConfig. The full YAML dict is still what gets frozen into state files and passed
+to excel_io / analyze_with_gemini, which read nested sections (questions, promptInputs, ...).
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+
+@dataclass(frozen=True, slots=True)
+class WorkflowConfig:
+    """Scalar workflow settings parsed from yaml_config['configuration']"""
+    max_cycles: int
+    min_cycles: int
+    gemini_model: Optional[str]
+    project_name: str = 'prompt_optimization'
+    prompt_template_name: Optional[str] = None  # API name (DeveloperName), not display name
+    search_index_id: Optional[str] = None
+    refinement_stage: str = 'llm_parser'
+    username: Optional[str] = None
+    password: Optional[str] = None
+    instance_url: Optional[str] = None
+    take_screenshots: bool = False
+    headless: bool = False
+    index_prefix: Optional[str] = None
+    pdf_directory: str = ''
+
+    @classmethod
+    def from_yaml(cls, yaml_config: Dict[str, Any], max_cycles: int = 10, model_name: Optional[str] = None) -> "WorkflowConfig":
+        """Build settings from a YAML config dict; max_cycles/model_name are the command-line fallbacks"""
+        config = yaml_config.get('configuration', {})
+        salesforce_config = config.get('salesforce', {})
+        max_cycles = config.get('maxCycles', max_cycles)
+        return cls(
+            max_cycles=max_cycles,
+            min_cycles=config.get('minCycles', max_cycles),
+            gemini_model=config.get('geminiModel', model_name),
+            project_name=config.get('projectName', 'prompt_optimization'),
+            prompt_template_name=config.get('promptTemplateApiName'),
+            search_index_id=config.get('searchIndexId'),
+            refinement_stage=config.get('refinementStage', 'llm_parser'),
+            username=salesforce_config.get('username'),
+            password=salesforce_config.get('password'),
+            instance_url=salesforce_config.get('instanceUrl'),
+            take_screenshots=config.get('takeScreenshots', False),
+            headless=config.get('headless', False),
+            index_prefix=config.get('indexPrefix'),
+            pdf_directory=config.get('pdfDirectory', ''),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict of the settings (for logging and legacy code paths)"""
+        return asdict(self)
+
+
+__all__ = ["WorkflowConfig"]